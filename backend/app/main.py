@@ -5,16 +5,46 @@ from contextlib import asynccontextmanager
 import logging
 import os
 
-from app.routes import detect, roi, events
-from app.services.yolo_detector import YoloDetector
-from app.services.face_recognizer import FaceRecognizer
-from app.services.firebase_service import FirebaseService
-from app.websocket.manager import ConnectionManager
+from app.services.cpu_budget import CpuBudget
 from app.utils.config import settings
-from app.utils.logger import setup_logging
 
-import cv2
-import numpy as np
+# One CPU budget for torch / OpenCV / ONNX Runtime. The OMP / MKL variables are only
+# read when those libraries load, so they are set before anything below imports them;
+# worker processes inherit them. In "thread" mode the inference threads share one
+# process-wide pool, so the process gets every worker's threads together.
+cpu_budget = CpuBudget(
+    workers=settings.INFERENCE_WORKERS,
+    cores=settings.CPU_CORES,
+    threads_per_worker=settings.CPU_THREADS_PER_WORKER,
+    opencv_threads=settings.CPU_OPENCV_THREADS,
+    pin=settings.CPU_PIN_WORKERS,
+    in_process=settings.INFERENCE_EXECUTOR == "thread"
+)
+cpu_budget.apply_env()
+
+from app.routes import detect, roi, events, ingest  # noqa: E402
+from app.services.yolo_detector import YoloDetector  # noqa: E402
+from app.services.face_detector import FaceDetector  # noqa: E402
+from app.services.face_gallery import FaceGallery  # noqa: E402
+from app.services.face_recognizer import FaceRecognizer  # noqa: E402
+from app.services.enrollment_cache import enroll_from_folder  # noqa: E402
+from app.services.firebase_service import FirebaseService  # noqa: E402
+from app.services.roi_cache import RoiCache  # noqa: E402
+from app.services.event_writer import EventWriter  # noqa: E402
+from app.services.event_cache import EventQueryCache  # noqa: E402
+from app.services.event_store import EventStore  # noqa: E402
+from app.services.upload_spool import UploadSpool  # noqa: E402
+from app.services.batch_scheduler import BatchScheduler  # noqa: E402
+from app.services.detection_pipeline import DetectionPipeline, init_worker_pipeline  # noqa: E402
+from app.services.inference_executor import InferenceExecutor  # noqa: E402
+from app.services.model_workers import ModelWorkerPool  # noqa: E402
+from app.services.motion_gate import MotionGate  # noqa: E402
+from app.services.tracker import TrackerRegistry  # noqa: E402
+from app.services.alert_deduplicator import AlertDeduplicator  # noqa: E402
+from app.services.snapshot_dedup import SnapshotDeduplicator  # noqa: E402
+from app.websocket.manager import ConnectionManager  # noqa: E402
+from app.utils.logger import setup_logging  # noqa: E402
+
 print(f"[DEBUG CONFIG FILE PATH] loaded from: {settings.__config__.env_file if hasattr(settings, '__config__') else 'no env file'}")
 print(f"[DEBUG CONFIG PATH] ARCFACE_MODEL_PATH = {settings.ARCFACE_MODEL_PATH}")
 setup_logging()
@@ -29,26 +59,52 @@ async def lifespan(app: FastAPI):
     logger.info(" Starting Smart Intrusion Detection Backend...")
     
     try:
+        # Thread counts and pinning, applied before any model is built
+        cpu_budget.apply()
+        
         # Load YOLOv8 model
+        yolo_args = {
+            "model_path": settings.YOLO_MODEL_PATH,
+            "backend": settings.YOLO_BACKEND,
+            "imgsz": settings.YOLO_IMGSZ,
+            "calibration_dir": settings.YOLO_CALIBRATION_DIR
+        }
         logger.info(f"Loading YOLOv8 model from {settings.YOLO_MODEL_PATH}...")
         if not os.path.exists(settings.YOLO_MODEL_PATH):
             logger.warning(f"  YOLOv8 model not found at {settings.YOLO_MODEL_PATH}")
             yolo_detector = None
         else:
-            yolo_detector = YoloDetector(settings.YOLO_MODEL_PATH)
+            yolo_detector = YoloDetector(**yolo_args)
             logger.info("YOLOv8 model loaded successfully!")
         
+        face_detector_args = {
+            "backend": settings.FACE_DETECTOR,
+            "model_path": settings.FACE_DETECTOR_MODEL_PATH,
+            "max_dim": settings.FACE_DETECTOR_MAX_DIM,
+            "score_threshold": settings.FACE_DETECTOR_SCORE_THRESHOLD
+        }
+        
         logger.info(f"Loading ArcFace model from {settings.ARCFACE_MODEL_PATH}...")
         if not os.path.exists(settings.ARCFACE_MODEL_PATH):
             logger.warning(f"  ArcFace model not found at {settings.ARCFACE_MODEL_PATH}")
             face_recognizer = None
         else:
-            face_recognizer = FaceRecognizer(settings.ARCFACE_MODEL_PATH)
+            face_recognizer = FaceRecognizer(
+                settings.ARCFACE_MODEL_PATH,
+                backend=settings.ARCFACE_BACKEND,
+                calibration_dir=settings.ARCFACE_CALIBRATION_DIR,
+                face_detector=FaceDetector(**face_detector_args),
+                gallery=FaceGallery(
+                    dtype=settings.FACE_GALLERY_DTYPE,
+                    ann_threshold=settings.FACE_GALLERY_ANN_THRESHOLD,
+                    ann_probes=settings.FACE_GALLERY_ANN_PROBES
+                )
+            )
             dataset_path = "dataset" 
             if os.path.exists(dataset_path):
                 logger.info(f"Creating whitelist from folder: {dataset_path}")
                 create_whitelist_from_folder(face_recognizer, dataset_path)
-                logger.info(f"Whitelist contains {len(face_recognizer.whitelist)} entries")
+                logger.info(f"Whitelist contains {len(face_recognizer.gallery)} identities ({face_recognizer.gallery.size} embeddings)")
             else:
                 logger.warning(f"Dataset folder not found: {dataset_path}")
             logger.info("ArcFace model loaded successfully!")
@@ -62,9 +118,168 @@ async def lifespan(app: FastAPI):
             firebase_service = FirebaseService(settings.FIREBASE_CREDENTIALS)
             logger.info(" Firebase initialized successfully!")
         
+        roi_cache = None
+        if firebase_service is not None:
+            roi_cache = RoiCache(
+                firebase_service,
+                sync=settings.ROI_CACHE_SYNC,
+                refresh_interval_seconds=settings.ROI_CACHE_REFRESH_SECONDS
+            )
+            await roi_cache.start()
+        
+        event_store = EventStore(settings.EVENT_STORE_PATH) if settings.EVENT_STORE_PATH else None
+        
+        event_writer = None
+        event_cache = None
+        if firebase_service is not None:
+            # Caches Firestore pages: every page without a local store, older pages with one
+            event_cache = EventQueryCache(
+                ttl_seconds=settings.EVENT_CACHE_TTL_SECONDS,
+                max_entries=settings.EVENT_CACHE_MAX_ENTRIES
+            )
+            event_writer = EventWriter(
+                firebase_service,
+                max_batch_size=settings.EVENT_WRITER_BATCH_SIZE,
+                flush_interval_ms=settings.EVENT_WRITER_FLUSH_MS,
+                max_queue=settings.EVENT_WRITER_MAX_QUEUE,
+                on_commit=event_cache.on_events_committed if event_cache is not None else None
+            )
+            await event_writer.start()
+        
+        upload_spool = None
+        if event_writer is not None:
+            upload_spool = UploadSpool(
+                firebase_service,
+                event_writer,
+                path=settings.UPLOAD_SPOOL_PATH,
+                workers=settings.UPLOAD_WORKERS,
+                retry_base_seconds=settings.UPLOAD_RETRY_BASE_SECONDS,
+                retry_max_seconds=settings.UPLOAD_RETRY_MAX_SECONDS,
+                max_attempts=settings.UPLOAD_MAX_ATTEMPTS,
+                event_store=event_store,
+                encode_workers=settings.SNAPSHOT_ENCODE_WORKERS,
+                max_encode_backlog=settings.SNAPSHOT_ENCODE_BACKLOG
+            )
+            await upload_spool.start()
+        
+        detection_pipeline = None
+        inference_executor = None
+        model_workers = None
+        batch_scheduler = None
+        if yolo_detector is not None:
+            tracking = None
+            if settings.TRACKING_ENABLED:
+                tracking = {
+                    "iou_threshold": settings.TRACK_IOU_THRESHOLD,
+                    "max_age_seconds": settings.TRACK_MAX_AGE_SECONDS,
+                    "identity_ttl_seconds": settings.TRACK_IDENTITY_TTL_SECONDS
+                }
+            
+            detection_pipeline = DetectionPipeline(
+                yolo_detector,
+                face_recognizer,
+                confidence_threshold=settings.CONFIDENCE_THRESHOLD,
+                face_threshold=settings.FACE_RECOGNITION_THRESHOLD,
+                tracker=TrackerRegistry(**tracking) if tracking is not None else None
+            )
+            
+            # Workers reuse the backend artifact the parent just exported / cached
+            worker_init_args = (
+                yolo_args,
+                {
+                    "model_path": settings.ARCFACE_MODEL_PATH,
+                    "backend": settings.ARCFACE_BACKEND,
+                    "calibration_dir": settings.ARCFACE_CALIBRATION_DIR
+                } if face_recognizer is not None else None,
+                face_recognizer.gallery if face_recognizer is not None else None,
+                settings.CONFIDENCE_THRESHOLD,
+                settings.FACE_RECOGNITION_THRESHOLD,
+                tracking,
+                face_detector_args,
+                cpu_budget.as_args()
+            )
+            
+            if settings.INFERENCE_EXECUTOR == "shm":
+                model_workers = ModelWorkerPool(
+                    settings.INFERENCE_WORKERS,
+                    worker_init_args,
+                    slots_per_worker=settings.SHM_SLOTS_PER_WORKER,
+                    slot_max_dim=settings.SHM_SLOT_MAX_DIM,
+                    retry_after=settings.INFERENCE_RETRY_AFTER,
+                    timeout_seconds=settings.SHM_INFER_TIMEOUT_SECONDS
+                )
+                model_workers.start()
+            elif settings.INFERENCE_EXECUTOR == "process":
+                inference_executor = InferenceExecutor(
+                    mode="process",
+                    max_workers=settings.INFERENCE_WORKERS,
+                    max_queue=settings.INFERENCE_MAX_QUEUE,
+                    retry_after=settings.INFERENCE_RETRY_AFTER,
+                    initializer=init_worker_pipeline,
+                    initargs=worker_init_args
+                )
+            else:
+                inference_executor = InferenceExecutor(
+                    mode="thread",
+                    max_workers=settings.INFERENCE_WORKERS,
+                    max_queue=settings.INFERENCE_MAX_QUEUE,
+                    retry_after=settings.INFERENCE_RETRY_AFTER
+                )
+                
+                # Batching only applies when the models live in this process
+                if settings.BATCH_INFERENCE_ENABLED:
+                    batch_scheduler = BatchScheduler(
+                        yolo_detector,
+                        max_batch_size=settings.BATCH_MAX_SIZE,
+                        max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                        confidence_threshold=settings.CONFIDENCE_THRESHOLD,
+                        executor=inference_executor
+                    )
+                    await batch_scheduler.start()
+        
+        motion_gate = None
+        if settings.MOTION_GATE_ENABLED:
+            motion_gate = MotionGate(
+                width=settings.MOTION_GATE_WIDTH,
+                pixel_threshold=settings.MOTION_GATE_PIXEL_THRESHOLD,
+                min_changed_ratio=settings.MOTION_GATE_MIN_CHANGED_RATIO,
+                learning_rate=settings.MOTION_GATE_LEARNING_RATE,
+                max_skip_seconds=settings.MOTION_GATE_MAX_SKIP_SECONDS,
+                camera_overrides=settings.MOTION_GATE_CAMERA_OVERRIDES
+            )
+        
+        alert_deduplicator = None
+        if settings.ALERT_DEDUP_ENABLED:
+            alert_deduplicator = AlertDeduplicator(
+                cooldown_seconds=settings.ALERT_COOLDOWN_SECONDS,
+                region_grid=settings.ALERT_REGION_GRID,
+                update_interval_seconds=settings.ALERT_UPDATE_INTERVAL_SECONDS
+            )
+        
+        snapshot_dedup = None
+        if settings.SNAPSHOT_DEDUP_ENABLED:
+            snapshot_dedup = SnapshotDeduplicator(
+                max_distance=settings.SNAPSHOT_DEDUP_MAX_DISTANCE,
+                max_age_seconds=settings.SNAPSHOT_DEDUP_MAX_AGE_SECONDS,
+                per_camera=settings.SNAPSHOT_DEDUP_PER_CAMERA
+            )
+        
+        app.state.cpu_budget = cpu_budget
         app.state.yolo_detector = yolo_detector
         app.state.face_recognizer = face_recognizer
         app.state.firebase_service = firebase_service
+        app.state.roi_cache = roi_cache
+        app.state.event_writer = event_writer
+        app.state.event_cache = event_cache
+        app.state.event_store = event_store
+        app.state.upload_spool = upload_spool
+        app.state.detection_pipeline = detection_pipeline
+        app.state.inference_executor = inference_executor
+        app.state.model_workers = model_workers
+        app.state.batch_scheduler = batch_scheduler
+        app.state.motion_gate = motion_gate
+        app.state.alert_deduplicator = alert_deduplicator
+        app.state.snapshot_dedup = snapshot_dedup
         app.state.ws_manager = ws_manager
         
         logger.info("All services initialized successfully!")
@@ -73,14 +288,43 @@ async def lifespan(app: FastAPI):
         logger.error(f"Startup error: {str(e)}", exc_info=True)
         logger.warning("Server starting with limited functionality")
         
+        app.state.cpu_budget = None
         app.state.yolo_detector = None
         app.state.face_recognizer = None
         app.state.firebase_service = None
+        app.state.roi_cache = None
+        app.state.event_writer = None
+        app.state.event_cache = None
+        app.state.event_store = None
+        app.state.upload_spool = None
+        app.state.detection_pipeline = None
+        app.state.inference_executor = None
+        app.state.model_workers = None
+        app.state.batch_scheduler = None
+        app.state.motion_gate = None
+        app.state.alert_deduplicator = None
+        app.state.snapshot_dedup = None
         app.state.ws_manager = ws_manager
     
     yield
     
     logger.info("Shutting down services...")
+    if app.state.roi_cache is not None:
+        await app.state.roi_cache.stop()
+    if app.state.batch_scheduler is not None:
+        await app.state.batch_scheduler.stop()
+    if app.state.inference_executor is not None:
+        app.state.inference_executor.shutdown()
+    if app.state.upload_spool is not None:
+        # Unfinished uploads stay in the spool file and resume on the next start
+        await app.state.upload_spool.stop()
+    if app.state.event_writer is not None:
+        # Flush events still queued from the last requests
+        await app.state.event_writer.stop()
+    if app.state.event_store is not None:
+        app.state.event_store.close()
+    if app.state.model_workers is not None:
+        app.state.model_workers.stop()
 
 
 app = FastAPI(
@@ -95,11 +339,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide non-safelisted response headers from scripts unless exposed
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(detect.router, prefix="/api", tags=["Detection"])
 app.include_router(roi.router, prefix="/api", tags=["ROI"])
 app.include_router(events.router, prefix="/api", tags=["Events"])
+app.include_router(ingest.router, tags=["Ingest"])
 
 
 @app.get("/")
@@ -112,7 +359,8 @@ async def root():
             "yolo": app.state.yolo_detector is not None,
             "arcface": app.state.face_recognizer is not None,
             "firebase": app.state.firebase_service is not None
-        }
+        },
+        "cpu_budget": app.state.cpu_budget.describe() if app.state.cpu_budget else None
     }
 
 
@@ -147,46 +395,12 @@ if __name__ == "__main__":
 
 
 def create_whitelist_from_folder(recognizer, dataset_path="dataset"):
-    for identity in os.listdir(dataset_path):
-        identity_path = os.path.join(dataset_path, identity)
-        if not os.path.isdir(identity_path):
-            continue
-        
-        embeddings = []
-        for img_file in os.listdir(identity_path):
-            if img_file.lower().endswith((".jpg", ".png", ".jpeg")):
-                img_path = os.path.join(identity_path, img_file)
-                img = cv2.imread(img_path)
-                
-                faces = recognizer.detect_faces(img)
-                if len(faces) == 0:
-                    print(f"[WARN] No face detected in {img_path}")
-                    continue
-                
-                # Dùng khuôn mặt lớn nhất
-                x, y, w, h = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)[0]
-                face_roi = img[y:y+h, x:x+w]
-                
-                emb = recognizer.extract_embedding(face_roi)
-                embeddings.append(emb)
-        
-        if embeddings:
-            # trung bình các embeddings của một người
-            avg_emb = np.mean(embeddings, axis=0)
-            avg_emb = avg_emb / np.linalg.norm(avg_emb)
-            recognizer.whitelist[identity] = avg_emb
-            print(f"[INFO] Added {identity} to whitelist ({len(embeddings)} faces)")
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    # Chỉ embed ảnh mới / đã thay đổi, phần còn lại lấy từ cache trên đĩa
+    enrolled = enroll_from_folder(
+        recognizer,
+        dataset_path,
+        cache_path=settings.ENROLLMENT_CACHE_PATH or None,
+        workers=settings.ENROLLMENT_WORKERS
+    )
+    for identity, count in enrolled.items():
+        print(f"[INFO] Added {identity} to whitelist ({count} faces)")
@@ -10,10 +10,13 @@ class Detection(BaseModel):
     bbox: List[float]  # [x1, y1, x2, y2] nay dung de luu vi tri cua nguoi 
     face_id: str
     alert: bool
+    track_id: Optional[int] = None  # stable per-camera id from the tracker
 
 
 class DetectionResponse(BaseModel):
     detections: List[Detection]
     image_url: Optional[str] = None
     timestamp: str
-    alert: bool = False
\ No newline at end of file
+    alert: bool = False
+    camera_id: Optional[str] = None
+    skipped: bool = False  # motion gate reused the camera's last result
\ No newline at end of file
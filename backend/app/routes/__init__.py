@@ -1,4 +1,4 @@
                                
-from app.routes import detect, roi, events
+from app.routes import detect, roi, events, ingest
 
-__all__ = ["detect", "roi", "events"]
\ No newline at end of file
+__all__ = ["detect", "roi", "events", "ingest"]
\ No newline at end of file
@@ -1,6 +1,6 @@
 
 
-from fastapi import APIRouter, File, UploadFile, Request, HTTPException, Depends
+from fastapi import APIRouter, File, Form, UploadFile, Request, HTTPException, Depends
 from datetime import datetime
 import numpy as np
 from time import time
@@ -8,12 +8,18 @@ from time import time
 import cv2
 import base64
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import asyncio
 import os 
 from app.models.detection_result import DetectionResponse, Detection
-from app.services.vision_utils import VisionPreprocessor
+from app.services.detection_pipeline import run_worker_pipeline
+from app.services.image_codec import decode_image, encode_jpeg, jpeg_dimensions, resize_max_dim
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.roi_geometry import RoiSet
+from app.services.tracker import DEFAULT_CAMERA_KEY, CameraKey
+from app.services.snapshot_dedup import dhash
 from app.utils.auth import verify_token
+from app.utils.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -22,188 +28,309 @@ router = APIRouter()
 async def detect_intrusion(
     request: Request,
     file: UploadFile = File(...),
+    camera_id: str = Form("default"),
     user_id: str = Depends(verify_token)
 ):
     try:
-        begin = time()  # ---- START ----
-
         # Read file
         contents = await file.read()
-
-        # Decode image
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        time_count_image = time()
-
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image format")
-        
-        # Setup service
-        time_count_setup_begin = time()
-        yolo_detector = request.app.state.yolo_detector
-        face_recognizer = request.app.state.face_recognizer
-        firebase_service = request.app.state.firebase_service
-        ws_manager = request.app.state.ws_manager
-        time_count_setup_end = time()
-        
-        if yolo_detector is None:
-            raise HTTPException(
-                status_code=503, 
-                detail="YOLOv8 model not available."
-            )
-        
-        # Enhance image
-        time_enhance_begin = time()
-        preprocessor = VisionPreprocessor()
-        enhanced_image = preprocessor.enhance_for_night(image)
-        time_enhance_end = time()
-        # --- YOLO detection ---
-        time_before_yolo = time()
-        person_detections = yolo_detector.detect_persons(enhanced_image)
-        time_after_yolo = time()
-
-        detections: List[Detection] = []
-        alert_triggered = False
         
-        # --- Face recognition ---
-        time_before_face = time()
-        for det in person_detections:
-            bbox = det['bbox']
-            confidence = det['confidence']
-            
-            x1, y1, x2, y2 = map(int, bbox)
-            if x2 <= x1 or y2 <= y1:
-                continue
-                
-            person_roi = enhanced_image[y1:y2, x1:x2]
-            
-            if face_recognizer is not None and person_roi.size > 0:
-                face_result = face_recognizer.recognize_face(person_roi)
-                face_id = face_result.get('identity', 'unknown')
-                is_known = face_result.get('is_known', False)
-            else:
-                face_id = 'unknown'
-                is_known = False
-            
-            if not is_known:
-                alert_triggered = True
-            
-            detections.append(Detection(
-                label="person",
-                confidence=confidence,
-                bbox=bbox,
-                face_id=face_id,
-                alert=not is_known
-            ))
+        return await process_frame(request.app, contents, user_id, camera_id)
         
-        time_after_face = time()
-
-        # Drawing
-        annotated_image = draw_detections(image, [det.dict() for det in detections])
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full, retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Detection error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Detection failed: {str(e)}"
+        )
 
-        # Firebase upload (offloaded to background to reduce API latency)
-        image_url: Optional[str] = None
-        timestamp = datetime.now().isoformat()
 
-        time_before_firebase = time()
+async def process_frame(app, contents: bytes, user_id: str, camera_id: str) -> DetectionResponse:
+    """
+    Shared per-frame flow for /api/detect and /ws/ingest/{camera_id}:
+    decode -> inference -> background upload/save -> WebSocket broadcast.
+    """
+    begin = time()  # ---- START ----
 
-        async def _upload_and_save(image_to_upload: bytes, filename: str, event_payload: dict):
-            try:
-                # Run blocking uploads in threadpool
-                url = await asyncio.to_thread(firebase_service.upload_image, image_to_upload, filename)
-                event_payload['image_url'] = url
-                await asyncio.to_thread(firebase_service.save_event, event_payload)
-                logger.info(f"Background Firebase work completed: {filename}")
-            except Exception as e:
-                logger.error(f"Background Firebase error: {str(e)}")
+    # Decode image (large JPEGs decode at reduced resolution straight to the pipeline size)
+    image = await asyncio.to_thread(decode_image, contents, settings.DECODE_MAX_DIM)
+    time_count_image = time()
 
-        if detections and firebase_service is not None:
-            try:
+    if image is None:
+        raise HTTPException(status_code=400, detail="Invalid image format")
+    
+    # Setup service
+    time_count_setup_begin = time()
+    yolo_detector = app.state.yolo_detector
+    ws_manager = app.state.ws_manager
+    motion_gate = app.state.motion_gate
+    alert_deduplicator = app.state.alert_deduplicator
+    event_writer = app.state.event_writer
+    upload_spool = app.state.upload_spool
+    event_store = app.state.event_store
+    snapshot_dedup = app.state.snapshot_dedup
+    time_count_setup_end = time()
+    
+    if yolo_detector is None:
+        raise HTTPException(
+            status_code=503, 
+            detail="YOLOv8 model not available."
+        )
+    
+    # --- Motion gate: static scene -> reuse the camera's last result ---
+    time_before_inference = time()
+    skipped = False
+    if motion_gate is not None and not await asyncio.to_thread(motion_gate.check, user_id, camera_id, image):
+        detection_dicts = motion_gate.last_result(user_id, camera_id)
+        skipped = True
+    else:
+        # --- Enhance + YOLO + face recognition on the inference workers ---
+        roi_cache = app.state.roi_cache
+        roi_set = roi_cache.roi_set(user_id, camera_id) if roi_cache is not None else None
+        if roi_set is not None and roi_set.frame_size is None:
+            # ROIs saved without a frame size were drawn on the camera's native frame, not the decoded one
+            height, width = jpeg_dimensions(contents) or image.shape[:2]
+            roi_set = roi_set.with_frame_size(width, height)
+        detection_dicts = await run_inference(app, image, (user_id, camera_id), roi_set)
+        if motion_gate is not None:
+            motion_gate.update_result(user_id, camera_id, detection_dicts)
+    time_after_inference = time()
+
+    detections: List[Detection] = [Detection(**det) for det in detection_dicts]
+    alert_triggered = any(det.alert for det in detections)
+
+    # Firebase upload (offloaded to background to reduce API latency)
+    image_url: Optional[str] = None
+    timestamp = datetime.now().isoformat()
+
+    time_before_firebase = time()
+
+    # --- Alert dedup: repeats of an open camera/identity/region only bump its count ---
+    decision = None
+    if alert_deduplicator is not None and detections and not skipped:
+        decision = alert_deduplicator.observe(user_id, camera_id, detection_dicts, image.shape, timestamp)
+    suppressed = decision is not None and not decision.should_upload
+
+    if alert_deduplicator is not None and (event_writer is not None or event_store is not None):
+        for event_id, fields in alert_deduplicator.pending_updates():
+            if event_store is not None:
+                await asyncio.to_thread(event_store.update, event_id, fields)
+            if event_writer is not None:
+                await event_writer.update(event_id, fields)
+
+    # Skipped frames repeat the previous result, which was already uploaded and broadcast
+    if detections and (upload_spool is not None or event_store is not None) and not skipped and not suppressed:
+        try:
+            event_data = {
+                "user_id": user_id,
+                "camera_id": camera_id,
+                "timestamp": timestamp,
+                "detections": [det.dict() for det in detections],
+                "image_url": None,
+                "alert": alert_triggered,
+                "count": 1,
+                "last_seen": timestamp
+            }
+
+            # Local store first (the read path), its id is reused as the Firestore document id
+            event_id = None
+            if event_store is not None:
+                event_id = await asyncio.to_thread(event_store.add, event_data)
+
+            if upload_spool is not None:
                 image_filename = f"detections/{user_id}/{timestamp}.jpg"
 
-                # Compress/rescale image before upload to reduce size (speeds up network transfer)
-                # keep aspect ratio, limit max dimension to 1280
-                h, w = annotated_image.shape[:2]
-                max_dim = 1280
-                if max(h, w) > max_dim:
-                    scale = max_dim / max(h, w)
-                    new_w = int(w * scale)
-                    new_h = int(h * scale)
-                    upload_image = cv2.resize(annotated_image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+                # Near-identical to a recent upload from this camera -> reuse its URLs, skip encode + upload
+                image_hash = None
+                reused = None
+                camera_key = (user_id, camera_id)
+                labels = tuple(sorted(det.face_id or "person" for det in detections))
+                if snapshot_dedup is not None:
+                    image_hash = await asyncio.to_thread(dhash, image)
+                    reused = snapshot_dedup.lookup(camera_key, image_hash, labels)
+
+                encoded_size = {}
+
+                def render():
+                    # Drawing + resize + JPEG encodes run on the spool's encoder threads, not in this request
+                    image_bytes, thumbnail_bytes = encode_snapshot(image, detection_dicts)
+                    encoded_size["bytes"] = len(image_bytes) + len(thumbnail_bytes)
+                    return image_bytes, thumbnail_bytes
+
+                entries = decision.entries if decision is not None else None
+
+                def on_saved(event_id: str, url: Optional[str], thumbnail_url: Optional[str]):
+                    if entries is not None:
+                        alert_deduplicator.attach(entries, event_id, url)
+                    if image_hash is not None and reused is None and url is not None:
+                        snapshot_dedup.remember(
+                            camera_key, image_hash, labels, url, thumbnail_url, encoded_size.get("bytes", 0)
+                        )
+
+                # Spooled to disk; the upload workers retry until Cloudinary / Firestore accept it.
+                # We still return a placeholder URL so client has a value quickly.
+                if reused is not None:
+                    await upload_spool.enqueue(
+                        None, image_filename, event_data, on_saved,
+                        event_id=event_id,
+                        image_url=reused.image_url,
+                        thumbnail_url=reused.thumbnail_url
+                    )
                 else:
-                    upload_image = annotated_image
-
-                # Encode with reasonable JPEG quality to shrink size
-                encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), 80]
-                _, buffer = cv2.imencode('.jpg', upload_image, encode_params)
-                image_bytes = buffer.tobytes()
+                    # The camera's own JPEG stands in for the snapshot until it is rendered
+                    await upload_spool.enqueue_render(
+                        render, contents, image_filename, event_data, on_saved, event_id=event_id
+                    )
+            elif decision is not None:
+                # Local-only: repeats can update the stored event right away
+                alert_deduplicator.attach(decision.entries, event_id, None)
+            image_url = f"https://placeholder.example.com/detection_{timestamp}.jpg"
 
-                event_data = {
+        except Exception as firebase_error:
+            logger.error(f"Firebase error (scheduling): {str(firebase_error)}")
+            image_url = f"https://placeholder.example.com/detection_{timestamp}.jpg"
+    elif suppressed and decision.image_url:
+        image_url = decision.image_url
+    else:
+        image_url = f"https://placeholder.example.com/detection_{timestamp}.jpg"
+
+    time_after_firebase = time()
+    time_web_socket_begin = time()
+    # --- WebSocket Broadcast ---
+    if ws_manager and detections and not skipped and not suppressed:
+        try:
+            await ws_manager.broadcast({
+                "type": "detection",
+                "data": {
                     "user_id": user_id,
+                    "camera_id": camera_id,
                     "timestamp": timestamp,
                     "detections": [det.dict() for det in detections],
-                    "image_url": None,
+                    "image_url": image_url,
                     "alert": alert_triggered
                 }
+            })
+        except Exception as ws_error:
+            logger.error(f"WebSocket broadcast error: {str(ws_error)}")
+    time_web_socket_end = time()
+
+    # ---- LOG PERFORMANCE ----
+    time_end = time()
+    logger.info({
+        "time_total": time_end - begin,
+        "time_decode_image": time_count_image - begin,
+        "time_service_setup": time_count_setup_end - time_count_setup_begin,
+        "time_inference": time_after_inference - time_before_inference,
+        "skipped": skipped,
+        "suppressed": suppressed,
+        "time_firebase": time_after_firebase - time_before_firebase if detections else 0,
+        "time_web_socket" : time_web_socket_end - time_web_socket_begin
+    })
+
+    return DetectionResponse(
+        detections=detections,
+        image_url=image_url,
+        timestamp=timestamp,
+        alert=alert_triggered,
+        camera_id=camera_id,
+        skipped=skipped
+    )
+
+
+async def run_inference(
+    app,
+    image: np.ndarray,
+    camera_key: CameraKey = DEFAULT_CAMERA_KEY,
+    roi_set: Optional[RoiSet] = None
+) -> List[dict]:
+    """Runs enhance -> YOLO -> face recognition for one frame on the inference executor"""
+    inference_executor = app.state.inference_executor
+    pipeline = app.state.detection_pipeline
+    batch_scheduler = app.state.batch_scheduler
+    model_workers = app.state.model_workers
+
+    if model_workers is not None:
+        # Frame goes through shared memory to a model-worker process
+        return await model_workers.infer(image, camera_key, roi_set)
+
+    async with inference_executor.slot():
+        if inference_executor.mode == "process":
+            # Models live in the worker processes, run the whole pipeline there
+            return await inference_executor.run(run_worker_pipeline, image, camera_key, roi_set)
+
+        enhanced_image = await inference_executor.run(pipeline.enhance, image)
+        if roi_set is not None and batch_scheduler is not None:
+            # ROI crops join the shared batches, grouped with other crops of the same input size
+            crops, boxes, imgsz = pipeline.roi_crops(enhanced_image, roi_set)
+            results = await asyncio.gather(*(batch_scheduler.submit(crop, imgsz) for crop in crops))
+            person_detections = pipeline.merge_roi_detections(enhanced_image, roi_set, boxes, list(results))
+        elif roi_set is not None:
+            person_detections = await inference_executor.run(pipeline.detect, enhanced_image, roi_set)
+        elif batch_scheduler is not None:
+            person_detections = await batch_scheduler.submit(enhanced_image)
+        else:
+            person_detections = await inference_executor.run(pipeline.detect, enhanced_image)
+        return await inference_executor.run(pipeline.recognize, enhanced_image, person_detections, camera_key)
 
-                # Fire-and-forget background upload/save so API response is fast.
-                # We still return a placeholder URL so client has a value quickly.
-                asyncio.create_task(_upload_and_save(image_bytes, image_filename, event_data))
-                image_url = f"https://placeholder.example.com/detection_{timestamp}.jpg"
 
-            except Exception as firebase_error:
-                logger.error(f"Firebase error (scheduling): {str(firebase_error)}")
-                image_url = f"https://placeholder.example.com/detection_{timestamp}.jpg"
-        else:
-            image_url = f"https://placeholder.example.com/detection_{timestamp}.jpg"
+@router.get("/stats")
+async def get_stats(
+    request: Request,
+    user_id: str = Depends(verify_token)
+):
+    batch_scheduler = getattr(request.app.state, "batch_scheduler", None)
+    inference_executor = getattr(request.app.state, "inference_executor", None)
+    model_workers = getattr(request.app.state, "model_workers", None)
+    motion_gate = getattr(request.app.state, "motion_gate", None)
+    pipeline = getattr(request.app.state, "detection_pipeline", None)
+    alert_deduplicator = getattr(request.app.state, "alert_deduplicator", None)
+    roi_cache = getattr(request.app.state, "roi_cache", None)
+    event_writer = getattr(request.app.state, "event_writer", None)
+    upload_spool = getattr(request.app.state, "upload_spool", None)
+    event_cache = getattr(request.app.state, "event_cache", None)
+    event_store = getattr(request.app.state, "event_store", None)
+    snapshot_dedup = getattr(request.app.state, "snapshot_dedup", None)
+    # In process/shm mode the trackers live inside the worker processes
+    tracker = None
+    if pipeline is not None and inference_executor is not None and inference_executor.mode == "thread":
+        tracker = pipeline.tracker
+    return {
+        "batching": batch_scheduler.stats.snapshot() if batch_scheduler else None,
+        "executor": inference_executor.stats() if inference_executor else None,
+        "model_workers": model_workers.stats() if model_workers else None,
+        "motion_gate": motion_gate.stats() if motion_gate else None,
+        "tracking": tracker.stats() if tracker else None,
+        "alert_dedup": alert_deduplicator.stats() if alert_deduplicator else None,
+        "roi_cache": roi_cache.stats() if roi_cache else None,
+        "event_writer": event_writer.stats() if event_writer else None,
+        "upload_spool": upload_spool.stats() if upload_spool else None,
+        "event_cache": event_cache.stats() if event_cache else None,
+        "event_store": event_store.stats() if event_store else None,
+        "snapshot_dedup": snapshot_dedup.stats() if snapshot_dedup else None
+    }
+
+
+def encode_snapshot(image: np.ndarray, detections: List[dict]) -> Tuple[bytes, bytes]:
+    """Annotated snapshot as (full-size JPEG, thumbnail JPEG) for the event list"""
+    annotated_image = draw_detections(image, detections)
+
+    # Compress/rescale image before upload to reduce size (speeds up network transfer)
+    # keep aspect ratio, limit max dimension, reasonable JPEG quality
+    full = resize_max_dim(annotated_image, settings.SNAPSHOT_MAX_DIM)
+    thumbnail = resize_max_dim(full, settings.SNAPSHOT_THUMBNAIL_MAX_DIM)
+    return (
+        encode_jpeg(full, quality=settings.SNAPSHOT_QUALITY),
+        encode_jpeg(thumbnail, quality=settings.SNAPSHOT_THUMBNAIL_QUALITY)
+    )
 
-        time_after_firebase = time()
-        time_web_socket_begin = time()
-        # --- WebSocket Broadcast ---
-        if ws_manager and detections:
-            try:
-                await ws_manager.broadcast({
-                    "type": "detection",
-                    "data": {
-                        "user_id": user_id,
-                        "timestamp": timestamp,
-                        "detections": [det.dict() for det in detections],
-                        "image_url": image_url,
-                        "alert": alert_triggered
-                    }
-                })
-            except Exception as ws_error:
-                logger.error(f"WebSocket broadcast error: {str(ws_error)}")
-        time_web_socket_end = time()
-
-        # ---- LOG PERFORMANCE ----
-        time_end = time()
-        logger.info({
-            "time_total": time_end - begin,
-            "time_decode_image": time_count_image - begin,
-            "time_service_setup": time_count_setup_end - time_count_setup_begin,
-            "time_enhance": time_enhance_end - time_enhance_begin,
-            "time_yolo": time_after_yolo - time_before_yolo,
-            "time_face_recognition": time_after_face - time_before_face,
-            "time_firebase": time_after_firebase - time_before_firebase if detections else 0,
-            "time_web_socket" : time_web_socket_end - time_web_socket_begin
-        })
-
-        return DetectionResponse(
-            detections=detections,
-            image_url=image_url,
-            timestamp=timestamp,
-            alert=alert_triggered
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Detection error: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Detection failed: {str(e)}"
-        )
 
 def draw_detections(image, detections):
     annotated = image.copy()
@@ -1,9 +1,10 @@
 
 
-from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from fastapi import APIRouter, Request, Response, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import asyncio
 import logging
 
 from app.utils.auth import verify_token
@@ -18,25 +19,61 @@ class EventResponse(BaseModel):
     timestamp: str
     detections: List[dict]
     image_url: Optional[str]
+    # Small preview for lists; older events without one fall back to the full image
+    thumbnail_url: Optional[str] = None
     alert: bool
 
 
 @router.get("/events", response_model=List[EventResponse])
 async def get_events(
     request: Request,
+    response: Response,
     user_id: str = Depends(verify_token),
     limit: int = Query(50, ge=1, le=100),
-    alert_only: bool = Query(False)
+    alert_only: bool = Query(False),
+    start_after: Optional[str] = Query(None, description="event_id of the last event of the previous page"),
+    camera_id: Optional[str] = Query(None),
+    history: bool = Query(False, description="page through Firestore, e.g. for events older than the local store")
 ):
   
     try:
         firebase_service = request.app.state.firebase_service
+        event_cache = request.app.state.event_cache
+        event_store = request.app.state.event_store
         
-        events = firebase_service.get_events(
-            user_id=user_id,
-            limit=limit,
-            alert_only=alert_only
-        )
+        async def load_firestore(cursor: Optional[str], count: int):
+            def load():
+                # Firestore client is blocking, keep it off the event loop
+                return asyncio.to_thread(
+                    firebase_service.get_events,
+                    user_id=user_id,
+                    limit=count,
+                    alert_only=alert_only,
+                    start_after=cursor
+                )
+            if event_cache is not None:
+                return await event_cache.get((user_id, count, alert_only, cursor or ""), load)
+            return await load()
+        
+        local = event_store is not None and not history
+        if local and start_after and camera_id is None and firebase_service is not None:
+            # A cursor this store never saw came from a Firestore page: keep paging there
+            local = event_store.get(start_after, user_id) is not None
+        
+        if local:
+            # Indexed local read, well under a millisecond - no thread hop or cache needed
+            # Short pages are the end of the local history; older events need history=true
+            events = event_store.query(user_id, limit, alert_only, start_after, camera_id)
+        elif camera_id is not None:
+            raise HTTPException(status_code=400, detail="camera_id filter needs the local event store")
+        elif firebase_service is None:
+            events = []
+        else:
+            events = await load_firestore(start_after, limit)
+        
+        if len(events) == limit:
+            # Pass back as ?start_after= to get the next page
+            response.headers["X-Next-Cursor"] = events[-1]['id']
         
         return [
             EventResponse(
@@ -45,10 +82,13 @@ async def get_events(
                 timestamp=event['timestamp'],
                 detections=event.get('detections', []),
                 image_url=event.get('image_url'),
+                thumbnail_url=event.get('thumbnail_url') or event.get('image_url'),
                 alert=event.get('alert', False)
             )
             for event in events
         ]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Event retrieval error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -62,7 +102,11 @@ async def get_event(
 ):
     try:
         firebase_service = request.app.state.firebase_service
-        event = firebase_service.get_event_by_id(event_id, user_id)
+        event_store = request.app.state.event_store
+        event = event_store.get(event_id, user_id) if event_store is not None else None
+        if event is None and firebase_service is not None:
+            # Older events (or ones saved by another instance) only exist in Firestore
+            event = await asyncio.to_thread(firebase_service.get_event_by_id, event_id, user_id)
         
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
@@ -73,6 +117,7 @@ async def get_event(
             timestamp=event['timestamp'],
             detections=event.get('detections', []),
             image_url=event.get('image_url'),
+            thumbnail_url=event.get('thumbnail_url') or event.get('image_url'),
             alert=event.get('alert', False)
         )
     except HTTPException:
@@ -0,0 +1,124 @@
+
+from fastapi import APIRouter, WebSocket, HTTPException, Query, status
+from typing import Optional
+import asyncio
+import logging
+
+from app.routes.detect import process_frame
+from app.services.inference_executor import ExecutorSaturatedError
+from app.utils.auth import verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.websocket("/ws/ingest/{camera_id}")
+async def ingest_frames(
+    websocket: WebSocket,
+    camera_id: str,
+    token: Optional[str] = Query(None)
+):
+    """
+    Persistent camera stream: authenticate once, then push raw JPEG frames as
+    binary messages and get detection results back on the same socket.
+
+    Only the newest unprocessed frame is kept per connection; if a camera sends
+    faster than the pipeline keeps up, older waiting frames are dropped.
+    """
+    authorization = websocket.headers.get("authorization")
+    if authorization is None and token is not None:
+        authorization = f"Bearer {token}"
+
+    try:
+        user_id = await verify_token(authorization)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    await websocket.send_json({"type": "ready", "camera_id": camera_id})
+    logger.info(f"Camera {camera_id} connected for ingest (user {user_id})")
+
+    latest: Optional[tuple] = None
+    frame_ready = asyncio.Event()
+    counters = {"received": 0, "processed": 0, "dropped": 0}
+
+    async def receive_frames():
+        nonlocal latest
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            data = message.get("bytes")
+            if data is None:
+                # Text messages are treated as keepalives
+                continue
+
+            counters["received"] += 1
+            if latest is not None:
+                counters["dropped"] += 1
+            latest = (counters["received"], data)
+            frame_ready.set()
+
+    async def send(message: dict) -> bool:
+        # A failed send would otherwise end the processor silently and leave the camera waiting
+        try:
+            await websocket.send_json(message)
+            return True
+        except Exception as e:
+            logger.error(f"Ingest send failed ({camera_id}), closing: {str(e)}")
+            try:
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            except Exception:
+                pass
+            return False
+
+    async def process_frames():
+        nonlocal latest
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            if latest is None:
+                continue
+            seq, contents = latest
+            latest = None
+
+            try:
+                response = await process_frame(websocket.app, contents, user_id, camera_id)
+                counters["processed"] += 1
+                message = {
+                    "type": "detection",
+                    "frame": seq,
+                    "dropped": counters["dropped"],
+                    "data": response.dict()
+                }
+            except ExecutorSaturatedError as e:
+                counters["dropped"] += 1
+                message = {"type": "busy", "frame": seq, "retry_after": e.retry_after}
+            except HTTPException as e:
+                message = {
+                    "type": "error",
+                    "frame": seq,
+                    "status_code": e.status_code,
+                    "detail": e.detail
+                }
+            except Exception as e:
+                logger.error(f"Ingest error ({camera_id}): {str(e)}", exc_info=True)
+                message = {"type": "error", "frame": seq, "status_code": 500, "detail": str(e)}
+
+            if not await send(message):
+                return
+
+    processor = asyncio.create_task(process_frames())
+    try:
+        await receive_frames()
+    except Exception as e:
+        logger.error(f"Ingest connection error ({camera_id}): {str(e)}")
+    finally:
+        processor.cancel()
+        try:
+            await processor
+        except (asyncio.CancelledError, Exception):
+            pass
+        logger.info(f"Camera {camera_id} disconnected from ingest: {counters}")
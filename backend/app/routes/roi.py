@@ -16,6 +16,14 @@ class ROI(BaseModel):
     width: int
     height: int
     name: Optional[str] = "default"
+    # Optional polygon [[x, y], ...]; x/y/width/height is then its bounding box
+    points: Optional[List[List[int]]] = None
+    # None applies the ROI to every camera of the user
+    camera_id: Optional[str] = None
+    # Size of the frame the coordinates were drawn on; without it they are
+    # taken as pixels of the camera's native (uploaded) resolution
+    frame_width: Optional[int] = None
+    frame_height: Optional[int] = None
 
 
 class ROIResponse(BaseModel):
@@ -41,11 +49,19 @@ async def create_roi(
             "width": roi.width,
             "height": roi.height,
             "name": roi.name,
+            "points": roi.points,
+            "camera_id": roi.camera_id,
+            "frame_width": roi.frame_width,
+            "frame_height": roi.frame_height,
             "active": True
         }
         
         roi_id = firebase_service.save_roi(roi_data)
         
+        roi_cache = request.app.state.roi_cache
+        if roi_cache is not None:
+            roi_cache.put(user_id, roi_id, roi_data)
+        
         return ROIResponse(
             roi_id=roi_id,
             user_id=user_id,
@@ -63,14 +79,20 @@ async def get_rois(
     user_id: str = Depends(verify_token)
 ):
     try:
-        firebase_service = request.app.state.firebase_service
-        rois = firebase_service.get_user_rois(user_id)
+        roi_cache = request.app.state.roi_cache
+        if roi_cache is not None:
+            rois = roi_cache.get_rois(user_id)
+        else:
+            rois = request.app.state.firebase_service.get_user_rois(user_id)
         
         return [
             ROIResponse(
                 roi_id=roi_data['id'],
                 user_id=user_id,
-                roi=ROI(**{k: v for k, v in roi_data.items() if k in ['x', 'y', 'width', 'height', 'name']}),
+                roi=ROI(**{
+                    k: v for k, v in roi_data.items()
+                    if k in ['x', 'y', 'width', 'height', 'name', 'points', 'camera_id', 'frame_width', 'frame_height']
+                }),
                 active=roi_data.get('active', True)
             )
             for roi_data in rois
@@ -90,6 +112,10 @@ async def delete_roi(
         firebase_service = request.app.state.firebase_service
         firebase_service.delete_roi(roi_id, user_id)
         
+        roi_cache = request.app.state.roi_cache
+        if roi_cache is not None:
+            roi_cache.remove(user_id, roi_id)
+        
         return {"status": "success", "roi_id": roi_id}
     except Exception as e:
         logger.error(f"ROI deletion error: {str(e)}")
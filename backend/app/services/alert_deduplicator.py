@@ -0,0 +1,165 @@
+
+import logging
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AlertEntry:
+    """One (user, camera, identity, region) sighting that is currently open"""
+
+    def __init__(self, key: Tuple, now: float, timestamp: str):
+        self.key = key
+        self.first_seen = now
+        self.last_seen = now
+        self.last_seen_at = timestamp
+        self.count = 1
+        self.event_id: Optional[str] = None
+        self.image_url: Optional[str] = None
+        self.flushed_at = now
+        self.dirty = False
+
+
+class AlertDecision:
+
+    def __init__(self, action: str, entries: List[AlertEntry]):
+        self.action = action  # "open", "escalate" or "suppress"
+        self.entries = entries
+
+    @property
+    def should_upload(self) -> bool:
+        return self.action in ("open", "escalate")
+
+    @property
+    def image_url(self) -> Optional[str]:
+        for entry in self.entries:
+            if entry.image_url:
+                return entry.image_url
+        return None
+
+
+class AlertDeduplicator:
+    """
+    Collapses repeated detections of the same person in the same place into
+    one event. A frame only opens a new event (upload + save + broadcast)
+    when it contains a camera/identity/region key that is not already open;
+    otherwise the open entries just get their `count` / `last_seen` bumped.
+    Entries close after `cooldown_seconds` without a sighting.
+    """
+
+    def __init__(
+        self,
+        cooldown_seconds: float = 60.0,
+        region_grid: int = 3,
+        update_interval_seconds: float = 15.0
+    ):
+        self.cooldown_seconds = cooldown_seconds
+        self.region_grid = max(1, region_grid)
+        self.update_interval_seconds = update_interval_seconds
+        self._entries: Dict[Tuple, AlertEntry] = {}
+        self._closed: List[AlertEntry] = []
+
+        self.frames = 0
+        self.opened = 0
+        self.escalated = 0
+        self.suppressed = 0
+
+    def _region(self, bbox: List[float], frame_shape: Tuple[int, ...]) -> Tuple[int, int]:
+        h, w = frame_shape[:2]
+        cx = (bbox[0] + bbox[2]) / 2
+        cy = (bbox[1] + bbox[3]) / 2
+        col = min(self.region_grid - 1, max(0, int(cx * self.region_grid / max(w, 1))))
+        row = min(self.region_grid - 1, max(0, int(cy * self.region_grid / max(h, 1))))
+        return row, col
+
+    def _key(self, user_id: str, camera_id: str, det: Dict, frame_shape: Tuple[int, ...]) -> Tuple:
+        # All unrecognised people share one identity so 'no_face'/'unknown' flicker is not a new event
+        identity = "unknown" if det.get('alert', True) else det.get('face_id', 'unknown')
+        return (user_id, camera_id, identity, self._region(det['bbox'], frame_shape))
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if now - e.last_seen > self.cooldown_seconds]
+        for key in expired:
+            entry = self._entries.pop(key)
+            # Keep the final count of a closing event so it still gets written
+            if entry.event_id is not None and entry.dirty:
+                self._closed.append(entry)
+
+    def observe(
+        self,
+        user_id: str,
+        camera_id: str,
+        detections: List[Dict],
+        frame_shape: Tuple[int, ...],
+        timestamp: str
+    ) -> AlertDecision:
+        now = monotonic()
+        self._expire(now)
+        self.frames += 1
+
+        keys = {self._key(user_id, camera_id, det, frame_shape) for det in detections}
+        camera_active = any(k[0] == user_id and k[1] == camera_id for k in self._entries)
+        new_keys = [k for k in keys if k not in self._entries]
+
+        entries = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = AlertEntry(key, now, timestamp)
+                self._entries[key] = entry
+            else:
+                entry.count += 1
+                entry.last_seen = now
+                entry.last_seen_at = timestamp
+                entry.dirty = True
+            entries.append(entry)
+
+        if not new_keys:
+            self.suppressed += 1
+            return AlertDecision("suppress", entries)
+
+        if camera_active:
+            self.escalated += 1
+            return AlertDecision("escalate", entries)
+
+        self.opened += 1
+        return AlertDecision("open", entries)
+
+    def attach(self, entries: List[AlertEntry], event_id: str, image_url: Optional[str]):
+        """Links entries to the stored event once the background save finished"""
+        for entry in entries:
+            if entry.event_id is None:
+                entry.event_id = event_id
+                entry.image_url = image_url
+
+    def pending_updates(self) -> List[Tuple[str, Dict]]:
+        """Running count / last_seen updates that are due, at most one per event per interval"""
+        now = monotonic()
+        self._expire(now)
+        updates: Dict[str, Dict] = {}
+
+        closed, self._closed = self._closed, []
+        for entry in closed + list(self._entries.values()):
+            if entry.event_id is None or not entry.dirty:
+                continue
+            if entry not in closed and now - entry.flushed_at < self.update_interval_seconds:
+                continue
+
+            fields = updates.setdefault(entry.event_id, {"count": 0, "last_seen": entry.last_seen_at})
+            fields["count"] = max(fields["count"], entry.count)
+            fields["last_seen"] = max(fields["last_seen"], entry.last_seen_at)
+            entry.dirty = False
+            entry.flushed_at = now
+
+        return list(updates.items())
+
+    def stats(self) -> Dict:
+        return {
+            "frames": self.frames,
+            "opened": self.opened,
+            "escalated": self.escalated,
+            "suppressed": self.suppressed,
+            "open_entries": len(self._entries),
+            "upload_ratio": (self.opened + self.escalated) / self.frames if self.frames else 0.0,
+        }
@@ -0,0 +1,265 @@
+
+import glob
+import inspect
+import logging
+import os
+import tempfile
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+# eager = PyTorch module, torchscript = frozen TorchScript, onnx = ONNX Runtime fp32,
+# int8 = ONNX Runtime static int8 (QDQ) calibrated on enrollment face crops
+ARCFACE_BACKENDS = ("eager", "torchscript", "onnx", "int8")
+
+INPUT_SIZE = 112
+
+CALIBRATION_IMAGES = 100
+
+
+def artifact_path(model_path: str, backend: str) -> str:
+    """Where the converted model for `backend` is cached (next to the source weights)"""
+    base = os.path.splitext(model_path)[0]
+    if backend == "eager":
+        return model_path
+    if backend == "torchscript":
+        return f"{base}.torchscript.pt"
+    if backend == "onnx":
+        return f"{base}.onnx"
+    if backend == "int8":
+        return f"{base}_int8.onnx"
+    raise ValueError(f"Unknown ArcFace backend: {backend} (expected one of {ARCFACE_BACKENDS})")
+
+
+def _is_fresh(target: str, source: str) -> bool:
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def _replace(source: str, target: str):
+    # Rename into place so concurrent workers never load a half-written artifact
+    os.replace(source, target)
+
+
+def preprocess_faces(face_images: List[np.ndarray]) -> np.ndarray:
+    """BGR face crops -> N x 3 x 112 x 112 float32 RGB in [0, 1]"""
+    faces_rgb = np.stack([
+        cv2.cvtColor(cv2.resize(face, (INPUT_SIZE, INPUT_SIZE)), cv2.COLOR_BGR2RGB)
+        for face in face_images
+    ])
+    return np.ascontiguousarray(faces_rgb.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+
+class TorchRunner:
+    """Eager or TorchScript module behind the numpy-in / numpy-out runner interface"""
+
+    def __init__(self, module, device):
+        self.module = module.to(device).eval()
+        self.device = device
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return self.module(torch.from_numpy(batch).to(self.device)).cpu().numpy()
+
+
+class OnnxRunner:
+
+    def __init__(self, path: str):
+        import onnxruntime
+
+        # Follow the process's CPU budget instead of ORT's default of one thread per core
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+def build_eager_model(model_path: Optional[str], embedding_size: int = 128, device: str = "cpu"):
+    """ArcFaceModel with the trained weights (untrained without model_path), no pretrained download"""
+    from app.services.face_recognizer import ArcFaceModel
+
+    model = ArcFaceModel(embedding_size)
+    if model_path:
+        model.load_state_dict(torch.load(model_path, map_location=device))
+    return model.to(device).eval()
+
+
+def _temp_artifact(target: str, suffix: str) -> str:
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix, dir=os.path.dirname(target) or ".")
+    os.close(fd)
+    return tmp_path
+
+
+def export_torchscript(model_path: str, target: str, embedding_size: int = 128):
+    """
+    Traces the eager model and freezes it (weights become constants, conv +
+    BN are folded). Loading the result needs neither torchvision nor the
+    Python model code. optimize_for_inference is not applied: the MKLDNN
+    ops it inserts do not survive torch.jit.save / load.
+    """
+    model = build_eager_model(model_path, embedding_size)
+    example = torch.zeros(2, 3, INPUT_SIZE, INPUT_SIZE)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        frozen = torch.jit.freeze(traced)
+
+    tmp_path = _temp_artifact(target, ".pt")
+    try:
+        torch.jit.save(frozen, tmp_path)
+        _replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def export_onnx(model_path: str, target: str, embedding_size: int = 128):
+    """fp32 ONNX with a dynamic batch axis; BN is folded by the exporter / ORT graph optimizer"""
+    model = build_eager_model(model_path, embedding_size)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter; the TorchScript one needs no extra deps
+        kwargs["dynamo"] = False
+
+    tmp_path = _temp_artifact(target, ".onnx")
+    try:
+        torch.onnx.export(
+            model,
+            torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE),
+            tmp_path,
+            input_names=["input"],
+            output_names=["embedding"],
+            dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}},
+            opset_version=17,
+            **kwargs
+        )
+        _replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def calibration_faces(calibration_dir: Optional[str], limit: int = CALIBRATION_IMAGES) -> List[np.ndarray]:
+    """Largest face of each dataset image (whole image if none is found), same crops enrollment uses"""
+    from app.services.face_detector import FaceDetector
+
+    if not calibration_dir or not os.path.isdir(calibration_dir):
+        return []
+    paths = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        paths.extend(glob.glob(os.path.join(calibration_dir, "**", pattern), recursive=True))
+
+    detector = FaceDetector("haar")
+    faces = []
+    for path in sorted(paths)[:limit]:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        boxes = detector.detect(image)
+        if len(boxes):
+            x, y, w, h = (int(v) for v in boxes[np.argmax(boxes[:, 2] * boxes[:, 3]), :4])
+            image = image[max(y, 0):y + h, max(x, 0):x + w]
+        if image.size:
+            faces.append(image)
+    return faces
+
+
+def quantize_onnx_int8(fp32_path: str, target: str, calibration_dir: Optional[str]):
+    """
+    Static int8 (QDQ) quantization for ONNX Runtime, calibrated on the
+    enrollment face crops. Dynamic quantization would only cover the final
+    Gemm, so a conv net like ResNet50 gets nothing from it.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    faces = calibration_faces(calibration_dir)
+    if not faces:
+        raise RuntimeError(f"int8 ArcFace backend needs calibration images, none found in {calibration_dir}")
+
+    class FaceReader(CalibrationDataReader):
+
+        def __init__(self):
+            self._batches: Iterator[dict] = ({"input": preprocess_faces([face])} for face in faces)
+
+        def get_next(self):
+            return next(self._batches, None)
+
+    tmp_path = _temp_artifact(target, ".onnx")
+    prepared_path = _temp_artifact(target, ".onnx")
+    try:
+        # Folds BN into the convs and infers shapes so every conv gets quantized with its bias
+        quant_pre_process(fp32_path, prepared_path)
+        quantize_static(
+            prepared_path,
+            tmp_path,
+            FaceReader(),
+            quant_format=QuantFormat.QDQ,
+            op_types_to_quantize=["Conv", "Gemm"],
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8
+        )
+        _replace(tmp_path, target)
+    finally:
+        for path in (tmp_path, prepared_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    logger.info(f"Calibrated int8 ArcFace on {len(faces)} face crops")
+
+
+def prepare_arcface_artifact(
+    model_path: str,
+    backend: str = "torchscript",
+    embedding_size: int = 128,
+    calibration_dir: Optional[str] = None
+) -> str:
+    """Returns the artifact for `backend`, exporting and caching it on first use"""
+    target = artifact_path(model_path, backend)
+    if backend == "eager":
+        return target
+
+    if _is_fresh(target, model_path):
+        logger.info(f"Using cached {backend} ArcFace artifact: {target}")
+        return target
+
+    logger.info(f"Exporting ArcFace model to {backend} ({target})...")
+    if backend == "torchscript":
+        export_torchscript(model_path, target, embedding_size)
+    elif backend == "onnx":
+        export_onnx(model_path, target, embedding_size)
+    elif backend == "int8":
+        fp32_path = prepare_arcface_artifact(model_path, "onnx", embedding_size)
+        quantize_onnx_int8(fp32_path, target, calibration_dir)
+
+    logger.info(f"ArcFace {backend} artifact ready: {target}")
+    return target
+
+
+def load_arcface(
+    model_path: Optional[str],
+    backend: str = "torchscript",
+    embedding_size: int = 128,
+    device: str = "cpu",
+    calibration_dir: Optional[str] = None
+):
+    """Runner (float32 NCHW batch -> (N, embedding_size) array) for the requested backend"""
+    if backend == "eager" or not model_path:
+        return TorchRunner(build_eager_model(model_path, embedding_size, device), device)
+
+    artifact = prepare_arcface_artifact(model_path, backend, embedding_size, calibration_dir)
+    if backend == "torchscript":
+        return TorchRunner(torch.jit.load(artifact, map_location=device), device)
+    return OnnxRunner(artifact)
@@ -0,0 +1,174 @@
+
+import asyncio
+import logging
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BatchStats:
+    """Running counters used to tune batch size / wait against throughput"""
+
+    def __init__(self):
+        self.batches = 0
+        self.frames = 0
+        self.max_batch_size = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_inference_time = 0.0
+        self.failed_batches = 0
+
+    def record(self, batch_size: int, queue_waits: List[float], inference_time: float):
+        self.batches += 1
+        self.frames += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.batch_size_histogram[batch_size] = self.batch_size_histogram.get(batch_size, 0) + 1
+        self.total_queue_wait += sum(queue_waits)
+        self.max_queue_wait = max(self.max_queue_wait, max(queue_waits))
+        self.total_inference_time += inference_time
+
+    def snapshot(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.frames / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.frames if self.frames else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_queue_wait,
+            "avg_inference_ms": 1000 * self.total_inference_time / self.batches if self.batches else 0.0,
+        }
+
+
+class BatchScheduler:
+    """
+    Collects frames from concurrent requests for up to `max_wait_ms` and runs
+    them through a single batched YOLO call. Each caller gets its own detections back.
+
+    Frames may ask for a smaller input size (ROI crops); a collected batch is
+    split into one model call per distinct `imgsz`.
+    """
+
+    def __init__(
+        self,
+        detector,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        confidence_threshold: float = 0.5,
+        executor=None
+    ):
+        self.detector = detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.confidence_threshold = confidence_threshold
+        self.executor = executor
+        self.stats = BatchStats()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"BatchScheduler started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.1f})"
+        )
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Fail whatever is still waiting so no request hangs on shutdown
+        while not self._queue.empty():
+            _, _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("BatchScheduler stopped"))
+        logger.info("BatchScheduler stopped")
+
+    async def submit(self, image: np.ndarray, imgsz: Optional[int] = None) -> np.ndarray:
+        """`imgsz` overrides the detector's input size (None = its default)"""
+        if self._task is None:
+            raise RuntimeError("BatchScheduler is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, imgsz, future, perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Take what is already queued without waiting
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # One model call per input size, in order of first arrival
+            groups: Dict[Optional[int], List] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for imgsz, group in groups.items():
+                await self._run_batch(group, imgsz)
+
+    async def _run_batch(
+        self,
+        batch: List[Tuple[np.ndarray, Optional[int], asyncio.Future, float]],
+        imgsz: Optional[int] = None
+    ):
+        # Skip callers that gave up (e.g. client disconnected) before the batch ran
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+
+        images = [item[0] for item in batch]
+        started = perf_counter()
+        queue_waits = [started - item[3] for item in batch]
+
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(
+                    self.detector.detect_persons_batch, images, self.confidence_threshold, imgsz
+                )
+            else:
+                results = await asyncio.to_thread(
+                    self.detector.detect_persons_batch, images, self.confidence_threshold, imgsz
+                )
+        except Exception as e:
+            self.stats.failed_batches += 1
+            logger.error(f"Batched detection failed: {str(e)}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats.record(len(batch), queue_waits, perf_counter() - started)
+
+        for (_, _, future, _), detections in zip(batch, results):
+            if not future.done():
+                future.set_result(detections)
@@ -0,0 +1,123 @@
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Native thread pools that size themselves to all cores unless told otherwise
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CpuBudget:
+    """
+    One CPU budget for the whole backend instead of PyTorch, OpenCV, ONNX
+    Runtime and every worker each assuming they own all cores.
+
+    The cores are split into one contiguous slice per inference worker.
+    In "process" / "shm" mode each worker process gets its slice size as
+    intra-op threads and can be pinned to it. In "thread" mode
+    (`in_process`) the workers are threads sharing this process's single
+    torch / OpenCV pool, which can only be sized process-wide, so the
+    process gets all worker slices together (capped at the core count).
+
+    The OMP / MKL / OpenBLAS variables are read once, when those libraries
+    load, so `apply_env` must run before torch and cv2 are first imported
+    (app.main does it at the top; worker processes inherit the variables).
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        cores: int = 0,
+        threads_per_worker: int = 0,
+        opencv_threads: int = 0,
+        pin: bool = False,
+        in_process: bool = False
+    ):
+        usable = available_cores()
+        self.cores = usable[:cores] if 0 < cores <= len(usable) else usable
+        self.workers = max(1, workers)
+        self.threads_per_worker = threads_per_worker or max(1, len(self.cores) // self.workers)
+        self.in_process = in_process
+        self.process_threads = (
+            min(len(self.cores), self.threads_per_worker * self.workers) if in_process
+            else self.threads_per_worker
+        )
+        self.opencv_threads = opencv_threads or self.process_threads
+        self.pin = pin
+
+    def worker_cores(self, index: int) -> List[int]:
+        """Core slice of worker `index`; slices wrap around when workers x threads > cores"""
+        n = len(self.cores)
+        start = (index * self.threads_per_worker) % n
+        return [self.cores[(start + i) % n] for i in range(min(self.threads_per_worker, n))]
+
+    def apply_env(self):
+        """Sets the native thread pool variables; only libraries loaded after this see them"""
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(self.process_threads)
+
+    def apply(self, worker_index: Optional[int] = None):
+        """Applies the budget to the current process (call before models are built)"""
+        # Still covers libraries loaded lazily later (e.g. onnxruntime)
+        self.apply_env()
+
+        import cv2
+        import torch
+
+        torch.set_num_threads(self.process_threads)
+        try:
+            # Inter-op parallelism only multiplies threads for these single-graph models
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Can only be set before the first parallel op in this process
+            pass
+        cv2.setNumThreads(self.opencv_threads)
+
+        if self.pin and hasattr(os, "sched_setaffinity"):
+            cores = self.worker_cores(worker_index) if worker_index is not None else self.cores
+            os.sched_setaffinity(0, cores)
+
+        logger.info(
+            f"CPU budget applied (worker={worker_index}, threads={self.process_threads}, "
+            f"opencv={self.opencv_threads}, pinned={self.pin})"
+        )
+
+    def as_args(self) -> Dict:
+        """Constructor kwargs, so worker processes can rebuild the same budget"""
+        return {
+            "workers": self.workers,
+            "cores": len(self.cores),
+            "threads_per_worker": self.threads_per_worker,
+            "opencv_threads": self.opencv_threads,
+            "pin": self.pin,
+            "in_process": self.in_process,
+        }
+
+    def describe(self) -> Dict:
+        import cv2
+        import torch
+
+        return {
+            "cores": self.cores,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "process_threads": self.process_threads,
+            "opencv_threads": self.opencv_threads,
+            "pin": self.pin,
+            "worker_cores": [self.worker_cores(i) for i in range(self.workers)] if self.pin else None,
+            # What the libraries actually report in this process
+            "effective": {
+                "torch_threads": torch.get_num_threads(),
+                "torch_interop_threads": torch.get_num_interop_threads(),
+                "opencv_threads": cv2.getNumThreads(),
+                "affinity": available_cores(),
+            },
+        }
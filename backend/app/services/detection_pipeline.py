@@ -0,0 +1,234 @@
+
+import math
+import numpy as np
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.services.face_detector import assign_faces
+from app.services.roi_geometry import RoiSet
+from app.services.tracker import DEFAULT_CAMERA_KEY, CameraKey, TrackerRegistry
+from app.services.vision_utils import VisionPreprocessor
+from app.services.yolo_detector import PERSON_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionPipeline:
+    """
+    CPU-bound part of /api/detect: night enhancement, YOLO person detection
+    and face recognition. Every stage is synchronous so it can run on an
+    inference worker instead of the event loop.
+
+    With a tracker, each person gets a stable track_id per (user, camera) and face
+    recognition only re-runs for new / still-unknown / expired tracks. Faces
+    are detected once per frame and handed to person boxes by containment.
+    """
+
+    def __init__(
+        self,
+        yolo_detector,
+        face_recognizer=None,
+        confidence_threshold: float = 0.5,
+        face_threshold: float = 0.6,
+        tracker: Optional[TrackerRegistry] = None
+    ):
+        self.yolo_detector = yolo_detector
+        self.face_recognizer = face_recognizer
+        self.confidence_threshold = confidence_threshold
+        self.face_threshold = face_threshold
+        self.tracker = tracker
+        self.preprocessor = VisionPreprocessor()
+
+    def enhance(self, image: np.ndarray) -> np.ndarray:
+        return self.preprocessor.enhance_for_night(image)
+
+    def detect(self, image: np.ndarray, roi_set: Optional[RoiSet] = None) -> np.ndarray:
+        if roi_set is None:
+            return self.yolo_detector.detect_persons(image, self.confidence_threshold)
+
+        # Only look at the ROI crop(s); outside the ROIs nothing can raise an alert
+        crops, boxes, imgsz = self.roi_crops(image, roi_set)
+        if not crops:
+            return np.empty(0, dtype=PERSON_DTYPE)
+        results = self.yolo_detector.detect_persons_batch(crops, self.confidence_threshold, imgsz=imgsz)
+        return self.merge_roi_detections(image, roi_set, boxes, results)
+
+    def roi_crops(self, image: np.ndarray, roi_set: RoiSet) -> Tuple[List[np.ndarray], List, int]:
+        """The crops to run YOLO on, their boxes and the input size they share"""
+        boxes = roi_set.for_frame(image.shape).crop_boxes(image.shape)
+        if not boxes:
+            return [], [], self.yolo_detector.imgsz
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes]
+        return crops, boxes, self._crop_imgsz(image, boxes)
+
+    def merge_roi_detections(
+        self,
+        image: np.ndarray,
+        roi_set: RoiSet,
+        boxes: List,
+        results: List[np.ndarray]
+    ) -> np.ndarray:
+        """Maps per-crop detections back to frame pixels and keeps those inside an ROI"""
+        if not results:
+            return np.empty(0, dtype=PERSON_DTYPE)
+        for result, (x1, y1, _, _) in zip(results, boxes):
+            result['bbox'] += np.array([x1, y1, x1, y1], dtype=np.float32)
+        detections = np.concatenate(results)
+        return detections[roi_set.for_frame(image.shape).contains(detections['bbox'], image.shape)]
+
+    def _crop_imgsz(self, image: np.ndarray, boxes: List) -> int:
+        # Keep the full-frame pixel scale so a small crop costs proportionally
+        # less instead of being upscaled to the model's full input size
+        imgsz = self.yolo_detector.imgsz
+        scale = imgsz / max(image.shape[:2])
+        longest = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in boxes)
+        return min(imgsz, max(32, math.ceil(longest * scale / 32) * 32))
+
+    def recognize(
+        self,
+        image: np.ndarray,
+        person_detections: np.ndarray,
+        camera_key: CameraKey = DEFAULT_CAMERA_KEY
+    ) -> List[Dict]:
+        """person_detections is the structured (bbox, confidence) array from YoloDetector"""
+
+        bboxes = person_detections['bbox']
+        valid = (bboxes[:, 2] > bboxes[:, 0]) & (bboxes[:, 3] > bboxes[:, 1])
+        bboxes = bboxes[valid].tolist()
+        confidences = person_detections['confidence'][valid].tolist()
+
+        if self.tracker is not None:
+            tracks = self.tracker.update(camera_key, bboxes)
+        else:
+            tracks = [None] * len(bboxes)
+
+        ttl = self.tracker.identity_ttl_seconds if self.tracker is not None else None
+        pending = [
+            i for i, track in enumerate(tracks)
+            if track is None or track.needs_recognition(ttl)
+        ]
+        identities = dict(zip(pending, self._recognize_persons(image, [bboxes[i] for i in pending])))
+
+        detections = []
+        run = reused = 0
+
+        for i, (bbox, confidence, track) in enumerate(zip(bboxes, confidences, tracks)):
+
+            if i not in identities:
+                # Same person as in earlier frames, reuse the cached identity
+                face_id = track.identity
+                is_known = track.is_known
+                reused += 1
+            else:
+                face_id, is_known = identities[i]
+                if track is not None:
+                    track.set_identity(face_id, is_known)
+                    run += 1
+
+            detections.append({
+                'label': "person",
+                'confidence': confidence,
+                'bbox': bbox,
+                'face_id': face_id,
+                'alert': not is_known,
+                'track_id': track.track_id if track is not None else None
+            })
+
+        if self.tracker is not None:
+            self.tracker.count_recognitions(run, reused)
+
+        return detections
+
+    def _recognize_persons(self, image: np.ndarray, bboxes: List[List[float]]) -> List[Tuple[str, bool]]:
+        if self.face_recognizer is None or not bboxes:
+            return [('unknown', False)] * len(bboxes)
+
+        # One face detection pass over the (downscaled) frame, faces go to persons by containment
+        faces = self.face_recognizer.face_detector.detect(image)
+
+        identities: List[Tuple[str, bool]] = [('no_face', False)] * len(bboxes)
+        with_face = [(i, face) for i, face in enumerate(assign_faces(faces, bboxes)) if face is not None]
+        if not with_face:
+            return identities
+
+        # All faces of the frame go through ArcFace in one forward pass
+        face_images = [self.face_recognizer.crop_face(image, face) for _, face in with_face]
+        face_results = self.face_recognizer.recognize_faces_batch(face_images, self.face_threshold)
+        for (i, _), face_result in zip(with_face, face_results):
+            identities[i] = (face_result.get('identity', 'unknown'), face_result.get('is_known', False))
+
+        return identities
+
+    def run(
+        self,
+        image: np.ndarray,
+        camera_key: CameraKey = DEFAULT_CAMERA_KEY,
+        roi_set: Optional[RoiSet] = None
+    ) -> List[Dict]:
+        enhanced = self.enhance(image)
+        return self.recognize(enhanced, self.detect(enhanced, roi_set), camera_key)
+
+
+# ---- Process-pool workers ----
+# Each worker process builds its own pipeline once, so only the frame and the
+# (small) detection dicts cross the process boundary.
+
+_worker_pipeline: Optional[DetectionPipeline] = None
+# RoiSets arrive pickled without masks; keep one per ROI version so masks are built once
+_worker_roi_sets: Dict[tuple, RoiSet] = {}
+
+
+def init_worker_pipeline(
+    yolo_args: Dict,
+    arcface_args: Optional[Dict],
+    gallery,
+    confidence_threshold: float,
+    face_threshold: float,
+    tracking: Optional[Dict] = None,
+    face_detector_args: Optional[Dict] = None,
+    cpu_budget: Optional[Dict] = None,
+    worker_index: Optional[int] = None
+):
+    global _worker_pipeline
+
+    if cpu_budget is not None:
+        from app.services.cpu_budget import CpuBudget
+
+        CpuBudget(**cpu_budget).apply(worker_index)
+
+    from app.services.yolo_detector import YoloDetector
+    from app.services.face_detector import FaceDetector
+    from app.services.face_recognizer import FaceRecognizer
+
+    yolo_detector = YoloDetector(**yolo_args)
+
+    face_recognizer = None
+    if arcface_args:
+        face_recognizer = FaceRecognizer(
+            **arcface_args,
+            face_detector=FaceDetector(**(face_detector_args or {})),
+            gallery=gallery
+        )
+
+    _worker_pipeline = DetectionPipeline(
+        yolo_detector,
+        face_recognizer,
+        confidence_threshold=confidence_threshold,
+        face_threshold=face_threshold,
+        tracker=TrackerRegistry(**tracking) if tracking is not None else None
+    )
+    logger.info("Inference worker pipeline ready")
+
+
+def run_worker_pipeline(
+    image: np.ndarray,
+    camera_key: CameraKey = DEFAULT_CAMERA_KEY,
+    roi_set: Optional[RoiSet] = None
+) -> List[Dict]:
+    if _worker_pipeline is None:
+        raise RuntimeError("Inference worker was not initialized")
+    if roi_set is not None and roi_set.key is not None:
+        if roi_set.key not in _worker_roi_sets and len(_worker_roi_sets) >= 256:
+            _worker_roi_sets.clear()
+        roi_set = _worker_roi_sets.setdefault(roi_set.key, roi_set)
+    return _worker_pipeline.run(image, camera_key, roi_set)
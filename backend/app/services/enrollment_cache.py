@@ -0,0 +1,165 @@
+
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
+# (path, size, mtime_ns) - an image is only re-enrolled when one of these changes
+FileKey = Tuple[str, int, int]
+
+
+def scan_dataset(dataset_path: str) -> List[Tuple[str, FileKey]]:
+    """(identity, file key) for every image in dataset/<identity>/"""
+    files = []
+    for identity in sorted(os.listdir(dataset_path)):
+        identity_path = os.path.join(dataset_path, identity)
+        if not os.path.isdir(identity_path):
+            continue
+        for entry in sorted(os.scandir(identity_path), key=lambda e: e.name):
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                stat = entry.stat()
+                files.append((identity, (entry.path, stat.st_size, stat.st_mtime_ns)))
+    return files
+
+
+class EnrollmentCache:
+    """
+    On-disk cache of enrollment embeddings, one row per dataset image.
+
+    Rows are keyed by (path, size, mtime_ns) and the whole file is tagged
+    with the ArcFace weights / backend / face detector it was built with, so
+    a restart only embeds new or changed images and a model change rebuilds
+    everything.
+    Images without a detectable face are cached too (as a NaN row) so they
+    are not re-scanned on every boot.
+    """
+
+    def __init__(self, cache_path: str, model_tag: str):
+        self.cache_path = cache_path
+        self.model_tag = model_tag
+        self.entries: Dict[FileKey, np.ndarray] = {}
+
+    def load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if str(data["model_tag"]) != self.model_tag:
+                    logger.info("Enrollment cache was built with another model, rebuilding")
+                    return
+                keys = zip(data["paths"].tolist(), data["sizes"].tolist(), data["mtimes"].tolist())
+                self.entries = dict(zip(keys, data["embeddings"]))
+        except Exception as e:
+            logger.error(f"Enrollment cache unreadable, rebuilding: {str(e)}")
+            self.entries = {}
+
+    def save(self):
+        if not self.entries:
+            return
+        keys = list(self.entries)
+        directory = os.path.dirname(self.cache_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=directory)
+        os.close(fd)
+        try:
+            np.savez(
+                tmp_path,
+                model_tag=np.array(self.model_tag),
+                paths=np.array([k[0] for k in keys]),
+                sizes=np.array([k[1] for k in keys], dtype=np.int64),
+                mtimes=np.array([k[2] for k in keys], dtype=np.int64),
+                embeddings=np.stack([self.entries[k] for k in keys]).astype(np.float32)
+            )
+            # Rename into place so a crash never leaves a half-written cache
+            os.replace(tmp_path, self.cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def recognizer_tag(recognizer) -> str:
+    """Identifies the weights, backend and face detector settings the embeddings depend on"""
+    parts = [os.path.abspath(recognizer.model_path), getattr(recognizer, "backend", "eager")]
+    if os.path.exists(recognizer.model_path):
+        stat = os.stat(recognizer.model_path)
+        parts += [str(stat.st_size), str(stat.st_mtime_ns)]
+    detector = recognizer.face_detector
+    parts += [detector.backend, str(detector.max_dim), str(detector.score_threshold)]
+    return "|".join(parts)
+
+
+def _largest_face(recognizer, path: str) -> Optional[np.ndarray]:
+    image = cv2.imread(path)
+    if image is None:
+        return None
+    faces = recognizer.detect_faces(image)
+    if len(faces) == 0:
+        return None
+    return recognizer.crop_face(image, max(faces, key=lambda f: f[2] * f[3]))
+
+
+def enroll_from_folder(
+    recognizer,
+    dataset_path: str = "dataset",
+    cache_path: Optional[str] = None,
+    workers: int = 4
+) -> Dict[str, int]:
+    """
+    Adds every identity in dataset/<identity>/*.jpg to the recognizer's
+    gallery. Cached embeddings are reused; new images are decoded and
+    face-detected in parallel, then embedded in one batched pass.
+    """
+    files = scan_dataset(dataset_path)
+
+    cache = EnrollmentCache(cache_path, recognizer_tag(recognizer)) if cache_path else None
+    cached: Dict[FileKey, np.ndarray] = {}
+    if cache is not None:
+        cache.load()
+        cached = cache.entries
+
+    pending = [key for _, key in files if key not in cached]
+    embeddings: Dict[FileKey, np.ndarray] = {key: cached[key] for _, key in files if key in cached}
+
+    if pending:
+        # cv2 decode + face detection release the GIL, so threads run them in parallel
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            faces = list(pool.map(lambda key: _largest_face(recognizer, key[0]), pending))
+
+        with_face = [(key, face) for key, face in zip(pending, faces) if face is not None and face.size]
+        vectors = recognizer.extract_embeddings_batch([face for _, face in with_face])
+        no_face = np.full(recognizer.embedding_size, np.nan, dtype=np.float32)
+        for key in pending:
+            embeddings[key] = no_face
+        for (key, _), vector in zip(with_face, vectors):
+            embeddings[key] = vector
+        for key, face in zip(pending, faces):
+            if face is None:
+                logger.warning(f"No face detected in {key[0]}")
+
+    if cache is not None and (pending or len(cached) != len(embeddings)):
+        # Keep only files that still exist
+        cache.entries = embeddings
+        cache.save()
+
+    by_identity: Dict[str, List[np.ndarray]] = {}
+    for identity, key in files:
+        vector = embeddings[key]
+        if not np.isnan(vector).any():
+            by_identity.setdefault(identity, []).append(vector)
+
+    for identity, vectors in by_identity.items():
+        recognizer.gallery.add(identity, np.stack(vectors))
+
+    logger.info(
+        f"Enrolled {len(by_identity)} identities from {len(files)} images "
+        f"({len(files) - len(pending)} cached, {len(pending)} new)"
+    )
+    return {identity: len(vectors) for identity, vectors in by_identity.items()}
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, limit, alert_only, start_after)
+QueryKey = Tuple[str, int, bool, str]
+
+
+class EventQueryCache:
+    """
+    Short-TTL read-through cache for /api/events pages.
+
+    Dashboards poll the same first page every few seconds; within
+    `ttl_seconds` those polls are served from memory, and concurrent misses
+    for the same page share one Firestore query. The EventWriter calls
+    `on_events_committed` after every WriteBatch, which drops the cached
+    pages of each user that got a new event. Count / last_seen updates of
+    existing events are not tracked and show up once the TTL expires.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+        self._entries: "OrderedDict[QueryKey, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._user_keys: Dict[str, Set[QueryKey]] = {}
+        self._loading: Dict[QueryKey, asyncio.Future] = {}
+        # Bumped on invalidation so a query that started before a write is not cached after it
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get(self, key: QueryKey, loader: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > monotonic():
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            self.coalesced += 1
+            return await asyncio.shield(loading)
+
+        self.misses += 1
+        user_id = key[0]
+        generation = self._generations.get(user_id, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            events = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Only waiters see it; do not log "exception never retrieved" when there are none
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(key, None)
+        future.set_result(events)
+
+        if self._generations.get(user_id, 0) == generation:
+            self._store(key, events)
+        return events
+
+    def _store(self, key: QueryKey, events: List[Dict]):
+        self._entries[key] = (monotonic() + self.ttl_seconds, events)
+        self._entries.move_to_end(key)
+        self._user_keys.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            user_keys = self._user_keys.get(old_key[0])
+            if user_keys is not None:
+                user_keys.discard(old_key)
+                if not user_keys:
+                    del self._user_keys[old_key[0]]
+
+    def invalidate(self, user_id: str):
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        for key in self._user_keys.pop(user_id, ()):
+            self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def on_events_committed(self, writes: List[Tuple[str, str, Dict]]):
+        """EventWriter hook: new events make their user's cached pages stale"""
+        for user_id in {data.get('user_id') for op, _, data in writes if op == "set"}:
+            if user_id is not None:
+                self.invalidate(user_id)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
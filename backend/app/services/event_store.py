@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import string
+import threading
+from time import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Same shape as Firestore auto-ids, so local ids are used as Firestore document ids as-is
+EVENT_ID_ALPHABET = string.ascii_letters + string.digits
+EVENT_ID_LENGTH = 20
+
+# Queried / sorted columns are real columns; the full event is kept as JSON in `data`
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    camera_id TEXT,
+    timestamp TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    alert INTEGER NOT NULL DEFAULT 0,
+    image_url TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_user_created ON events (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS events_user_alert ON events (user_id, alert, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS events_camera ON events (camera_id, created_at DESC, id DESC);
+"""
+
+
+def new_event_id() -> str:
+    return "".join(secrets.choice(EVENT_ID_ALPHABET) for _ in range(EVENT_ID_LENGTH))
+
+
+class EventStore:
+    """
+    Local SQLite (WAL) copy of every detection event, the primary read
+    path for /api/events. Firestore is written asynchronously behind it
+    (UploadSpool -> EventWriter) and only serves events this instance has
+    never seen.
+
+    Writes go through one connection under a lock; reads use a connection
+    per thread, which WAL lets run concurrently with a write.
+    """
+
+    def __init__(self, path: str = "data/events.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        logger.info(f"EventStore opened ({path}, {self.count()} events)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- Writes ----
+
+    def add(self, event_data: Dict, event_id: Optional[str] = None) -> str:
+        """Stores a new event and returns its id (generated when not given)"""
+        event_id = event_id or new_event_id()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO events "
+                "(id, user_id, camera_id, timestamp, created_at, alert, image_url, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    event_id,
+                    event_data['user_id'],
+                    event_data.get('camera_id'),
+                    event_data['timestamp'],
+                    time(),
+                    int(bool(event_data.get('alert'))),
+                    event_data.get('image_url'),
+                    json.dumps(event_data)
+                )
+            )
+        return event_id
+
+    def update(self, event_id: str, fields: Dict):
+        """Merges `fields` into a stored event (no-op for unknown ids)"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM events WHERE id = ?", (event_id,)).fetchone()
+            if row is None:
+                return
+            data = {**json.loads(row[0]), **fields}
+            self._conn.execute(
+                "UPDATE events SET alert = ?, image_url = ?, data = ? WHERE id = ?",
+                (int(bool(data.get('alert'))), data.get('image_url'), json.dumps(data), event_id)
+            )
+
+    # ---- Reads ----
+
+    def query(
+        self,
+        user_id: str,
+        limit: int = 50,
+        alert_only: bool = False,
+        start_after: Optional[str] = None,
+        camera_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Newest first; `start_after` is the id of the last event of the previous page"""
+        conn = self._reader()
+        sql = "SELECT id, data FROM events WHERE user_id = ?"
+        params: list = [user_id]
+        if alert_only:
+            sql += " AND alert = 1"
+        if camera_id is not None:
+            sql += " AND camera_id = ?"
+            params.append(camera_id)
+        if start_after:
+            cursor = conn.execute(
+                "SELECT created_at FROM events WHERE id = ? AND user_id = ?", (start_after, user_id)
+            ).fetchone()
+            if cursor is None:
+                return []
+            sql += " AND (created_at, id) < (?, ?)"
+            params += [cursor[0], start_after]
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        return [{**json.loads(data), 'id': event_id} for event_id, data in conn.execute(sql, params)]
+
+    def get(self, event_id: str, user_id: str) -> Optional[Dict]:
+        row = self._reader().execute(
+            "SELECT data FROM events WHERE id = ? AND user_id = ?", (event_id, user_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), 'id': event_id}
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def stats(self) -> Dict:
+        return {
+            "events": self.count(),
+            "size_bytes": sum(
+                os.path.getsize(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p)
+            ),
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects WriteBatches with more operations than this
+FIRESTORE_MAX_BATCH = 500
+
+# (op, event_id, data) with op "set" (new event) or "update" (field update)
+EventWrite = Tuple[str, str, Dict]
+
+
+class EventWriterStats:
+
+    def __init__(self):
+        self.batches = 0
+        self.writes = 0
+        self.failed_batches = 0
+        self.failed_writes = 0
+        self.max_batch_size = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+
+    def record(self, batch_size: int, flush_time: float):
+        self.batches += 1
+        self.writes += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_flush_time += flush_time
+        self.max_flush_time = max(self.max_flush_time, flush_time)
+
+    def snapshot(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed_batches": self.failed_batches,
+            "failed_writes": self.failed_writes,
+            "avg_batch_size": self.writes / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_flush_ms": 1000 * self.total_flush_time / self.batches if self.batches else 0.0,
+            "max_flush_ms": 1000 * self.max_flush_time,
+        }
+
+
+class EventWriter:
+    """
+    Background writer for detection events: saves and updates are queued and
+    committed as one Firestore WriteBatch per `max_batch_size` writes or per
+    `flush_interval_ms`, whichever comes first.
+
+    Event ids are generated client-side, so `save` returns the id right away.
+    Ordering of a set and its updates is the caller's job, not the queue's:
+    the upload spool saves with `durable=True`, and only its saved-callback
+    (after the set's batch is committed) attaches the event for count updates.
+    Updates are still merged, so a stray one for an event Firestore does not
+    have yet cannot fail its batch.
+    """
+
+    def __init__(
+        self,
+        firebase_service,
+        max_batch_size: int = 100,
+        flush_interval_ms: float = 500.0,
+        max_queue: int = 10000,
+        on_commit: Optional[Callable[[List[EventWrite]], None]] = None
+    ):
+        self.firebase_service = firebase_service
+        self.max_batch_size = min(max(1, max_batch_size), FIRESTORE_MAX_BATCH)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.max_queue = max_queue
+        self.on_commit = on_commit
+        self._stats = EventWriterStats()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"EventWriter started (max_batch_size={self.max_batch_size}, "
+            f"flush_interval_ms={self.flush_interval * 1000:.0f})"
+        )
+
+    async def stop(self):
+        """Commits everything queued so far, then stops"""
+        if self._task is None:
+            return
+        # The sentinel is queued behind every pending write, so they all get committed
+        self._stopping = True
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info(f"EventWriter stopped ({self._stats.writes} writes committed)")
+
+    async def save(self, event_data: Dict, event_id: Optional[str] = None, durable: bool = False) -> str:
+        """
+        Queues a new event and returns its (final) id. Passing an existing
+        `event_id` makes retries idempotent; with `durable` the call returns
+        only after the batch holding the event is committed (and raises if
+        that commit fails).
+        """
+        event_id = event_id or self.firebase_service.new_event_id()
+        await self._put(("set", event_id, event_data), durable)
+        return event_id
+
+    async def update(self, event_id: str, fields: Dict):
+        await self._put(("update", event_id, fields))
+
+    async def _put(self, write: EventWrite, durable: bool = False):
+        if self._task is None or self._stopping:
+            raise RuntimeError("EventWriter is not running")
+        future = asyncio.get_running_loop().create_future() if durable else None
+        # Blocks only when max_queue writes are already waiting (Firestore is down or far behind)
+        await self._queue.put((write, future))
+        if future is not None:
+            await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch: List[Tuple[EventWrite, Optional[asyncio.Future]]] = [first]
+            deadline = loop.time() + self.flush_interval
+            stopping = False
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    write = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        write = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+
+            await self._commit(batch)
+            if stopping:
+                return
+
+    async def _commit(self, batch: List[Tuple[EventWrite, Optional[asyncio.Future]]]):
+        started = perf_counter()
+        try:
+            await asyncio.to_thread(self.firebase_service.commit_events, [write for write, _ in batch])
+        except Exception as e:
+            self._stats.failed_batches += 1
+            self._stats.failed_writes += len(batch)
+            logger.error(f"Event batch of {len(batch)} writes failed: {str(e)}")
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        self._stats.record(len(batch), perf_counter() - started)
+        if self.on_commit is not None:
+            # The batch is committed either way; a broken hook must not stop the writer
+            try:
+                self.on_commit([write for write, _ in batch])
+            except Exception as e:
+                logger.error(f"EventWriter on_commit hook failed: {str(e)}", exc_info=True)
+        for _, future in batch:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            **self._stats.snapshot()
+        }
@@ -0,0 +1,116 @@
+
+import os
+import threading
+import logging
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FACE_DETECTORS = ("yunet", "haar")
+
+
+class FaceDetector:
+    """
+    One face detection pass over a downscaled full frame.
+
+    "yunet" uses OpenCV's CNN detector (cv2.FaceDetectorYN) and needs the
+    ONNX model file (face_detection_yunet_*.onnx from the OpenCV model zoo);
+    without it the Haar cascade is used instead. Both return an (N, 5)
+    float32 array of [x, y, w, h, score] in the input image's pixels.
+    """
+
+    def __init__(
+        self,
+        backend: str = "yunet",
+        model_path: Optional[str] = None,
+        max_dim: int = 640,
+        score_threshold: float = 0.7,
+        nms_threshold: float = 0.3
+    ):
+        if backend not in FACE_DETECTORS:
+            raise ValueError(f"Unknown face detector: {backend} (expected one of {FACE_DETECTORS})")
+
+        if backend == "yunet" and not (model_path and os.path.exists(model_path)):
+            logger.warning(f"YuNet model not found at {model_path}, falling back to Haar cascade")
+            backend = "haar"
+
+        self.backend = backend
+        self.model_path = model_path
+        self.max_dim = max_dim
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        # YuNet keeps per-input-size state, so every inference thread gets its own instance
+        self._local = threading.local()
+
+    def _yunet(self, width: int, height: int):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = cv2.FaceDetectorYN.create(
+                self.model_path, "", (width, height), self.score_threshold, self.nms_threshold, 5000
+            )
+            self._local.detector = detector
+        detector.setInputSize((width, height))
+        return detector
+
+    def _haar(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self._local.cascade = cascade
+        return cascade
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        h, w = image.shape[:2]
+        scale = min(1.0, self.max_dim / max(h, w)) if self.max_dim else 1.0
+        small = image
+        if scale < 1.0:
+            small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+        if self.backend == "yunet":
+            _, faces = self._yunet(small.shape[1], small.shape[0]).detect(small)
+            faces = np.empty((0, 5), np.float32) if faces is None else faces[:, [0, 1, 2, 3, 14]]
+        else:
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            boxes = self._haar().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+            faces = np.zeros((len(boxes), 5), np.float32)
+            if len(boxes):
+                faces[:, :4] = boxes
+                faces[:, 4] = 1.0
+
+        faces = faces.astype(np.float32)
+        faces[:, :4] /= scale
+        return faces
+
+
+def assign_faces(faces: np.ndarray, person_bboxes: List[List[float]]) -> List[Optional[np.ndarray]]:
+    """
+    Matches each person box (xyxy) with the largest face whose center lies
+    inside it. A face inside several (overlapping) person boxes belongs to
+    the smallest one.
+    """
+    assigned: List[Optional[np.ndarray]] = [None] * len(person_bboxes)
+    if len(faces) == 0 or not person_bboxes:
+        return assigned
+
+    persons = np.asarray(person_bboxes, dtype=np.float32)
+    cx = faces[:, 0] + faces[:, 2] / 2
+    cy = faces[:, 1] + faces[:, 3] / 2
+    inside = (
+        (persons[:, None, 0] <= cx) & (cx <= persons[:, None, 2]) &
+        (persons[:, None, 1] <= cy) & (cy <= persons[:, None, 3])
+    )
+
+    person_area = (persons[:, 2] - persons[:, 0]) * (persons[:, 3] - persons[:, 1])
+    owner = np.where(inside, person_area[:, None], np.inf).argmin(axis=0)
+    has_owner = inside.any(axis=0)
+
+    face_area = faces[:, 2] * faces[:, 3]
+    for face_index in np.argsort(-face_area):
+        person_index = owner[face_index]
+        if has_owner[face_index] and assigned[person_index] is None:
+            assigned[person_index] = faces[face_index]
+
+    return assigned
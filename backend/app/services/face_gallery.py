@@ -0,0 +1,210 @@
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the gallery rows: k-means centroids, each row
+    belongs to its nearest centroid's list, a query only scores the rows of
+    its `probes` nearest lists. Rows added after training join the nearest
+    existing list; the gallery retrains once it has doubled.
+    """
+
+    def __init__(self, matrix: np.ndarray, probes: int = 8, iterations: int = 10, seed: int = 0):
+        n = len(matrix)
+        self.num_lists = max(1, int(np.sqrt(n)))
+        self.probes = min(probes, self.num_lists)
+        self.trained_size = n
+
+        rng = np.random.default_rng(seed)
+        data = matrix.astype(np.float32)
+        centroids = data[rng.choice(n, self.num_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = (data @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty lists keep their old centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids
+
+        self.row_lists = self.assign(data)
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    def assign(self, embeddings: np.ndarray) -> np.ndarray:
+        return (embeddings.astype(np.float32) @ self.centroids.T).argmax(axis=1).astype(np.int32)
+
+    def add(self, embeddings: np.ndarray):
+        self.row_lists = np.concatenate([self.row_lists, self.assign(embeddings)])
+        self._order = None
+
+    def keep(self, mask: np.ndarray):
+        self.row_lists = self.row_lists[mask]
+        self._order = None
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        if self._order is None:
+            self._order = np.argsort(self.row_lists, kind="stable")
+            self._offsets = np.searchsorted(self.row_lists[self._order], np.arange(self.num_lists + 1))
+        probe = np.argpartition(-(self.centroids @ query), self.probes - 1)[:self.probes]
+        return np.concatenate([self._order[self._offsets[i]:self._offsets[i + 1]] for i in probe])
+
+
+class FaceGallery:
+    """
+    Enrolled face embeddings as one contiguous (rows, dim) matrix, several
+    rows per identity. Matching a batch of query faces is one matrix
+    multiply (top-k identities per query); above `ann_threshold` rows an
+    IVF index limits each query to a few candidate lists.
+    """
+
+    def __init__(
+        self,
+        dim: int = 128,
+        dtype: str = "float32",
+        ann_threshold: int = 100000,
+        ann_probes: int = 16
+    ):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.ann_threshold = ann_threshold
+        self.ann_probes = ann_probes
+
+        self._matrix = np.empty((0, dim), dtype=self.dtype)
+        self._labels = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._identities: List[str] = []
+        self._identity_index: Dict[str, int] = {}
+        self._index: Optional[IVFIndex] = None
+
+    def __len__(self) -> int:
+        return len(self._identity_index)
+
+    def __contains__(self, identity: str) -> bool:
+        return identity in self._identity_index
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def identities(self) -> List[str]:
+        return list(self._identity_index)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self._size]
+
+    def add(self, identity: str, embeddings: np.ndarray):
+        """Appends one (dim,) or several (k, dim) normalized embeddings for identity"""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        if not len(embeddings):
+            return
+
+        label = self._identity_index.get(identity)
+        if label is None:
+            label = len(self._identities)
+            self._identities.append(identity)
+            self._identity_index[identity] = label
+
+        # Amortized O(1) append: grow the backing matrix by doubling
+        needed = self._size + len(embeddings)
+        if needed > len(self._matrix):
+            capacity = max(needed, 2 * len(self._matrix), 64)
+            matrix = np.empty((capacity, self.dim), dtype=self.dtype)
+            matrix[:self._size] = self._matrix[:self._size]
+            labels = np.empty(capacity, dtype=np.int32)
+            labels[:self._size] = self._labels[:self._size]
+            self._matrix, self._labels = matrix, labels
+
+        self._matrix[self._size:needed] = embeddings
+        self._labels[self._size:needed] = label
+        self._size = needed
+
+        if self._index is not None:
+            self._index.add(embeddings)
+        self._update_index()
+
+    def remove(self, identity: str) -> int:
+        """Drops all embeddings of identity; returns how many rows were removed"""
+        label = self._identity_index.pop(identity, None)
+        if label is None:
+            return 0
+
+        keep = self._labels[:self._size] != label
+        removed = self._size - int(keep.sum())
+        kept = int(keep.sum())
+        self._matrix[:kept] = self._matrix[:self._size][keep]
+        self._labels[:kept] = self._labels[:self._size][keep]
+        self._size = kept
+
+        if self._index is not None:
+            self._index.keep(keep)
+        self._update_index()
+        return removed
+
+    def _update_index(self):
+        if self._size < self.ann_threshold:
+            if self._index is not None:
+                logger.info(f"Face gallery below {self.ann_threshold} rows, back to exact search")
+            self._index = None
+        elif self._index is None or self._size >= 2 * self._index.trained_size:
+            self._index = IVFIndex(self.matrix, probes=self.ann_probes)
+            logger.info(f"Face gallery IVF index built: {self._size} rows, {self._index.num_lists} lists")
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        Top-k identities (best-matching row per identity) for each query.
+        Returns (identities per query, (Q, k) cosine scores); missing slots are -inf.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        scores_out = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        names_out: List[List[str]] = [[] for _ in range(len(queries))]
+        if self._size == 0 or not len(queries):
+            return names_out, scores_out
+
+        labels = self._labels[:self._size]
+        # Enough rows to always contain k distinct identities
+        per_identity = int(np.bincount(labels).max())
+
+        if self._index is None:
+            all_scores = queries @ self.matrix.astype(np.float32, copy=False).T
+            for q in range(len(queries)):
+                self._top_identities(all_scores[q], labels, k, per_identity, names_out[q], scores_out[q])
+        else:
+            for q, query in enumerate(queries):
+                rows = self._index.candidates(query)
+                scores = self._matrix[rows].astype(np.float32, copy=False) @ query
+                self._top_identities(scores, labels[rows], k, per_identity, names_out[q], scores_out[q])
+
+        return names_out, scores_out
+
+    def _top_identities(self, scores, labels, k, per_identity, names, out):
+        m = min(len(scores), k * per_identity)
+        if m == 0:
+            return
+        top = np.argpartition(-scores, m - 1)[:m]
+        top = top[np.argsort(-scores[top])]
+        seen = set()
+        for row in top:
+            label = labels[row]
+            if label in seen:
+                continue
+            seen.add(label)
+            out[len(names)] = scores[row]
+            names.append(self._identities[label])
+            if len(names) == k:
+                break
+
+    def __getstate__(self):
+        # Ship only the used rows to worker processes
+        state = self.__dict__.copy()
+        state['_matrix'] = self.matrix.copy()
+        state['_labels'] = self._labels[:self._size].copy()
+        return state
@@ -1,13 +1,16 @@
 
 import torch
 import torch.nn as nn
-import cv2
 
 import os
 import numpy as np
+from time import perf_counter
 from typing import Dict, List, Optional
 import logging
-from torchvision.models import resnet50
+
+from app.services.arcface_backends import load_arcface, preprocess_faces
+from app.services.face_detector import FaceDetector
+from app.services.face_gallery import FaceGallery
 logger = logging.getLogger(__name__)
 
 
@@ -15,7 +18,10 @@ class ArcFaceModel(nn.Module):
     
     def __init__(self, embedding_size=128, num_classes=2):
         super(ArcFaceModel, self).__init__()
-        self.backbone = resnet50(weights='DEFAULT')
+        # torchvision is only needed to build the eager model, not to load the TorchScript artifact
+        from torchvision.models import resnet50
+        # Trained weights come from best_arcface_model.pth, ImageNet weights would be overwritten anyway
+        self.backbone = resnet50(weights=None)
         self.backbone.fc = nn.Linear(self.backbone.fc.in_features, embedding_size)
         self.backbone_bn = nn.BatchNorm1d(embedding_size)
         self.backbone_bn.bias.requires_grad_(False)
@@ -28,55 +34,76 @@ class ArcFaceModel(nn.Module):
 
 class FaceRecognizer:
     
-    def __init__(self, model_path: str, embedding_size: int = 128):        
+    def __init__(
+        self,
+        model_path: str,
+        embedding_size: int = 128,
+        face_detector: Optional[FaceDetector] = None,
+        gallery: Optional[FaceGallery] = None,
+        backend: str = "torchscript",
+        calibration_dir: Optional[str] = None
+    ):        
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.embedding_size = embedding_size
+        self.model_path = model_path
         
-        self.model = ArcFaceModel(embedding_size)
-        
-        try:
-            self.model.load_state_dict(torch.load(model_path, map_location=self.device))
-            logger.info(f"ArcFace model loaded from {model_path}")
-        except FileNotFoundError:
+        started = perf_counter()
+        self.backend = backend
+        if not os.path.exists(model_path):
             logger.warning(f"Model file {model_path} not found, using untrained model")
+            self.backend = "eager"
+            model_path = None
         
-        self.model.to(self.device)
-        self.model.eval()
-        
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        # TorchScript / ONNX artifacts are cached, later starts skip Python model construction
+        self.model = load_arcface(
+            model_path, self.backend, embedding_size, self.device, calibration_dir
         )
+        self.load_seconds = perf_counter() - started
+        logger.info(f"ArcFace model loaded from {self.model_path} (backend={self.backend}, {self.load_seconds:.2f}s)")
+        
+        self.face_detector = face_detector or FaceDetector("haar")
         
-        self.whitelist: Dict[str, np.ndarray] = {}
+        # Whitelist: every enrolled embedding, several per identity
+        self.gallery = gallery or FaceGallery(embedding_size)
         
         logger.info("FaceRecognizer initialized")
     
     def detect_faces(self, image: np.ndarray) -> List[tuple]:
         
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30)
-        )
-        return faces
+        faces = self.face_detector.detect(image)
+        return [tuple(int(v) for v in face[:4]) for face in faces]
+    
+    def crop_face(self, image: np.ndarray, face) -> np.ndarray:
+        x, y, w, h = (int(v) for v in face[:4])
+        return image[max(y, 0):y + h, max(x, 0):x + w]
     
     def extract_embedding(self, face_image: np.ndarray) -> np.ndarray:
-      
-        # Preprocess
-        face_resized = cv2.resize(face_image, (112, 112))
-        face_rgb = cv2.cvtColor(face_resized, cv2.COLOR_BGR2RGB)
-        face_tensor = torch.from_numpy(face_rgb).permute(2, 0, 1).float() / 255.0
-        face_tensor = face_tensor.unsqueeze(0).to(self.device)
-        
-        with torch.no_grad():
-            embedding = self.model(face_tensor)
-            embedding = embedding.cpu().numpy().flatten()
         
-        embedding = embedding / np.linalg.norm(embedding)
-        
-        return embedding
+        return self.extract_embeddings_batch([face_image])[0]
+    
+    def extract_embeddings_batch(
+        self,
+        face_images: List[np.ndarray],
+        max_batch_size: int = 64
+    ) -> np.ndarray:
+        """
+        Embeds all face crops (of one frame or many) with one forward pass per
+        max_batch_size faces. Returns an (N, embedding_size) L2-normalized matrix.
+        """
+        if not face_images:
+            return np.empty((0, self.embedding_size), dtype=np.float32)
+        
+        batch = preprocess_faces(face_images)
+        
+        chunks = [
+            self.model(batch[start:start + max_batch_size])
+            for start in range(0, len(batch), max_batch_size)
+        ]
+        
+        embeddings = np.concatenate(chunks).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        
+        return embeddings
     
     def recognize_face(
         self,
@@ -94,29 +121,47 @@ class FaceRecognizer:
             }
         
         faces_sorted = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)
-        x, y, w, h = faces_sorted[0]
+        face_roi = self.crop_face(person_image, faces_sorted[0])
         
-        face_roi = person_image[y:y+h, x:x+w]
-        
-        embedding = self.extract_embedding(face_roi)
-        
-        best_match = None
-        best_similarity = 0.0
+        return self.recognize_faces_batch([face_roi], threshold)[0]
+    
+    def recognize_faces_batch(
+        self,
+        face_images: List[np.ndarray],
+        threshold: float = 0.6
+    ) -> List[Dict]:
         
-        for identity, whitelist_embedding in self.whitelist.items():
-            similarity = np.dot(embedding, whitelist_embedding)
-            
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = identity
+        results = [None] * len(face_images)
+        valid = [i for i, face in enumerate(face_images) if face.size > 0]
+        for i in set(range(len(face_images))) - set(valid):
+            results[i] = {
+                'identity': 'no_face',
+                'is_known': False,
+                'confidence': 0.0
+            }
         
-        is_known = best_similarity >= threshold if best_match else False
+        embeddings = self.extract_embeddings_batch([face_images[i] for i in valid])
+        for i, match in zip(valid, self.match_embeddings(embeddings, threshold)):
+            results[i] = match
         
-        return {
-            'identity': best_match if is_known else 'unknownk',
-            'is_known': is_known,
-            'confidence': float(best_similarity)
-        }
+        return results
+    
+    def match_embeddings(self, embeddings: np.ndarray, threshold: float = 0.6) -> List[Dict]:
+        """Best whitelist identity for each row of an (N, dim) embedding matrix"""
+        
+        identities, scores = self.gallery.search(embeddings, k=1)
+        
+        results = []
+        for names, score in zip(identities, scores[:, 0]):
+            best_similarity = max(float(score), 0.0)
+            is_known = bool(names) and best_similarity >= threshold
+            results.append({
+                'identity': names[0] if is_known else 'unknownk',
+                'is_known': is_known,
+                'confidence': best_similarity
+            })
+        
+        return results
     
     def load_whitelist_from_firebase(self, firebase_service):
        
@@ -126,15 +171,19 @@ class FaceRecognizer:
             for entry in whitelist_data:
                 identity = entry['identity']
                 embedding = np.array(entry['embedding'])
-                self.whitelist[identity] = embedding
+                self.gallery.add(identity, embedding)
             
-            logger.info(f"Loaded {len(self.whitelist)} whitelist entries")
+            logger.info(f"Loaded {len(self.gallery)} whitelist identities ({self.gallery.size} embeddings)")
         except Exception as e:
             logger.error(f"Failed to load whitelist: {str(e)}")
     
     def add_to_whitelist(self, identity: str, embedding: np.ndarray):
-        self.whitelist[identity] = embedding
+        self.gallery.add(identity, embedding)
         logger.info(f"Added {identity} to whitelist")
+    
+    def remove_from_whitelist(self, identity: str):
+        removed = self.gallery.remove(identity)
+        logger.info(f"Removed {identity} from whitelist ({removed} embeddings)")
 
 
 
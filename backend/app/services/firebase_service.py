@@ -1,7 +1,7 @@
 
 import firebase_admin
 from firebase_admin import credentials, firestore, storage, auth
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 from datetime import datetime
 import io
@@ -66,20 +66,58 @@ class FirebaseService:
             logger.error(f"Event save failed: {str(e)}")
             raise
     
+    def update_event(self, event_id: str, fields: Dict):
+       
+        try:
+            self.db.collection('events').document(event_id).update(fields)
+        except Exception as e:
+            logger.error(f"Event update failed: {str(e)}")
+            raise
+    
+    def new_event_id(self) -> str:
+        """Client-side generated document id, no network round-trip"""
+        return self.db.collection('events').document().id
+    
+    def commit_events(self, writes: List[Tuple[str, str, Dict]]):
+        """Commits ("set" | "update", event_id, data) writes as one Firestore WriteBatch"""
+        try:
+            batch = self.db.batch()
+            for op, event_id, data in writes:
+                doc_ref = self.db.collection('events').document(event_id)
+                if op == "set":
+                    batch.set(doc_ref, {**data, 'created_at': firestore.SERVER_TIMESTAMP})
+                else:
+                    # merge instead of update: a missing document must not fail the whole batch
+                    batch.set(doc_ref, data, merge=True)
+            batch.commit()
+        except Exception as e:
+            logger.error(f"Event batch commit failed: {str(e)}")
+            raise
+    
     def get_events(
         self,
         user_id: str,
         limit: int = 50, #so luong su kien tra ve 
-        alert_only: bool = False
+        alert_only: bool = False,
+        start_after: Optional[str] = None
     ) -> List[Dict]:
-       
+        """Newest first; `start_after` is the id of the last event of the previous page"""
         try:
             query = self.db.collection('events').where('user_id', '==', user_id)
             
             if alert_only:
                 query = query.where('alert', '==', True)
             
-            query = query.order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit)
+            query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+            
+            if start_after:
+                cursor = self.db.collection('events').document(start_after).get()
+                if not cursor.exists or cursor.get('user_id') != user_id:
+                    return []
+                # The snapshot also breaks created_at ties (events from one WriteBatch share it)
+                query = query.start_after(cursor)
+            
+            query = query.limit(limit)
             
             events = []
             for doc in query.stream():
@@ -138,6 +176,15 @@ class FirebaseService:
             logger.error(f"ROI retrieval failed: {str(e)}")
             return []
     
+    def get_all_rois(self) -> List[Dict]:
+        """Every ROI of every user, used to fill the in-memory ROI cache"""
+        rois = []
+        for doc in self.db.collection('rois').stream():
+            roi = doc.to_dict()
+            roi['id'] = doc.id
+            rois.append(roi)
+        return rois
+    
     def delete_roi(self, roi_id: str, user_id: str):
         try:
             doc_ref = self.db.collection('rois').document(roi_id)
@@ -0,0 +1,96 @@
+
+import cv2
+import numpy as np
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 resolution (DCT scaling),
+# which skips most of the IDCT / color conversion work for large frames.
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers that carry the image size (baseline, progressive, ...)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Reads (height, width) from the JPEG header without decoding; None if not a JPEG"""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    n = len(data)
+    while i + 3 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            # Standalone markers have no length field
+            i += 2
+            continue
+
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in SOF_MARKERS:
+            if i + 8 >= n:
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return height, width
+        i += 2 + length
+
+    return None
+
+
+def resize_max_dim(image: np.ndarray, max_dim: int) -> np.ndarray:
+    """Keeps aspect ratio, limits the longest side to max_dim"""
+    h, w = image.shape[:2]
+    if max(h, w) <= max_dim:
+        return image
+    scale = max_dim / max(h, w)
+    return cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def reduced_decode_factor(height: int, width: int, max_dim: int) -> int:
+    """Largest DCT scale factor that still leaves the longest side >= max_dim"""
+    for factor, _ in REDUCED_DECODE_FLAGS:
+        if max(height, width) / factor >= max_dim:
+            return factor
+    return 1
+
+
+def decode_image(data: bytes, max_dim: int = 1280) -> Optional[np.ndarray]:
+    """
+    Decodes an upload to BGR with the longest side <= max_dim.
+
+    For JPEGs much larger than max_dim the decode itself runs at reduced
+    resolution, then a final INTER_AREA resize lands exactly on max_dim.
+    """
+    buffer = np.frombuffer(data, np.uint8)
+
+    flag = cv2.IMREAD_COLOR
+    dims = jpeg_dimensions(data)
+    if dims is not None:
+        factor = reduced_decode_factor(dims[0], dims[1], max_dim)
+        flag = dict(REDUCED_DECODE_FLAGS).get(factor, cv2.IMREAD_COLOR)
+
+    image = cv2.imdecode(buffer, flag)
+    if image is None:
+        return None
+
+    return resize_max_dim(image, max_dim)
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 80) -> bytes:
+    ok, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
@@ -0,0 +1,124 @@
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the inference queue is full; the caller should retry later"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[object, float]:
+    # Runs inside the worker (thread or process) so busy time excludes queueing
+    started = perf_counter()
+    result = fn(*args)
+    return result, perf_counter() - started
+
+
+class InferenceExecutor:
+    """
+    Dedicated worker pool for the CPU-bound detection pipeline.
+
+    Frames are admitted with `slot()`; at most `max_workers + max_queue`
+    frames can be in flight; beyond that `ExecutorSaturatedError` is raised
+    so the route can answer 503 with Retry-After instead of queueing forever.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 4,
+        max_queue: int = 32,
+        retry_after: int = 1,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = ()
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+
+        if mode == "process":
+            self.executor: Executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs
+            )
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+
+        self._in_flight = 0
+        self._started_at = perf_counter()
+        self._busy_time = 0.0
+        self._tasks = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._max_in_flight = 0
+
+        logger.info(
+            f"InferenceExecutor started (mode={mode}, workers={self.max_workers}, "
+            f"max_queue={self.max_queue})"
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._in_flight >= self.capacity:
+            self._rejected += 1
+            raise ExecutorSaturatedError(self.retry_after)
+
+        self._in_flight += 1
+        self._admitted += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable, *args):
+        result, busy = await asyncio.get_running_loop().run_in_executor(
+            self.executor, _timed_call, fn, *args
+        )
+        self._busy_time += busy
+        self._tasks += 1
+        return result
+
+    def stats(self) -> Dict:
+        uptime = perf_counter() - self._started_at
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "busy_workers": min(self._in_flight, self.max_workers),
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "max_in_flight": self._max_in_flight,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "tasks": self._tasks,
+            "utilization": self._busy_time / (uptime * self.max_workers) if uptime > 0 else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        logger.info("InferenceExecutor stopped")
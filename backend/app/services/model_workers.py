@@ -0,0 +1,311 @@
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+from time import monotonic, perf_counter
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.services.detection_pipeline import init_worker_pipeline, run_worker_pipeline
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.roi_geometry import RoiSet
+from app.services.tracker import DEFAULT_CAMERA_KEY, CameraKey
+
+logger = logging.getLogger(__name__)
+
+# The result collector checks that every worker process is still alive at least this often
+LIVENESS_CHECK_SECONDS = 1.0
+
+
+def _worker_main(
+    index: int,
+    shm_name: str,
+    slot_bytes: int,
+    task_queue,
+    result_queue,
+    init_args: tuple,
+    initializer: Callable = init_worker_pipeline,
+    handler: Callable = run_worker_pipeline
+):
+    """Model worker process: hosts YoloDetector + FaceRecognizer and reads frames from shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Worker index picks this process's core slice when pinning is enabled
+        initializer(*init_args, worker_index=index)
+        result_queue.put(("ready", index, None, None))
+
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            request_id, slot, height, width, camera_key, roi_set = task
+            frame = np.ndarray(
+                (height, width, 3),
+                dtype=np.uint8,
+                buffer=shm.buf,
+                offset=slot * slot_bytes
+            )
+            try:
+                detections = handler(frame, camera_key, roi_set)
+                result_queue.put(("result", request_id, detections, None))
+            except Exception as e:
+                result_queue.put(("result", request_id, None, str(e)))
+            finally:
+                del frame
+    finally:
+        shm.close()
+
+
+class ModelWorkerPool:
+    """
+    N model-worker processes fed through a ring of shared-memory frame slots.
+
+    The front end copies each decoded frame into a free slot and only sends
+    (request_id, slot, shape) to a worker, so pixels are never pickled.
+    Detections come back as small dicts over a result queue. When every slot
+    is busy `infer` raises ExecutorSaturatedError for 503 backpressure.
+
+    A (user, camera) pair sticks to the worker it was first assigned to, so
+    the tracker state for that camera inside the worker stays coherent.
+
+    A worker that dies fails its in-flight frames, gets its slots back and
+    is restarted; one that dies before it ever became ready (broken model,
+    bad config) is marked unhealthy and gets no more frames. `infer` waits
+    at most `timeout_seconds` for a result.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        init_args: tuple,
+        slots_per_worker: int = 2,
+        slot_max_dim: int = 1280,
+        retry_after: int = 1,
+        timeout_seconds: float = 30.0,
+        initializer: Callable = init_worker_pipeline,
+        handler: Callable = run_worker_pipeline
+    ):
+        self.num_workers = max(1, num_workers)
+        self.num_slots = self.num_workers * max(1, slots_per_worker)
+        self.slot_max_dim = slot_max_dim
+        self.slot_bytes = slot_max_dim * slot_max_dim * 3
+        self.retry_after = retry_after
+        self.timeout = timeout_seconds
+        self.init_args = init_args
+        # Both run inside the worker process, so they must be importable module-level functions
+        self.initializer = initializer
+        self.handler = handler
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=self.num_slots * self.slot_bytes)
+        self._free_slots: List[int] = list(range(self.num_slots))
+        self._task_queues: List = [None] * self.num_workers
+        self._processes: List = [None] * self.num_workers
+        self._result_queue = self._ctx.Queue()
+        self._worker_load = [0] * self.num_workers
+        self._ready = [False] * self.num_workers
+        self._healthy = [True] * self.num_workers
+        self._camera_workers: Dict[CameraKey, int] = {}
+        self._pending: Dict[int, tuple] = {}
+        self._request_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+        self._collector = threading.Thread(target=self._collect_results, name="model-worker-results", daemon=True)
+
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._restarts = 0
+        self._total_round_trip = 0.0
+
+    def _spawn(self, index: int):
+        # A fresh task queue, so frames meant for a dead worker are never picked up again
+        self._task_queues[index] = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                index, self._shm.name, self.slot_bytes, self._task_queues[index], self._result_queue,
+                self.init_args, self.initializer, self.handler
+            ),
+            name=f"model-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.num_workers):
+            self._spawn(index)
+        self._collector.start()
+        logger.info(
+            f"ModelWorkerPool started (workers={self.num_workers}, slots={self.num_slots}, "
+            f"slot_max_dim={self.slot_max_dim})"
+        )
+
+    def stop(self):
+        self._stopping = True
+        for index, task_queue in enumerate(self._task_queues):
+            # An unhealthy worker's queue was closed when it died
+            if self._healthy[index]:
+                task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+        self._result_queue.put(None)
+        self._collector.join(timeout=5)
+
+        for _, (future, _, _, _) in list(self._pending.items()):
+            if not future.done():
+                future.set_exception(RuntimeError("ModelWorkerPool stopped"))
+        self._pending.clear()
+
+        self._shm.close()
+        self._shm.unlink()
+        logger.info("ModelWorkerPool stopped")
+
+    async def infer(
+        self,
+        image: np.ndarray,
+        camera_key: CameraKey = DEFAULT_CAMERA_KEY,
+        roi_set: Optional[RoiSet] = None
+    ) -> List[Dict]:
+        if not any(self._healthy):
+            raise RuntimeError("No healthy model workers")
+        if not self._free_slots:
+            self._rejected += 1
+            raise ExecutorSaturatedError(self.retry_after)
+
+        # Frames larger than a slot are downscaled the same way enhance_for_night would;
+        # the worker rescales the ROIs to whatever frame it gets
+        h, w = image.shape[:2]
+        if max(h, w) > self.slot_max_dim:
+            scale = self.slot_max_dim / max(h, w)
+            image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            h, w = image.shape[:2]
+
+        slot = self._free_slots.pop()
+        frame = np.ndarray((h, w, 3), dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+        frame[:] = image
+        del frame
+
+        worker = self._camera_workers.get(camera_key)
+        if worker is None:
+            healthy = [i for i in range(self.num_workers) if self._healthy[i]]
+            worker = min(healthy, key=lambda i: self._worker_load[i])
+            self._camera_workers[camera_key] = worker
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = (future, slot, worker, perf_counter())
+        self._worker_load[worker] += 1
+        self._task_queues[worker].put((request_id, slot, h, w, camera_key, roi_set))
+
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # The slot stays reserved until the worker answers (or dies): it may still be reading it
+            self._timed_out += 1
+            logger.warning(f"Model worker {worker} did not answer within {self.timeout:.0f}s")
+            raise ExecutorSaturatedError(self.retry_after)
+
+    def _collect_results(self):
+        next_check = monotonic() + LIVENESS_CHECK_SECONDS
+        while True:
+            try:
+                message = self._result_queue.get(timeout=LIVENESS_CHECK_SECONDS)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if message:
+                self._loop.call_soon_threadsafe(self._on_message, message)
+            if monotonic() >= next_check:
+                next_check = monotonic() + LIVENESS_CHECK_SECONDS
+                self._loop.call_soon_threadsafe(self._check_workers)
+
+    def _check_workers(self):
+        if self._stopping:
+            return
+        for index, process in enumerate(self._processes):
+            if self._healthy[index] and not process.is_alive():
+                self._on_worker_died(index, process.exitcode)
+
+    def _on_worker_died(self, index: int, exitcode: Optional[int]):
+        lost = [request_id for request_id, pending in self._pending.items() if pending[2] == index]
+        for request_id in lost:
+            future, slot, _, _ = self._pending.pop(request_id)
+            self._free_slots.append(slot)
+            self._failed += 1
+            if not future.done():
+                future.set_exception(RuntimeError(f"Model worker {index} died"))
+        self._worker_load[index] = 0
+        # Its cameras' tracker state is gone anyway, let them be rebalanced
+        self._camera_workers = {key: w for key, w in self._camera_workers.items() if w != index}
+        self._task_queues[index].cancel_join_thread()
+        self._task_queues[index].close()
+
+        if not self._ready[index]:
+            self._healthy[index] = False
+            logger.error(f"Model worker {index} exited during startup (exit code {exitcode}), not restarting")
+            return
+
+        self._ready[index] = False
+        self._restarts += 1
+        logger.error(f"Model worker {index} died (exit code {exitcode}), {len(lost)} frames failed, restarting")
+        self._spawn(index)
+
+    def _on_message(self, message: tuple):
+        kind, request_id, detections, error = message
+
+        if kind == "ready":
+            self._ready[request_id] = True
+            logger.info(f"Model worker {request_id} ready ({sum(self._ready)}/{self.num_workers})")
+            return
+
+        pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return
+        future, slot, worker, submitted_at = pending
+
+        self._free_slots.append(slot)
+        self._worker_load[worker] -= 1
+        self._total_round_trip += perf_counter() - submitted_at
+
+        if error is not None:
+            self._failed += 1
+            if not future.done():
+                future.set_exception(RuntimeError(error))
+            return
+
+        self._completed += 1
+        if not future.done():
+            future.set_result(detections)
+
+    def stats(self) -> Dict:
+        return {
+            "mode": "shm",
+            "workers": self.num_workers,
+            "ready_workers": sum(self._ready),
+            "healthy_workers": sum(self._healthy),
+            "restarts": self._restarts,
+            "slots": self.num_slots,
+            "free_slots": len(self._free_slots),
+            "in_flight": len(self._pending),
+            "worker_load": list(self._worker_load),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "avg_round_trip_ms": 1000 * self._total_round_trip / self._completed if self._completed else 0.0,
+        }
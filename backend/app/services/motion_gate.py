@@ -0,0 +1,129 @@
+
+import cv2
+import numpy as np
+import logging
+import threading
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CameraMotionState:
+
+    def __init__(self):
+        self.background: Optional[np.ndarray] = None
+        self.last_result: List[Dict] = []
+        self.last_inference_at = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+
+class MotionGate:
+    """
+    Per-camera motion gate in front of the detection pipeline.
+
+    Each frame is downscaled to a small grayscale image and compared with a
+    running-average background. If too few pixels changed, inference is
+    skipped and the caller reuses the camera's last result. Inference is
+    still forced every `max_skip_seconds` so results never go stale.
+
+    State is kept per (user_id, camera_id): camera ids are only unique
+    within one user, so two users' "default" cameras never share a
+    background or a result. Threshold overrides are per camera id.
+    """
+
+    THRESHOLD_KEYS = ("pixel_threshold", "min_changed_ratio", "learning_rate", "max_skip_seconds")
+
+    def __init__(
+        self,
+        width: int = 160,
+        pixel_threshold: int = 25,
+        min_changed_ratio: float = 0.01,
+        learning_rate: float = 0.05,
+        max_skip_seconds: float = 10.0,
+        camera_overrides: Optional[Dict[str, Dict[str, float]]] = None
+    ):
+        self.width = width
+        self.defaults = {
+            "pixel_threshold": pixel_threshold,
+            "min_changed_ratio": min_changed_ratio,
+            "learning_rate": learning_rate,
+            "max_skip_seconds": max_skip_seconds,
+        }
+        self.camera_overrides: Dict[str, Dict[str, float]] = {}
+        for camera_id, overrides in (camera_overrides or {}).items():
+            self.set_thresholds(camera_id, **overrides)
+
+        self._cameras: Dict[Tuple[str, str], CameraMotionState] = {}
+        self._lock = threading.Lock()
+
+    def set_thresholds(self, camera_id: str, **overrides):
+        unknown = set(overrides) - set(self.THRESHOLD_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown motion gate thresholds: {sorted(unknown)}")
+        self.camera_overrides.setdefault(camera_id, {}).update(overrides)
+
+    def thresholds(self, camera_id: str) -> Dict[str, float]:
+        return {**self.defaults, **self.camera_overrides.get(camera_id, {})}
+
+    def _downscale(self, image: np.ndarray) -> np.ndarray:
+        h, w = image.shape[:2]
+        height = max(1, int(h * self.width / w))
+        small = cv2.resize(image, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+    def check(self, user_id: str, camera_id: str, image: np.ndarray) -> bool:
+        """Returns True when the frame should go through inference"""
+        gray = self._downscale(image)
+        thresholds = self.thresholds(camera_id)
+
+        with self._lock:
+            state = self._cameras.setdefault((user_id, camera_id), CameraMotionState())
+            state.frames += 1
+
+            if state.background is None or state.background.shape != gray.shape:
+                state.background = gray
+                return True
+
+            diff = cv2.absdiff(gray, state.background)
+            changed_ratio = float(np.count_nonzero(diff > thresholds["pixel_threshold"])) / diff.size
+            cv2.accumulateWeighted(gray, state.background, thresholds["learning_rate"])
+
+            stale = monotonic() - state.last_inference_at >= thresholds["max_skip_seconds"]
+            if changed_ratio >= thresholds["min_changed_ratio"] or stale:
+                return True
+
+            state.skipped += 1
+            return False
+
+    def update_result(self, user_id: str, camera_id: str, detections: List[Dict]):
+        with self._lock:
+            state = self._cameras.setdefault((user_id, camera_id), CameraMotionState())
+            state.last_result = detections
+            state.last_inference_at = monotonic()
+
+    def last_result(self, user_id: str, camera_id: str) -> List[Dict]:
+        with self._lock:
+            state = self._cameras.get((user_id, camera_id))
+            return list(state.last_result) if state else []
+
+    def stats(self) -> Dict:
+        with self._lock:
+            cameras = {
+                f"{user_id}/{camera_id}": {
+                    "frames": state.frames,
+                    "skipped": state.skipped,
+                    "skip_ratio": state.skipped / state.frames if state.frames else 0.0,
+                }
+                for (user_id, camera_id), state in self._cameras.items()
+            }
+        frames = sum(c["frames"] for c in cameras.values())
+        skipped = sum(c["skipped"] for c in cameras.values())
+        return {
+            "frames": frames,
+            "inferences_saved": skipped,
+            "skip_ratio": skipped / frames if frames else 0.0,
+            "cameras": cameras,
+        }
@@ -0,0 +1,166 @@
+
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.services.roi_geometry import RoiSet
+
+logger = logging.getLogger(__name__)
+
+ROI_CACHE_SYNC_MODES = ("listen", "poll")
+
+
+class RoiCache:
+    """
+    Per-user copy of the Firestore `rois` collection so the detection hot
+    path never waits on the network.
+
+    Filled once at startup, updated write-through by the /api/roi routes and
+    kept in sync with edits from elsewhere by either a Firestore snapshot
+    listener ("listen") or a periodic full reload ("poll"). Each user's ROIs
+    carry a version; the compiled RoiSet (polygons + masks) for a
+    (user, camera) pair is built once per version and then reused.
+    """
+
+    def __init__(
+        self,
+        firebase_service,
+        sync: str = "listen",
+        refresh_interval_seconds: float = 60.0
+    ):
+        if sync not in ROI_CACHE_SYNC_MODES:
+            raise ValueError(f"Unknown ROI cache sync mode: {sync} (expected one of {ROI_CACHE_SYNC_MODES})")
+
+        self.firebase_service = firebase_service
+        self.sync = sync
+        self.refresh_interval_seconds = refresh_interval_seconds
+
+        self._lock = threading.Lock()
+        self._rois: Dict[str, Dict[str, Dict]] = {}
+        self._versions: Dict[str, int] = {}
+        self._compiled: Dict[Tuple[str, str, int], Optional[RoiSet]] = {}
+        self._watch = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+        self.lookups = 0
+        self.compiles = 0
+        self.refreshes = 0
+
+    # ---- Lifecycle ----
+
+    async def start(self):
+        await asyncio.to_thread(self.reload)
+        if self.sync == "listen":
+            try:
+                self._watch = self.firebase_service.db.collection('rois').on_snapshot(self._on_snapshot)
+            except Exception as e:
+                logger.error(f"ROI snapshot listener failed, falling back to polling: {str(e)}")
+                self.sync = "poll"
+        if self.sync == "poll":
+            self._poll_task = asyncio.create_task(self._poll())
+        logger.info(f"ROI cache ready: {self.stats()['rois']} ROI(s), sync={self.sync}")
+
+    async def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.error(f"ROI cache refresh failed: {str(e)}")
+
+    # ---- Updates ----
+
+    def reload(self):
+        """Full reload; only users whose ROIs actually changed get a new version"""
+        by_user: Dict[str, Dict[str, Dict]] = {}
+        for roi in self.firebase_service.get_all_rois():
+            by_user.setdefault(roi.get('user_id'), {})[roi['id']] = roi
+
+        with self._lock:
+            for user_id in set(self._rois) | set(by_user):
+                if self._rois.get(user_id) != by_user.get(user_id):
+                    self._replace_user(user_id, by_user.get(user_id, {}))
+            self.refreshes += 1
+
+    def put(self, user_id: str, roi_id: str, roi_data: Dict):
+        roi = {k: v for k, v in roi_data.items() if k != 'created_at'}
+        roi['id'] = roi_id
+        with self._lock:
+            rois = dict(self._rois.get(user_id, {}))
+            rois[roi_id] = roi
+            self._replace_user(user_id, rois)
+
+    def remove(self, user_id: str, roi_id: str):
+        with self._lock:
+            rois = dict(self._rois.get(user_id, {}))
+            if rois.pop(roi_id, None) is not None:
+                self._replace_user(user_id, rois)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Runs on the Firestore listener thread
+        for change in changes:
+            roi = change.document.to_dict() or {}
+            user_id = roi.get('user_id')
+            if user_id is None:
+                continue
+            if change.type.name == 'REMOVED':
+                self.remove(user_id, change.document.id)
+            else:
+                self.put(user_id, change.document.id, roi)
+
+    def _replace_user(self, user_id: str, rois: Dict[str, Dict]):
+        # Caller holds the lock. Readers see either the old or the new dict, never a partial one.
+        if rois:
+            self._rois[user_id] = rois
+        else:
+            self._rois.pop(user_id, None)
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self._compiled = {k: v for k, v in self._compiled.items() if k[0] != user_id}
+
+    # ---- Hot path ----
+
+    def get_rois(self, user_id: str) -> List[Dict]:
+        return list(self._rois.get(user_id, {}).values())
+
+    def roi_set(self, user_id: str, camera_id: str) -> Optional[RoiSet]:
+        """Compiled active ROIs of the user for this camera; None means the whole frame"""
+        self.lookups += 1
+        key = (user_id, camera_id, self._versions.get(user_id, 0))
+        try:
+            return self._compiled[key]
+        except KeyError:
+            pass
+
+        active = [
+            roi for roi in self._rois.get(user_id, {}).values()
+            if roi.get('active', True) and roi.get('camera_id') in (None, camera_id)
+        ]
+        roi_set = RoiSet.from_rois(active)
+        if roi_set is not None:
+            roi_set.key = key
+        self._compiled[key] = roi_set
+        self.compiles += 1
+        return roi_set
+
+    def stats(self) -> Dict:
+        return {
+            "sync": self.sync,
+            "users": len(self._rois),
+            "rois": sum(len(rois) for rois in self._rois.values()),
+            "lookups": self.lookups,
+            "compiles": self.compiles,
+            "refreshes": self.refreshes,
+        }
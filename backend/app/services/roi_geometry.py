@@ -0,0 +1,161 @@
+
+import cv2
+import numpy as np
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+
+class RoiSet:
+    """
+    Compiled geometry for a camera's active ROIs (rectangles or polygons).
+
+    Provides the crop(s) inference should run on and a per-frame-size mask
+    for containment tests. The masks are cached per frame shape and are not
+    pickled, so a RoiSet is cheap to send to inference worker processes.
+
+    Coordinates are pixels of the frame the ROIs were drawn on, usually the
+    camera's native resolution (`frame_size`, width x height). Inference
+    sees a decoded / downscaled frame, so `for_frame` rescales the ROIs to
+    it; without a `frame_size` they are taken as pixels of any given frame.
+    """
+
+    # Per-ROI crops are used instead of the union crop when they cover
+    # less than this share of the union box (e.g. two doors far apart)
+    SPLIT_RATIO = 0.5
+
+    def __init__(
+        self,
+        polygons: List[np.ndarray],
+        roi_ids: Optional[List[str]] = None,
+        frame_size: Optional[Tuple[int, int]] = None
+    ):
+        self.polygons = polygons
+        self.roi_ids = roi_ids or [str(i) for i in range(len(polygons))]
+        self.frame_size = frame_size
+        self._masks: Dict[Tuple[int, int], np.ndarray] = {}
+        # Rescaled copies per frame size, so their masks are built once too
+        self._derived: Dict[Tuple, "RoiSet"] = {}
+        # Set by RoiCache: identifies the ROI version so workers can reuse their masks
+        self.key: Optional[Tuple] = None
+
+    @classmethod
+    def from_rois(cls, rois: List[Dict]) -> Optional["RoiSet"]:
+        """ROIs drawn on different frame sizes are brought to the first one's size"""
+        sizes = [
+            (roi['frame_width'], roi['frame_height'])
+            for roi in rois if roi.get('frame_width') and roi.get('frame_height')
+        ]
+        frame_size = sizes[0] if sizes else None
+
+        polygons, roi_ids = [], []
+        for roi in rois:
+            points = roi.get('points')
+            if points and len(points) >= 3:
+                polygon = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+            else:
+                x, y, w, h = roi['x'], roi['y'], roi['width'], roi['height']
+                polygon = np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32)
+            if frame_size is not None and roi.get('frame_width') and roi.get('frame_height'):
+                polygon *= [frame_size[0] / roi['frame_width'], frame_size[1] / roi['frame_height']]
+            polygons.append(np.round(polygon).astype(np.int32))
+            roi_ids.append(roi.get('id', str(len(roi_ids))))
+        return cls(polygons, roi_ids, frame_size) if polygons else None
+
+    def scaled(self, factor: float) -> "RoiSet":
+        """Same ROIs for a frame resized by `factor`"""
+        polygons = [np.round(p * factor).astype(np.int32) for p in self.polygons]
+        frame_size = None
+        if self.frame_size is not None:
+            frame_size = (round(self.frame_size[0] * factor), round(self.frame_size[1] * factor))
+        scaled = RoiSet(polygons, self.roi_ids, frame_size)
+        if self.key is not None:
+            scaled.key = self.key + (factor,)
+        return scaled
+
+    def with_frame_size(self, width: int, height: int) -> "RoiSet":
+        """These ROIs with the size of the frame they were drawn on (if they do not know it yet)"""
+        if self.frame_size is not None:
+            return self
+        derived = self._derived.get(('size', width, height))
+        if derived is None:
+            derived = RoiSet(self.polygons, self.roi_ids, (width, height))
+            if self.key is not None:
+                derived.key = self.key + ((width, height),)
+            self._derived[('size', width, height)] = derived
+        return derived
+
+    def for_frame(self, frame_shape: Tuple[int, ...]) -> "RoiSet":
+        """These ROIs in pixels of a (decoded, downscaled) frame of this shape"""
+        h, w = frame_shape[:2]
+        if self.frame_size is None or self.frame_size == (w, h):
+            return self
+        derived = self._derived.get(('frame', w, h))
+        if derived is None:
+            # Decoding keeps the aspect ratio, so one factor covers both axes
+            derived = self.scaled(w / self.frame_size[0])
+            derived.frame_size = (w, h)
+            self._derived[('frame', w, h)] = derived
+        return derived
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_masks'] = {}
+        state['_derived'] = {}
+        return state
+
+    def _boxes(self, frame_shape: Tuple[int, ...]) -> List[Box]:
+        h, w = frame_shape[:2]
+        boxes = []
+        for polygon in self.polygons:
+            x1, y1 = np.clip(polygon.min(axis=0), 0, [w, h])
+            x2, y2 = np.clip(polygon.max(axis=0), 0, [w, h])
+            if x2 > x1 and y2 > y1:
+                boxes.append((int(x1), int(y1), int(x2), int(y2)))
+        return boxes
+
+    def crop_boxes(self, frame_shape: Tuple[int, ...]) -> List[Box]:
+        """Frame regions inference has to look at: the union box, or one box per ROI"""
+        boxes = self._boxes(frame_shape)
+        if len(boxes) <= 1:
+            return boxes
+
+        arr = np.array(boxes)
+        union = (int(arr[:, 0].min()), int(arr[:, 1].min()), int(arr[:, 2].max()), int(arr[:, 3].max()))
+        union_area = (union[2] - union[0]) * (union[3] - union[1])
+        areas = (arr[:, 2] - arr[:, 0]) * (arr[:, 3] - arr[:, 1])
+
+        if areas.sum() < self.SPLIT_RATIO * union_area and not self._overlapping(arr):
+            return boxes
+        return [union]
+
+    @staticmethod
+    def _overlapping(arr: np.ndarray) -> bool:
+        x1 = np.maximum(arr[:, None, 0], arr[None, :, 0])
+        y1 = np.maximum(arr[:, None, 1], arr[None, :, 1])
+        x2 = np.minimum(arr[:, None, 2], arr[None, :, 2])
+        y2 = np.minimum(arr[:, None, 3], arr[None, :, 3])
+        inter = (x2 > x1) & (y2 > y1)
+        np.fill_diagonal(inter, False)
+        return bool(inter.any())
+
+    def mask(self, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        key = tuple(frame_shape[:2])
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.zeros(key, dtype=np.uint8)
+            cv2.fillPoly(mask, self.polygons, 1)
+            self._masks[key] = mask
+        return mask
+
+    def contains(self, bboxes: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """Boolean per box: is the box center inside any ROI"""
+        if len(bboxes) == 0:
+            return np.zeros(0, dtype=bool)
+        h, w = frame_shape[:2]
+        cx = np.clip(((bboxes[:, 0] + bboxes[:, 2]) / 2).astype(np.int32), 0, w - 1)
+        cy = np.clip(((bboxes[:, 1] + bboxes[:, 3]) / 2).astype(np.int32), 0, h - 1)
+        return self.mask(frame_shape)[cy, cx].astype(bool)
@@ -0,0 +1,122 @@
+import logging
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def dhash(image: np.ndarray, hash_size: int = HASH_SIZE) -> int:
+    """
+    64-bit difference hash: grayscale, shrink to 9 x 8, one bit per
+    horizontal neighbour comparison. Insensitive to JPEG noise, small
+    brightness changes and scale, sensitive to anything moving.
+    """
+    # Subsampling to ~128 px on the short side is plenty for a 9 x 8 average and ~7x cheaper
+    step = max(1, min(image.shape[:2]) // (hash_size * 16))
+    image = np.ascontiguousarray(image[::step, ::step])
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SnapshotEntry:
+
+    def __init__(
+        self,
+        image_hash: int,
+        labels: Tuple[str, ...],
+        image_url: str,
+        thumbnail_url: Optional[str],
+        size: int,
+        now: float
+    ):
+        self.image_hash = image_hash
+        self.labels = labels
+        self.image_url = image_url
+        self.thumbnail_url = thumbnail_url
+        self.size = size
+        self.uploaded_at = now
+
+
+class SnapshotDeduplicator:
+    """
+    Per-camera memory of recently uploaded snapshots. A new event whose
+    frame hashes within `max_distance` bits of one of them (and shows the
+    same identities) reuses that upload's URLs instead of encoding and
+    uploading a near-identical image.
+
+    Only finished uploads are remembered, so a match always has a URL.
+    """
+
+    def __init__(self, max_distance: int = 6, max_age_seconds: float = 300.0, per_camera: int = 8):
+        self.max_distance = max_distance
+        self.max_age_seconds = max_age_seconds
+        self.per_camera = max(1, per_camera)
+        self._recent: Dict[Tuple[str, str], Deque[SnapshotEntry]] = {}
+
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def lookup(
+        self,
+        camera_key: Tuple[str, str],
+        image_hash: int,
+        labels: Tuple[str, ...]
+    ) -> Optional[SnapshotEntry]:
+        """A recent upload that looks the same, or None"""
+        self.lookups += 1
+        recent = self._recent.get(camera_key)
+        if not recent:
+            return None
+
+        now = monotonic()
+        while recent and now - recent[0].uploaded_at > self.max_age_seconds:
+            recent.popleft()
+
+        best = None
+        for entry in recent:
+            if entry.labels != labels:
+                continue
+            distance = hamming(entry.image_hash, image_hash)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, entry)
+        if best is None:
+            return None
+
+        self.hits += 1
+        self.bytes_saved += best[1].size
+        return best[1]
+
+    def remember(
+        self,
+        camera_key: Tuple[str, str],
+        image_hash: int,
+        labels: Tuple[str, ...],
+        image_url: str,
+        thumbnail_url: Optional[str],
+        size: int
+    ):
+        """Records a finished upload; `size` is the bytes a later reuse saves"""
+        recent = self._recent.setdefault(camera_key, deque(maxlen=self.per_camera))
+        recent.append(SnapshotEntry(image_hash, labels, image_url, thumbnail_url, size, monotonic()))
+
+    def stats(self) -> Dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "cameras": len(self._recent),
+        }
@@ -0,0 +1,185 @@
+
+import numpy as np
+import logging
+import threading
+from itertools import count
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, camera_id): camera ids are only unique within one user
+CameraKey = Tuple[str, str]
+DEFAULT_CAMERA_KEY: CameraKey = ("", "default")
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def _bbox_to_z(bbox) -> np.ndarray:
+    x1, y1, x2, y2 = bbox
+    w, h = max(x2 - x1, 1e-3), max(y2 - y1, 1e-3)
+    return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h], dtype=np.float64)
+
+
+def _x_to_bbox(x: np.ndarray) -> np.ndarray:
+    s, r = max(x[2], 1e-3), max(x[3], 1e-3)
+    w = np.sqrt(s * r)
+    h = s / w
+    return np.array([x[0] - w / 2, x[1] - h / 2, x[0] + w / 2, x[1] + h / 2])
+
+
+class KalmanBoxTrack:
+    """
+    Constant-velocity Kalman filter over (cx, cy, area, aspect) as in SORT.
+    Also carries the cached face identity for the tracked person.
+    """
+
+    def __init__(self, track_id: int, bbox):
+        self.track_id = track_id
+
+        # state: cx, cy, s, r, vcx, vcy, vs
+        self.F = np.eye(7)
+        self.F[0, 4] = self.F[1, 5] = self.F[2, 6] = 1.0
+        self.H = np.eye(4, 7)
+        self.R = np.diag([1.0, 1.0, 10.0, 10.0])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 1e-4])
+        self.x = np.zeros(7)
+        self.x[:4] = _bbox_to_z(bbox)
+
+        self.hits = 1
+        self.last_seen = monotonic()
+
+        self.identity: Optional[str] = None
+        self.is_known = False
+        self.identity_at = 0.0
+
+    def predict(self) -> np.ndarray:
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return _x_to_bbox(self.x)
+
+    def update(self, bbox):
+        z = _bbox_to_z(bbox)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+        self.hits += 1
+        self.last_seen = monotonic()
+
+    def needs_recognition(self, identity_ttl: float) -> bool:
+        # New track, still unknown, or cached identity expired
+        if self.identity is None or not self.is_known:
+            return True
+        return monotonic() - self.identity_at >= identity_ttl
+
+    def set_identity(self, identity: str, is_known: bool):
+        self.identity = identity
+        self.is_known = is_known
+        self.identity_at = monotonic()
+
+
+class SortTracker:
+
+    def __init__(self, iou_threshold: float = 0.3, max_age_seconds: float = 2.0, ids=None):
+        self.iou_threshold = iou_threshold
+        self.max_age_seconds = max_age_seconds
+        self.tracks: List[KalmanBoxTrack] = []
+        self._ids = ids if ids is not None else count(1)
+
+    def update(self, bboxes: List[List[float]]) -> List[KalmanBoxTrack]:
+        """Returns one track per input bbox, in input order"""
+        now = monotonic()
+        self.tracks = [t for t in self.tracks if now - t.last_seen < self.max_age_seconds]
+
+        predicted = np.array([t.predict() for t in self.tracks]).reshape(-1, 4)
+        detections = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        ious = iou_matrix(detections, predicted)
+
+        # Greedy matching on IoU, best pairs first
+        assigned: List[Optional[KalmanBoxTrack]] = [None] * len(detections)
+        used_tracks = set()
+        if ious.size:
+            for flat in np.argsort(-ious, axis=None):
+                d, t = divmod(int(flat), ious.shape[1])
+                if ious[d, t] < self.iou_threshold:
+                    break
+                if assigned[d] is not None or t in used_tracks:
+                    continue
+                assigned[d] = self.tracks[t]
+                used_tracks.add(t)
+
+        for d, bbox in enumerate(detections):
+            if assigned[d] is None:
+                track = KalmanBoxTrack(next(self._ids), bbox)
+                self.tracks.append(track)
+                assigned[d] = track
+            else:
+                assigned[d].update(bbox)
+
+        return assigned
+
+
+class TrackerRegistry:
+    """One SortTracker per (user, camera); also counts how many face recognitions were reused"""
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age_seconds: float = 2.0,
+        identity_ttl_seconds: float = 5.0
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_age_seconds = max_age_seconds
+        self.identity_ttl_seconds = identity_ttl_seconds
+        self._trackers: Dict[CameraKey, SortTracker] = {}
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+        self.recognitions_run = 0
+        self.recognitions_reused = 0
+
+    def update(self, camera_key: CameraKey, bboxes: List[List[float]]) -> List[KalmanBoxTrack]:
+        with self._lock:
+            tracker = self._trackers.get(camera_key)
+            if tracker is None:
+                tracker = SortTracker(self.iou_threshold, self.max_age_seconds, ids=self._ids)
+                self._trackers[camera_key] = tracker
+            return tracker.update(bboxes)
+
+    def count_recognitions(self, run: int, reused: int):
+        # Called from every inference thread, so counted under the lock like the trackers
+        with self._lock:
+            self.recognitions_run += run
+            self.recognitions_reused += reused
+
+    def stats(self) -> Dict:
+        with self._lock:
+            active = {f"{user_id}/{camera_id}": len(t.tracks) for (user_id, camera_id), t in self._trackers.items()}
+            run, reused = self.recognitions_run, self.recognitions_reused
+        total = run + reused
+        return {
+            "active_tracks": active,
+            "recognitions_run": run,
+            "recognitions_reused": reused,
+            "reuse_ratio": reused / total if total else 0.0,
+        }
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+from time import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (event_id, image_url, thumbnail_url) once the event is committed
+SavedCallback = Callable[[str, Optional[str], Optional[str]], None]
+
+# Workers re-check for retries that became due at least this often
+IDLE_POLL_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    image BLOB NOT NULL,
+    thumbnail BLOB NOT NULL DEFAULT x'',
+    event TEXT NOT NULL,
+    image_url TEXT,
+    thumbnail_url TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, next_attempt);
+"""
+
+def thumbnail_filename(filename: str) -> str:
+    return f"thumbnails/{filename}"
+
+
+class UploadSpool:
+    """
+    Disk-backed queue of detection snapshots waiting to be uploaded and
+    saved as events.
+
+    A request only appends the event payload to a SQLite file (WAL mode)
+    and returns. The snapshot is annotated and encoded (full size +
+    thumbnail) by up to `encode_workers` background threads, at most
+    `max_encode_backlog` waiting at a time (beyond that the request encodes
+    it itself), then a fixed pool of `workers` drains the file: upload both
+    images to Cloudinary, then save the event through the EventWriter.
+    Failures are retried with exponential backoff (jitter, capped at
+    `retry_max_seconds`); after `max_attempts` a job is kept as "failed".
+
+    Job states: encoding -> pending -> claimed (uploading) -> saving (URLs
+    stored, event queued) -> deleted once Firestore committed it. Jobs left
+    in flight by a crash go back to pending on the next start; one that was
+    still encoding uploads the camera's original frame it was spooled with
+    (no boxes, no thumbnail) and is counted as "unrendered". Retries are
+    idempotent: the event id is fixed at enqueue time and the Cloudinary
+    public id comes from the filename, so a repeat overwrites instead of
+    duplicating.
+    """
+
+    def __init__(
+        self,
+        firebase_service,
+        event_writer,
+        path: str = "data/upload_spool.db",
+        workers: int = 4,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 300.0,
+        max_attempts: int = 20,
+        event_store=None,
+        encode_workers: int = 2,
+        max_encode_backlog: int = 32
+    ):
+        self.firebase_service = firebase_service
+        self.event_writer = event_writer
+        self.path = path
+        self.workers = max(1, workers)
+        self.retry_base = retry_base_seconds
+        self.retry_max = retry_max_seconds
+        self.max_attempts = max_attempts
+        self.event_store = event_store
+        self.encode_workers = max(1, encode_workers)
+        self.max_encode_backlog = max(0, max_encode_backlog)
+
+        self.uploaded = 0
+        self.retries = 0
+        self.inline_encodes = 0
+        self.unrendered = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._saving: Set[asyncio.Task] = set()
+        self._encoding: Set[asyncio.Task] = set()
+        self._encode_slots: Optional[asyncio.Semaphore] = None
+        # In-memory follow-ups (dedup bookkeeping); lost on restart, which is fine
+        self._callbacks: Dict[str, SavedCallback] = {}
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._conn = await asyncio.to_thread(self._open)
+        self._wakeup = asyncio.Event()
+        self._encode_slots = asyncio.Semaphore(self.encode_workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"UploadSpool started ({self.path}, workers={self.workers}, pending={self._count('pending')})")
+
+    async def stop(self):
+        """Stops the workers; unfinished jobs stay on disk for the next start"""
+        # Snapshots being encoded are only in memory, let them reach the file first
+        await asyncio.gather(*self._encoding, return_exceptions=True)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Saves already handed to the EventWriter get their commit before it stops
+        await asyncio.gather(*self._saving, return_exceptions=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        logger.info("UploadSpool stopped")
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        # Crash recovery: whatever was in flight when the process died is retried
+        unrendered = conn.execute("UPDATE jobs SET state = 'pending' WHERE state = 'encoding'").rowcount
+        if unrendered:
+            self.unrendered += unrendered
+            logger.warning(f"{unrendered} snapshots were never encoded, uploading their original frames instead")
+        recovered = conn.execute(
+            "UPDATE jobs SET state = 'pending' WHERE state IN ('claimed', 'saving')"
+        ).rowcount
+        if recovered:
+            logger.warning(f"Recovered {recovered} interrupted uploads from {self.path}")
+        return conn
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _count(self, state: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)).fetchone()[0]
+
+    async def enqueue(
+        self,
+        image_bytes: Optional[bytes],
+        filename: str,
+        event_data: Dict,
+        on_saved: Optional[SavedCallback] = None,
+        event_id: Optional[str] = None,
+        image_url: Optional[str] = None,
+        thumbnail_url: Optional[str] = None,
+        thumbnail_bytes: Optional[bytes] = None
+    ) -> str:
+        """
+        Spools one encoded snapshot + event, returns the event id it will be
+        saved under. `image_bytes` is None when `image_url` reuses an
+        earlier upload; then only the event is saved.
+        """
+        event_id, _ = await self._insert(
+            event_id, filename, image_bytes, thumbnail_bytes, event_data, image_url, thumbnail_url,
+            "pending", on_saved
+        )
+        self._wakeup.set()
+        return event_id
+
+    async def enqueue_render(
+        self,
+        render: Callable[[], Tuple[bytes, bytes]],
+        original: bytes,
+        filename: str,
+        event_data: Dict,
+        on_saved: Optional[SavedCallback] = None,
+        event_id: Optional[str] = None
+    ) -> str:
+        """
+        Like `enqueue`, but the snapshot is produced later by `render`
+        (-> full JPEG, thumbnail JPEG) on an encoder thread. `original` (the
+        camera's JPEG) is stored meanwhile and uploaded as-is if rendering
+        fails or the process dies first.
+        """
+        if len(self._encoding) >= self.max_encode_backlog:
+            # Encoder threads are far behind: encode in this request instead of holding one more frame
+            self.inline_encodes += 1
+            image, thumbnail = await self._render(render, original)
+            return await self.enqueue(image, filename, event_data, on_saved, event_id, thumbnail_bytes=thumbnail)
+
+        event_id, job_id = await self._insert(
+            event_id, filename, original, None, event_data, None, None, "encoding", on_saved
+        )
+        task = asyncio.create_task(self._encode(job_id, render, original))
+        self._encoding.add(task)
+        task.add_done_callback(self._encoding.discard)
+        return event_id
+
+    async def _insert(
+        self,
+        event_id: Optional[str],
+        filename: str,
+        image_bytes: Optional[bytes],
+        thumbnail_bytes: Optional[bytes],
+        event_data: Dict,
+        image_url: Optional[str],
+        thumbnail_url: Optional[str],
+        state: str,
+        on_saved: Optional[SavedCallback]
+    ) -> Tuple[str, int]:
+        event_id = event_id or self.firebase_service.new_event_id()
+        if on_saved is not None:
+            self._callbacks[event_id] = on_saved
+        now = time()
+        cursor = await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO jobs (event_id, filename, image, thumbnail, event, image_url, thumbnail_url, "
+            "state, next_attempt, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                event_id, filename, sqlite3.Binary(image_bytes or b""), sqlite3.Binary(thumbnail_bytes or b""),
+                json.dumps(event_data), image_url, thumbnail_url, state, now, now
+            )
+        )
+        return event_id, cursor.lastrowid
+
+    async def _render(self, render: Callable[[], Tuple[bytes, bytes]], original: bytes) -> Tuple[bytes, bytes]:
+        try:
+            async with self._encode_slots:
+                return await asyncio.to_thread(render)
+        except Exception as e:
+            # The event still gets its picture, just the camera's frame without boxes
+            self.unrendered += 1
+            logger.error(f"Snapshot encoding failed, uploading the original frame: {str(e)}")
+            return original, b""
+
+    async def _encode(self, job_id: int, render: Callable[[], Tuple[bytes, bytes]], original: bytes):
+        image, thumbnail = await self._render(render, original)
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET image = ?, thumbnail = ?, state = 'pending' WHERE id = ?",
+            (sqlite3.Binary(image), sqlite3.Binary(thumbnail), job_id)
+        )
+        self._wakeup.set()
+
+    def _claim(self) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, event_id, filename, image, thumbnail, event, image_url, thumbnail_url, attempts FROM jobs "
+                "WHERE state = 'pending' AND next_attempt <= ? ORDER BY id LIMIT 1",
+                (time(),)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE jobs SET state = 'claimed' WHERE id = ?", (row[0],))
+            return row
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._upload(job)
+
+    async def _upload(self, job: tuple):
+        job_id, event_id, filename, image, thumbnail, event_json, image_url, thumbnail_url, attempts = job
+        try:
+            if image_url is None and image:
+                image_url = await asyncio.to_thread(self.firebase_service.upload_image, bytes(image), filename)
+            if thumbnail_url is None and thumbnail:
+                thumbnail_url = await asyncio.to_thread(
+                    self.firebase_service.upload_image, bytes(thumbnail), thumbnail_filename(filename)
+                )
+        except Exception as e:
+            await self._retry(job_id, event_id, attempts + 1, e)
+            return
+
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET image_url = ?, thumbnail_url = ?, state = 'saving' WHERE id = ?",
+            (image_url, thumbnail_url, job_id)
+        )
+        urls = {'image_url': image_url, 'thumbnail_url': thumbnail_url}
+        event_data = {**json.loads(event_json), **urls}
+        if self.event_store is not None:
+            # The local copy is the read path, it gets the URLs as soon as they exist
+            await asyncio.to_thread(self.event_store.update, event_id, urls)
+            # and already holds the count / last_seen updates made since enqueue,
+            # which the full set below would otherwise overwrite in Firestore
+            stored = await asyncio.to_thread(self.event_store.get, event_id, event_data.get('user_id'))
+            if stored is not None:
+                stored.pop('id', None)
+                event_data = stored
+        # The worker moves on to the next upload while the event waits for its WriteBatch
+        task = asyncio.create_task(self._save(job_id, event_id, event_data, attempts))
+        self._saving.add(task)
+        task.add_done_callback(self._saving.discard)
+
+    async def _save(self, job_id: int, event_id: str, event_data: Dict, attempts: int):
+        try:
+            await self.event_writer.save(event_data, event_id=event_id, durable=True)
+        except Exception as e:
+            await self._retry(job_id, event_id, attempts + 1, e)
+            return
+
+        await asyncio.to_thread(self._execute, "DELETE FROM jobs WHERE id = ?", (job_id,))
+        self.uploaded += 1
+        callback = self._callbacks.pop(event_id, None)
+        if callback is not None:
+            callback(event_id, event_data['image_url'], event_data['thumbnail_url'])
+
+    async def _retry(self, job_id: int, event_id: str, attempts: int, error: Exception):
+        if attempts >= self.max_attempts:
+            # The job stays on disk for inspection, but nothing will ever call its follow-up
+            self._callbacks.pop(event_id, None)
+            await asyncio.to_thread(
+                self._execute, "UPDATE jobs SET state = 'failed', attempts = ? WHERE id = ?", (attempts, job_id)
+            )
+            logger.error(f"Upload job {job_id} failed permanently after {attempts} attempts: {str(error)}")
+            return
+        self.retries += 1
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET state = 'pending', attempts = ?, next_attempt = ? WHERE id = ?",
+            (attempts, time() + delay, job_id)
+        )
+        logger.warning(f"Upload job {job_id} attempt {attempts} failed, retrying in {delay:.1f}s: {str(error)}")
+
+    def stats(self) -> Dict:
+        if self._conn is None:
+            return {}
+        with self._lock:
+            states = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created) FROM jobs WHERE state != 'failed'"
+            ).fetchone()[0]
+        return {
+            "pending": states.get("pending", 0),
+            "encoding": states.get("encoding", 0),
+            "in_flight": states.get("claimed", 0) + states.get("saving", 0),
+            "failed": states.get("failed", 0),
+            "oldest_pending_seconds": time() - oldest if oldest is not None else 0.0,
+            "uploaded": self.uploaded,
+            "retries": self.retries,
+            "inline_encodes": self.inline_encodes,
+            "unrendered": self.unrendered,
+        }
@@ -0,0 +1,164 @@
+
+import glob
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+YOLO_BACKENDS = ("torch", "onnx", "openvino", "int8")
+
+CALIBRATION_IMAGES = 100
+
+
+def artifact_path(model_path: str, backend: str, imgsz: int) -> str:
+    """Where the converted model for `backend` is cached (next to the source weights)"""
+    base = os.path.splitext(model_path)[0]
+    if backend == "torch":
+        return model_path
+    if backend == "onnx":
+        return f"{base}_{imgsz}.onnx"
+    if backend == "openvino":
+        return f"{base}_{imgsz}_openvino_model"
+    if backend == "int8":
+        return f"{base}_{imgsz}_int8.onnx"
+    raise ValueError(f"Unknown YOLO backend: {backend} (expected one of {YOLO_BACKENDS})")
+
+
+def _is_fresh(target: str, source: str) -> bool:
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def _export(model_path: str, fmt: str, imgsz: int) -> str:
+    from ultralytics import YOLO
+
+    # dynamic=True keeps the batch axis free so micro-batching still works
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, dynamic=True, verbose=False)
+    return str(exported)
+
+
+def _replace(source: str, target: str):
+    # Rename into place so concurrent workers never load a half-written artifact
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.replace(source, target)
+
+
+def prepare_yolo_artifact(
+    model_path: str,
+    backend: str = "torch",
+    imgsz: int = 640,
+    calibration_dir: Optional[str] = None
+) -> str:
+    """
+    Returns a model path ultralytics' YOLO() can load for the requested
+    backend, exporting and caching it on first use.
+    """
+    target = artifact_path(model_path, backend, imgsz)
+    if backend == "torch":
+        return target
+
+    if _is_fresh(target, model_path):
+        logger.info(f"Using cached {backend} YOLO artifact: {target}")
+        return target
+
+    logger.info(f"Exporting YOLO model to {backend} ({target})...")
+
+    if backend == "onnx":
+        _replace(_export(model_path, "onnx", imgsz), target)
+    elif backend == "openvino":
+        _replace(_export(model_path, "openvino", imgsz), target)
+    elif backend == "int8":
+        fp32_path = prepare_yolo_artifact(model_path, "onnx", imgsz)
+        quantize_onnx_int8(fp32_path, target, calibration_dir, imgsz)
+
+    logger.info(f"YOLO {backend} artifact ready: {target}")
+    return target
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """Same square letterbox (pad 114) ultralytics applies for exported models"""
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    return canvas
+
+
+def calibration_images(calibration_dir: Optional[str], limit: int = CALIBRATION_IMAGES) -> List[str]:
+    if not calibration_dir or not os.path.isdir(calibration_dir):
+        return []
+    paths = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        paths.extend(glob.glob(os.path.join(calibration_dir, "**", pattern), recursive=True))
+    return sorted(paths)[:limit]
+
+
+def quantize_onnx_int8(
+    fp32_path: str,
+    target: str,
+    calibration_dir: Optional[str],
+    imgsz: int
+):
+    """
+    Static int8 (QDQ) quantization of the exported ONNX model for ONNX Runtime,
+    calibrated on local camera frames (e.g. backend/dataset) so it works offline.
+    Only Conv layers are quantized; the detection head math stays fp32.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+    import onnxruntime
+
+    paths = calibration_images(calibration_dir)
+    if not paths:
+        raise RuntimeError(f"int8 YOLO backend needs calibration images, none found in {calibration_dir}")
+
+    input_name = onnxruntime.InferenceSession(
+        fp32_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    class FrameReader(CalibrationDataReader):
+
+        def __init__(self):
+            self._frames: Iterator[dict] = self._load()
+
+        def _load(self):
+            for path in paths:
+                image = cv2.imread(path)
+                if image is None:
+                    continue
+                rgb = cv2.cvtColor(letterbox(image, imgsz), cv2.COLOR_BGR2RGB)
+                tensor = rgb.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+                yield {input_name: tensor}
+
+        def get_next(self):
+            return next(self._frames, None)
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".onnx", dir=os.path.dirname(target) or ".")
+    os.close(fd)
+    try:
+        quantize_static(
+            fp32_path,
+            tmp_path,
+            FrameReader(),
+            quant_format=QuantFormat.QDQ,
+            op_types_to_quantize=["Conv"],
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8
+        )
+        _replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    logger.info(f"Calibrated int8 YOLO on {len(paths)} images")
@@ -3,47 +3,77 @@
 from ultralytics import YOLO
 import numpy as np
 import logging
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
+
+from app.services.yolo_backends import prepare_yolo_artifact
 
 logger = logging.getLogger(__name__)
 
+# Person detections: one row per box, xyxy in frame pixels
+PERSON_DTYPE = np.dtype([('bbox', np.float32, (4,)), ('confidence', np.float32)])
+
 
 class YoloDetector:
     
-    def __init__(self, model_path: str):
-       
-        self.model = YOLO(model_path)
+    def __init__(
+        self,
+        model_path: str,
+        backend: str = "torch",
+        imgsz: int = 640,
+        calibration_dir: Optional[str] = None
+    ):
+        # torch = ultralytics PyTorch; onnx / openvino / int8 are exported + cached on first load
+        self.backend = backend
+        self.imgsz = imgsz
+        artifact = prepare_yolo_artifact(model_path, backend, imgsz, calibration_dir)
+        
+        self.model = YOLO(artifact, task="detect")
+        # ultralytics' Model.predict rewrites shared predictor state (args, batch)
+        # on every call, so concurrent calls from executor threads must not overlap
+        self._predict_lock = threading.Lock()
         self.person_class_id = 0  
-        logger.info(f"YOLOv8 model loaded from {model_path}")
+        logger.info(f"YOLOv8 model loaded from {artifact} (backend={backend})")
     
     def detect_persons(
         self,
         image: np.ndarray,
         confidence_threshold: float = 0.5
-    ) -> List[Dict]:
+    ) -> np.ndarray:
       
-        results = self.model(image, verbose=False)
+        detections = self.detect_persons_batch([image], confidence_threshold)[0]
         
-        detections = []
+        logger.info(f"Detected {len(detections)} person(s)")
+        return detections
+    
+    def detect_persons_batch(
+        self,
+        images: List[np.ndarray],
+        confidence_threshold: float = 0.5,
+        imgsz: Optional[int] = None
+    ) -> List[np.ndarray]:
         
-        for result in results:
-            boxes = result.boxes
-            
-            for box in boxes:
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                
-                # Filter for person class only
-                if class_id == self.person_class_id and confidence >= confidence_threshold:
-                    bbox = box.xyxy[0].cpu().numpy().tolist()
-                    
-                    detections.append({
-                        'bbox': bbox,
-                        'confidence': confidence,
-                        'class_id': class_id
-                    })
+        # One model call for the whole batch, results come back in input order.
+        # Class + confidence filtering happen inside the model's NMS, not per box in Python.
+        with self._predict_lock:
+            results = self.model(
+                images,
+                imgsz=imgsz or self.imgsz,
+                classes=[self.person_class_id],
+                conf=confidence_threshold,
+                verbose=False
+            )
+        
+        return [self._parse_result(result) for result in results]
+    
+    def _parse_result(self, result) -> np.ndarray:
+        
+        boxes = result.boxes
+        detections = np.empty(len(boxes), dtype=PERSON_DTYPE)
+        if len(boxes):
+            detections['bbox'] = boxes.xyxy.cpu().numpy()
+            detections['confidence'] = boxes.conf.cpu().numpy()
         
-        logger.info(f"Detected {len(detections)} person(s)")
         return detections
     
     def detect_with_roi(
@@ -51,22 +81,19 @@ class YoloDetector:
         image: np.ndarray,
         roi: Dict,
         confidence_threshold: float = 0.5
-    ) -> List[Dict]:
+    ) -> np.ndarray:
         
         all_detections = self.detect_persons(image, confidence_threshold)
         
         roi_x, roi_y = roi['x'], roi['y']
         roi_w, roi_h = roi['width'], roi['height']
         
-        filtered_detections = []
-        
-        for det in all_detections:
-            x1, y1, x2, y2 = det['bbox']
-            center_x = (x1 + x2) / 2
-            center_y = (y1 + y2) / 2
-            
-            if (roi_x <= center_x <= roi_x + roi_w and
-                roi_y <= center_y <= roi_y + roi_h):
-                filtered_detections.append(det)
+        bboxes = all_detections['bbox']
+        center_x = (bboxes[:, 0] + bboxes[:, 2]) / 2
+        center_y = (bboxes[:, 1] + bboxes[:, 3]) / 2
         
-        return filtered_detections
\ No newline at end of file
+        inside = (
+            (roi_x <= center_x) & (center_x <= roi_x + roi_w) &
+            (roi_y <= center_y) & (center_y <= roi_y + roi_h)
+        )
+        return all_detections[inside]
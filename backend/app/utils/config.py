@@ -1,6 +1,6 @@
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 
@@ -15,6 +15,26 @@ class Settings(BaseSettings):
     # AI Models
     YOLO_MODEL_PATH: str = "models/yolov8n.pt"
     ARCFACE_MODEL_PATH: str = "models/best_arcface_model.pth"
+    # "eager" (PyTorch), "torchscript" (frozen), "onnx" (ONNX Runtime) or "int8" (ONNX Runtime static int8);
+    # converted artifacts are cached next to the weights
+    ARCFACE_BACKEND: str = "torchscript"
+    ARCFACE_CALIBRATION_DIR: str = "dataset"
+    # "torch", "onnx" (ONNX Runtime), "openvino" or "int8" (ONNX Runtime static int8)
+    YOLO_BACKEND: str = "torch"
+    YOLO_IMGSZ: int = 640
+    YOLO_CALIBRATION_DIR: str = "dataset"
+    # Face detection runs once per frame: "yunet" (cv2.FaceDetectorYN, falls back to Haar without the model) or "haar"
+    FACE_DETECTOR: str = "yunet"
+    FACE_DETECTOR_MODEL_PATH: str = "models/face_detection_yunet_2023mar.onnx"
+    FACE_DETECTOR_MAX_DIM: int = 640
+    FACE_DETECTOR_SCORE_THRESHOLD: float = 0.7
+    # Whitelist gallery: "float32" or "float16" storage, IVF (approximate) search above this many embeddings
+    FACE_GALLERY_DTYPE: str = "float32"
+    FACE_GALLERY_ANN_THRESHOLD: int = 100000
+    FACE_GALLERY_ANN_PROBES: int = 16
+    # Enrollment embeddings cached by (path, size, mtime); empty disables the cache
+    ENROLLMENT_CACHE_PATH: str = "models/enrollment_cache.npz"
+    ENROLLMENT_WORKERS: int = 4
     
     # Server
     HOST: str = "0.0.0.0"
@@ -24,6 +44,92 @@ class Settings(BaseSettings):
     # Detection
     CONFIDENCE_THRESHOLD: float = 0.5
     FACE_RECOGNITION_THRESHOLD: float = 0.6
+    # Uploads are decoded straight to this size (matches enhance_for_night's 1280 limit)
+    DECODE_MAX_DIM: int = 1280
+    
+    # Inference executor ("thread", "process" or "shm"); frames beyond workers + queue get 503
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_WORKERS: int = 4
+    INFERENCE_MAX_QUEUE: int = 32
+    INFERENCE_RETRY_AFTER: int = 1
+    
+    # CPU budget: cores are split into one slice per inference worker (0 = auto)
+    CPU_CORES: int = 0
+    CPU_THREADS_PER_WORKER: int = 0
+    CPU_OPENCV_THREADS: int = 0
+    # Pin each process/shm worker to its own core slice
+    CPU_PIN_WORKERS: bool = False
+    
+    # "shm" mode: model-worker processes fed through shared-memory frame slots
+    SHM_SLOTS_PER_WORKER: int = 2
+    SHM_SLOT_MAX_DIM: int = 1280
+    # Longest a request waits for its model worker before answering 503
+    SHM_INFER_TIMEOUT_SECONDS: float = 30.0
+    
+    # Motion gate (skip YOLO when a camera's scene has not changed)
+    MOTION_GATE_ENABLED: bool = True
+    MOTION_GATE_WIDTH: int = 160
+    MOTION_GATE_PIXEL_THRESHOLD: int = 25
+    MOTION_GATE_MIN_CHANGED_RATIO: float = 0.01
+    MOTION_GATE_LEARNING_RATE: float = 0.05
+    MOTION_GATE_MAX_SKIP_SECONDS: float = 10.0
+    # JSON, e.g. {"door-1": {"min_changed_ratio": 0.005}}
+    MOTION_GATE_CAMERA_OVERRIDES: Dict[str, Dict[str, float]] = {}
+    
+    # Tracking (stable track ids per camera, face identity cached on the track)
+    TRACKING_ENABLED: bool = True
+    TRACK_IOU_THRESHOLD: float = 0.3
+    TRACK_MAX_AGE_SECONDS: float = 2.0
+    TRACK_IDENTITY_TTL_SECONDS: float = 5.0
+    
+    # Alert dedup (collapse repeats of the same camera / identity / region)
+    ALERT_DEDUP_ENABLED: bool = True
+    ALERT_COOLDOWN_SECONDS: float = 60.0
+    ALERT_REGION_GRID: int = 3
+    ALERT_UPDATE_INTERVAL_SECONDS: float = 15.0
+    
+    # Micro-batching (collect frames from concurrent requests into one YOLO call)
+    BATCH_INFERENCE_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # ROI cache: "listen" (Firestore snapshot listener) or "poll" (full reload every N seconds)
+    ROI_CACHE_SYNC: str = "listen"
+    ROI_CACHE_REFRESH_SECONDS: float = 60.0
+    
+    # Event writer: detection events are committed as Firestore WriteBatches (max 500 writes)
+    EVENT_WRITER_BATCH_SIZE: int = 100
+    EVENT_WRITER_FLUSH_MS: float = 500.0
+    EVENT_WRITER_MAX_QUEUE: int = 10000
+    
+    # Local SQLite event store, the primary read path for /api/events (empty = read from Firestore)
+    EVENT_STORE_PATH: str = "data/events.db"
+    
+    # Without the local store, Firestore pages are cached per user for this long (new events invalidate them)
+    EVENT_CACHE_TTL_SECONDS: float = 5.0
+    EVENT_CACHE_MAX_ENTRIES: int = 1024
+    
+    # Upload spool: snapshots + events wait on disk until a worker has uploaded and saved them
+    UPLOAD_SPOOL_PATH: str = "data/upload_spool.db"
+    UPLOAD_WORKERS: int = 4
+    UPLOAD_RETRY_BASE_SECONDS: float = 1.0
+    UPLOAD_RETRY_MAX_SECONDS: float = 300.0
+    UPLOAD_MAX_ATTEMPTS: int = 20
+    
+    # Event snapshots: full-size image + list thumbnail, encoded in the background only when uploaded
+    SNAPSHOT_MAX_DIM: int = 1280
+    SNAPSHOT_QUALITY: int = 80
+    SNAPSHOT_THUMBNAIL_MAX_DIM: int = 320
+    SNAPSHOT_THUMBNAIL_QUALITY: int = 70
+    SNAPSHOT_ENCODE_WORKERS: int = 2
+    # Snapshots waiting for an encoder thread; beyond this the request encodes its own
+    SNAPSHOT_ENCODE_BACKLOG: int = 32
+    
+    # Snapshot dedup: reuse a recent upload's URL when the frame's dHash is within this many bits (of 64)
+    SNAPSHOT_DEDUP_ENABLED: bool = True
+    SNAPSHOT_DEDUP_MAX_DISTANCE: int = 6
+    SNAPSHOT_DEDUP_MAX_AGE_SECONDS: float = 300.0
+    SNAPSHOT_DEDUP_PER_CAMERA: int = 8
     
     class Config:
         env_file = ".env"
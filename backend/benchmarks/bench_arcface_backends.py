@@ -0,0 +1,86 @@
+"""
+ArcFace embedding throughput and whitelist parity per backend (eager,
+torchscript, onnx, int8) on face crops from backend/dataset.
+
+Parity: half of the crops act as the whitelist (eager embeddings), the other
+half as queries; reported is the max drift of the query-vs-whitelist cosine
+similarities from eager, and how often the best match stays the same.
+
+    python benchmarks/bench_arcface_backends.py                               # random weights
+    python benchmarks/bench_arcface_backends.py --model models/best_arcface_model.pth
+
+With random weights the throughput numbers hold, but int8 parity is not
+representative: calibration ranges of an untrained net are meaningless.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.arcface_backends import ARCFACE_BACKENDS, calibration_faces  # noqa: E402
+from app.services.face_recognizer import ArcFaceModel, FaceRecognizer  # noqa: E402
+
+REPEAT = 5
+
+
+def throughput(recognizer, faces, batch_size):
+    batch = (faces * (batch_size // len(faces) + 1))[:batch_size]
+    recognizer.extract_embeddings_batch(batch)
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        recognizer.extract_embeddings_batch(batch)
+    return batch_size * REPEAT / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--backends", nargs="+", default=list(ARCFACE_BACKENDS))
+    args = parser.parse_args()
+
+    faces = calibration_faces(args.dataset, limit=64)
+    if not faces:
+        sys.exit(f"No images found in {args.dataset}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model
+        if model_path is None:
+            import torch
+
+            torch.manual_seed(0)
+            model = ArcFaceModel()
+            # Non-trivial BN statistics so folding is actually exercised
+            model.backbone_bn.running_mean.normal_()
+            model.backbone_bn.running_var.uniform_(0.5, 2.0)
+            model_path = os.path.join(tmp, "arcface.pth")
+            torch.save(model.state_dict(), model_path)
+
+        reference = None
+        print(f"{len(faces)} face crops from {args.dataset}\n")
+        print(f"{'backend':>12} {'load s':>7} {'b=1 f/s':>8} {'b=16 f/s':>9} {'max drift':>10} {'top-1 agree':>12}")
+        for backend in args.backends:
+            started = time.perf_counter()
+            recognizer = FaceRecognizer(model_path, backend=backend, calibration_dir=args.dataset)
+            load = time.perf_counter() - started
+
+            embeddings = recognizer.extract_embeddings_batch(faces)
+            if reference is None:
+                reference = embeddings
+            whitelist = reference[::2]
+            expected = reference[1::2] @ whitelist.T
+            similarities = embeddings[1::2] @ whitelist.T
+            drift = np.abs(similarities - expected).max()
+            agree = (similarities.argmax(axis=1) == expected.argmax(axis=1)).mean()
+
+            print(f"{backend:>12} {load:7.2f} {throughput(recognizer, faces, 1):8.1f} "
+                  f"{throughput(recognizer, faces, 16):9.1f} {drift:10.4f} {agree:12.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+ArcFace cold start: time from a fresh interpreter to a ready FaceRecognizer
+model, for the eager path (build ResNet50 in Python + load the state dict)
+and the cached TorchScript artifact (first run exports it, later runs only
+torch.jit.load it).
+
+    python benchmarks/bench_arcface_startup.py                      # random weights in a temp dir
+    python benchmarks/bench_arcface_startup.py models/best_arcface_model.pth
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RUNS = 3
+
+CHILD = """
+import time
+started = time.perf_counter()
+import sys
+sys.path.insert(0, {backend_dir!r})
+from app.services.face_recognizer import FaceRecognizer
+recognizer = FaceRecognizer({model_path!r}, backend={backend!r})
+print(time.perf_counter() - started, recognizer.load_seconds)
+"""
+
+
+def cold_start(model_path, backend):
+    code = CHILD.format(backend_dir=BACKEND_DIR, model_path=model_path, backend=backend)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    total, load = output.stdout.strip().splitlines()[-1].split()
+    return float(total), float(load)
+
+
+def make_random_weights(directory):
+    sys.path.insert(0, BACKEND_DIR)
+    import torch
+    from app.services.face_recognizer import ArcFaceModel
+
+    path = os.path.join(directory, "arcface.pth")
+    torch.save(ArcFaceModel().state_dict(), path)
+    return path
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = sys.argv[1] if len(sys.argv) > 1 else make_random_weights(tmp)
+        from app.services.arcface_backends import artifact_path
+
+        artifact = artifact_path(model_path, "torchscript")
+        if os.path.exists(artifact):
+            os.remove(artifact)
+
+        print(f"{'mode':>22} {'process s':>10} {'model s':>8}")
+        total, load = cold_start(model_path, "torchscript")
+        print(f"{'torchscript (export)':>22} {total:10.2f} {load:8.2f}")
+        for backend, label in (("eager", "eager"), ("torchscript", "torchscript (cached)")):
+            runs = [cold_start(model_path, backend) for _ in range(RUNS)]
+            total = min(r[0] for r in runs)
+            load = min(r[1] for r in runs)
+            print(f"{label:>22} {total:10.2f} {load:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
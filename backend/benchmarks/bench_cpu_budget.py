@@ -0,0 +1,98 @@
+"""
+Throughput / tail latency of the inference pool under different CPU budgets.
+
+Each (workers, threads per worker) configuration runs in its own
+subprocess, because torch's inter-op pool can only be sized once per
+process. Every worker thread runs ArcFace embeddings (random weights) on
+batches of synthetic face crops, the same per-frame work shape as the
+recognition stage.
+
+    python benchmarks/bench_cpu_budget.py
+    python benchmarks/bench_cpu_budget.py --configs 1x4 2x2 4x1 4x4 --seconds 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def run_config(workers, threads, seconds, batch_size):
+    from app.services.cpu_budget import CpuBudget
+
+    budget = CpuBudget(workers=workers, threads_per_worker=threads)
+    budget.apply()
+
+    from app.services.face_recognizer import FaceRecognizer
+
+    # Missing weights -> untrained eager model, same compute cost
+    recognizer = FaceRecognizer("models/missing.pth", backend="eager")
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 255, (120, 100, 3), dtype=np.uint8) for _ in range(batch_size)]
+    recognizer.extract_embeddings_batch(faces)
+
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            recognizer.extract_embeddings_batch(faces)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    pool = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    return {
+        "faces_per_s": len(latencies) * batch_size / seconds,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", nargs="+", default=None,
+                        help="WORKERSxTHREADS, default: a sweep over the available cores")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        workers, threads = (int(v) for v in args.child.split("x"))
+        print(json.dumps(run_config(workers, threads, args.seconds, args.batch)))
+        return
+
+    from app.services.cpu_budget import available_cores
+
+    cores = len(available_cores())
+    configs = args.configs or sorted({
+        f"{w}x{t}" for w in (1, 2, 4) for t in (1, max(1, cores // w), cores)
+    })
+
+    print(f"{cores} cores, batch {args.batch}, {args.seconds:.0f}s per config\n")
+    print(f"{'config':>8} {'faces/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for config in configs:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", config,
+             "--seconds", str(args.seconds), "--batch", str(args.batch)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{config:>8} {result['faces_per_s']:9.1f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
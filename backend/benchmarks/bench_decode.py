@@ -0,0 +1,80 @@
+"""
+Compares the old upload path (full imdecode -> resize to 1280 -> imencode)
+with image_codec (reduced-resolution DCT decode -> resize -> encode).
+
+    python benchmarks/bench_decode.py                 # synthetic 1080p / 4K / 8K frames
+    python benchmarks/bench_decode.py frame.jpg ...   # your own camera frames
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.image_codec import (  # noqa: E402
+    decode_image, encode_jpeg, jpeg_dimensions, reduced_decode_factor
+)
+
+MAX_DIM = 1280
+REPEAT = 20
+
+
+def synthetic_jpeg(width, height):
+    # Smooth gradients + noise compress like a real scene, unlike pure noise
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.dstack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                       np.full((height, width), 128, np.float32)])
+    image += np.random.normal(0, 8, image.shape).astype(np.float32)
+    _, buffer = cv2.imencode('.jpg', np.clip(image, 0, 255).astype(np.uint8), [int(cv2.IMWRITE_JPEG_QUALITY), 90])
+    return buffer.tobytes()
+
+
+def old_path(data):
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    peak = image.nbytes
+    h, w = image.shape[:2]
+    if max(h, w) > MAX_DIM:
+        scale = MAX_DIM / max(h, w)
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+    return buffer.tobytes(), peak
+
+
+def new_path(data):
+    # decode_image already lands on MAX_DIM; its frame is encoded as is
+    image = decode_image(data, MAX_DIM)
+    # Peak is the reduced-resolution decode buffer, before the final resize
+    h, w = jpeg_dimensions(data)
+    factor = reduced_decode_factor(h, w, MAX_DIM)
+    peak = -(-h // factor) * -(-w // factor) * 3
+    return encode_jpeg(image, 80), peak
+
+
+def bench(fn, data):
+    fn(data)
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        _, peak = fn(data)
+    return 1000 * (time.perf_counter() - started) / REPEAT, peak
+
+
+def main():
+    if len(sys.argv) > 1:
+        cases = [(os.path.basename(p), open(p, "rb").read()) for p in sys.argv[1:]]
+    else:
+        cases = [(f"{w}x{h}", synthetic_jpeg(w, h)) for w, h in ((1920, 1080), (3840, 2160), (7680, 4320))]
+
+    print(f"{'frame':>12} {'old ms':>8} {'new ms':>8} {'speedup':>8} {'old MB':>8} {'new MB':>8}")
+    for name, data in cases:
+        old_ms, old_peak = bench(old_path, data)
+        new_ms, new_peak = bench(new_path, data)
+        print(f"{name:>12} {old_ms:8.1f} {new_ms:8.1f} {old_ms / new_ms:7.2f}x "
+              f"{old_peak / 1e6:8.1f} {new_peak / 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
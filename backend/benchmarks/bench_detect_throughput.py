@@ -0,0 +1,94 @@
+"""
+Load generator for /api/detect.
+
+Posts JPEG frames from N concurrent "cameras" against a running server and
+reports throughput / latency, plus the server's /api/stats afterwards.
+Run it against each INFERENCE_EXECUTOR mode (thread / process / shm) and
+worker count to see how throughput scales with cores.
+
+    python benchmarks/bench_detect_throughput.py --url http://localhost:8000 --cameras 40 --frames 20
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_frames(dataset_dir):
+    paths = sorted(glob.glob(os.path.join(dataset_dir, "*", "*.jpg")))
+    if not paths:
+        raise SystemExit(f"No .jpg files found under {dataset_dir}")
+    frames = []
+    for path in paths[:50]:
+        with open(path, "rb") as f:
+            frames.append(f.read())
+    return frames
+
+
+def run_camera(url, token, frames, count, camera_index):
+    latencies, statuses = [], {}
+    session = requests.Session()
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(count):
+        frame = frames[(camera_index + i) % len(frames)]
+        started = time.perf_counter()
+        response = session.post(
+            f"{url}/api/detect",
+            files={"file": ("frame.jpg", frame, "image/jpeg")},
+            data={"camera_id": f"bench-{camera_index}"},
+            headers=headers,
+            timeout=60
+        )
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", default="test_token")
+    parser.add_argument("--cameras", type=int, default=40)
+    parser.add_argument("--frames", type=int, default=20, help="frames per camera")
+    parser.add_argument("--dataset", default=os.path.join(HERE, "..", "dataset"))
+    args = parser.parse_args()
+
+    frames = load_frames(args.dataset)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.cameras) as pool:
+        results = list(pool.map(
+            lambda i: run_camera(args.url, args.token, frames, args.frames, i),
+            range(args.cameras)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for lat, _ in results for l in lat)
+    statuses = {}
+    for _, st in results:
+        for code, n in st.items():
+            statuses[code] = statuses.get(code, 0) + n
+
+    print(f"requests:    {len(latencies)} in {elapsed:.2f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} frames/s")
+    print(f"latency p50: {1000 * statistics.median(latencies):.1f} ms")
+    print(f"latency p95: {1000 * latencies[int(0.95 * (len(latencies) - 1))]:.1f} ms")
+    print(f"latency p99: {1000 * latencies[int(0.99 * (len(latencies) - 1))]:.1f} ms")
+    print(f"status:      {statuses}")
+
+    stats = requests.get(
+        f"{args.url}/api/stats",
+        headers={"Authorization": f"Bearer {args.token}"},
+        timeout=10
+    )
+    print(f"server:      {stats.json()}")
+
+
+if __name__ == "__main__":
+    main()
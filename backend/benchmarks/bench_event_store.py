@@ -0,0 +1,79 @@
+"""
+Read latency of the local event store (the /api/events read path) with a
+realistic history: N events spread over users and cameras.
+
+    python benchmarks/bench_event_store.py
+    python benchmarks/bench_event_store.py --events 1000000 --users 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.event_store import EventStore  # noqa: E402
+
+REPEAT = 500
+
+
+def measure(fn):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--cameras", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    detection = {"bbox": [10.0, 20.0, 110.0, 220.0], "confidence": 0.91, "face_id": "unknown", "alert": True}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EventStore(os.path.join(tmp, "events.db"))
+        started = time.perf_counter()
+        ids = []
+        for i in range(args.events):
+            ids.append(store.add({
+                "user_id": f"user-{rng.randrange(args.users)}",
+                "camera_id": f"cam-{rng.randrange(args.cameras)}",
+                "timestamp": f"2024-01-01T00:00:00.{i:06d}",
+                "detections": [detection],
+                "image_url": "https://res.cloudinary.com/demo/image/upload/detections/x.jpg",
+                "alert": rng.random() < 0.3,
+                "count": 1
+            }))
+        insert = (time.perf_counter() - started) / args.events * 1e6
+
+        user = "user-0"
+        page = store.query(user, limit=50)
+        cursor = page[-1]["id"]
+        event_id = page[0]["id"]
+
+        print(f"{args.events} events, {args.users} users, insert {insert:.0f} us/event\n")
+        print(f"{'query':>24} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, fn in (
+            ("first page (50)", lambda: store.query(user, limit=50)),
+            ("next page (cursor)", lambda: store.query(user, limit=50, start_after=cursor)),
+            ("alerts only", lambda: store.query(user, limit=50, alert_only=True)),
+            ("camera filter", lambda: store.query(user, limit=50, camera_id="cam-1")),
+            ("single event", lambda: store.get(event_id, user)),
+        ):
+            p50, p99 = measure(fn)
+            print(f"{name:>24} {p50:8.3f} {p99:8.3f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-frame face detection latency and recall on the enrollment dataset:
+the old Haar cascade at full resolution vs the FaceDetector stage (one pass
+over a downscaled frame, YuNet when its ONNX model is available).
+
+Every dataset image contains exactly one enrolled face, so recall is the
+share of images where at least one face was found.
+
+    python benchmarks/bench_face_detectors.py
+    python benchmarks/bench_face_detectors.py --dataset dataset --yunet models/face_detection_yunet_2023mar.onnx
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.face_detector import FaceDetector  # noqa: E402
+from app.utils.config import settings  # noqa: E402
+
+
+class FullResHaar:
+    """The previous FaceRecognizer.detect_faces: Haar on the full-resolution image"""
+
+    backend = "haar"
+
+    def __init__(self):
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def detect(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+
+
+def load_images(dataset):
+    paths = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        paths.extend(glob.glob(os.path.join(dataset, "**", pattern), recursive=True))
+    images = [cv2.imread(p) for p in sorted(paths)]
+    return [img for img in images if img is not None]
+
+
+def bench(detector, images):
+    detector.detect(images[0])
+    latencies, found = [], 0
+    for image in images:
+        started = time.perf_counter()
+        faces = detector.detect(image)
+        latencies.append(1000 * (time.perf_counter() - started))
+        found += len(faces) > 0
+    return np.median(latencies), np.percentile(latencies, 95), found / len(images)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--yunet", default=settings.FACE_DETECTOR_MODEL_PATH)
+    parser.add_argument("--max-dim", type=int, default=settings.FACE_DETECTOR_MAX_DIM)
+    args = parser.parse_args()
+
+    images = load_images(args.dataset)
+    if not images:
+        sys.exit(f"No images found in {args.dataset}")
+    h, w = images[0].shape[:2]
+    print(f"{len(images)} images from {args.dataset} (first is {w}x{h})\n")
+
+    detectors = [
+        ("haar full-res (old)", FullResHaar()),
+        (f"haar @{args.max_dim}", FaceDetector("haar", max_dim=args.max_dim)),
+    ]
+    if os.path.exists(args.yunet):
+        detectors.append((f"yunet @{args.max_dim}", FaceDetector("yunet", args.yunet, max_dim=args.max_dim)))
+    else:
+        print(f"YuNet model not found at {args.yunet}, skipping it\n")
+
+    print(f"{'detector':>22} {'p50 ms':>8} {'p95 ms':>8} {'recall':>8}")
+    for name, detector in detectors:
+        p50, p95, recall = bench(detector, images)
+        print(f"{name:>22} {p50:8.1f} {p95:8.1f} {recall:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
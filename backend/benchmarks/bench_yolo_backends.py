@@ -0,0 +1,57 @@
+"""
+Per-backend YOLO latency on dataset frames (single frame and batched).
+
+    python benchmarks/bench_yolo_backends.py --model models/yolov8n.pt --backends torch onnx openvino int8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.yolo_detector import YoloDetector  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="models/yolov8n.pt")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino", "int8"])
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.dataset, "*", "*.jpg")))[:args.batch]
+    frames = [cv2.imread(p) for p in paths]
+    if not frames:
+        raise SystemExit(f"No .jpg files found under {args.dataset}")
+
+    print(f"{'backend':>10} {'load s':>8} {'1 frame ms':>11} {f'batch {len(frames)} ms/frame':>20} {'persons':>8}")
+    for backend in args.backends:
+        started = time.perf_counter()
+        detector = YoloDetector(args.model, backend=backend, imgsz=args.imgsz, calibration_dir=args.dataset)
+        load_s = time.perf_counter() - started
+
+        detector.detect_persons_batch(frames[:1])
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            detector.detect_persons_batch(frames[:1])
+        single_ms = 1000 * (time.perf_counter() - started) / args.repeat
+
+        detector.detect_persons_batch(frames)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            results = detector.detect_persons_batch(frames)
+        batch_ms = 1000 * (time.perf_counter() - started) / (args.repeat * len(frames))
+
+        persons = sum(len(r) for r in results)
+        print(f"{backend:>10} {load_s:8.1f} {single_ms:11.1f} {batch_ms:20.1f} {persons:8d}")
+
+
+if __name__ == "__main__":
+    main()
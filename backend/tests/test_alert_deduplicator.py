@@ -0,0 +1,43 @@
+
+from app.services.alert_deduplicator import AlertDeduplicator
+
+FRAME = (480, 640, 3)
+
+
+def intruder(x=100):
+    return {'bbox': [x, 100, x + 80, 300], 'face_id': 'unknown', 'alert': True}
+
+
+def test_repeats_are_suppressed():
+    """Test the same intruder in the same region opens one event and then only counts"""
+    dedup = AlertDeduplicator(cooldown_seconds=60, update_interval_seconds=0)
+
+    first = dedup.observe("u", "cam", [intruder()], FRAME, "2025-01-01T00:00:00")
+    assert first.action == "open"
+    dedup.attach(first.entries, "event-1", "https://img/1.jpg")
+
+    for i in range(1, 60):
+        decision = dedup.observe("u", "cam", [intruder(100 + i % 3)], FRAME, f"2025-01-01T00:00:{i:02d}")
+        assert decision.action == "suppress"
+        assert decision.image_url == "https://img/1.jpg"
+
+    updates = dedup.pending_updates()
+    assert updates == [("event-1", {"count": 60, "last_seen": "2025-01-01T00:00:59"})]
+    assert dedup.stats()["suppressed"] == 59
+
+
+def test_new_person_escalates():
+    """Test a second person in another region escalates the open event"""
+    dedup = AlertDeduplicator()
+    dedup.observe("u", "cam", [intruder(10)], FRAME, "t0")
+
+    decision = dedup.observe("u", "cam", [intruder(10), intruder(500)], FRAME, "t1")
+    assert decision.action == "escalate"
+    assert decision.should_upload
+
+
+def test_cooldown_reopens():
+    """Test an entry expires after the cooldown window"""
+    dedup = AlertDeduplicator(cooldown_seconds=0)
+    dedup.observe("u", "cam", [intruder()], FRAME, "t0")
+    assert dedup.observe("u", "cam", [intruder()], FRAME, "t1").action == "open"
@@ -0,0 +1,60 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from app.services.arcface_backends import calibration_faces
+from app.utils.config import settings
+
+# (runtime module, max cosine-similarity drift vs eager) per converted backend
+BACKENDS = {
+    "torchscript": (None, 1e-3),
+    "onnx": ("onnxruntime", 1e-3),
+    "int8": ("onnxruntime", 0.05),
+}
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(settings.ARCFACE_MODEL_PATH),
+    reason=f"ArcFace weights not found at {settings.ARCFACE_MODEL_PATH}"
+)
+
+
+@pytest.fixture(scope="module")
+def faces():
+    crops = calibration_faces("dataset", limit=40)
+    if not crops:
+        pytest.skip("No dataset images for parity check")
+    return crops
+
+
+@pytest.fixture(scope="module")
+def eager_embeddings(faces):
+    from app.services.face_recognizer import FaceRecognizer
+
+    return FaceRecognizer(settings.ARCFACE_MODEL_PATH, backend="eager").extract_embeddings_batch(faces)
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_backend_similarity_parity(backend, faces, eager_embeddings):
+    """Test cosine similarities against the enrolled whitelist stay within tolerance of eager"""
+    from app.services.face_recognizer import FaceRecognizer
+
+    module, max_drift = BACKENDS[backend]
+    if module and importlib.util.find_spec(module) is None:
+        pytest.skip(f"{module} not installed")
+
+    recognizer = FaceRecognizer(
+        settings.ARCFACE_MODEL_PATH,
+        backend=backend,
+        calibration_dir=settings.ARCFACE_CALIBRATION_DIR
+    )
+    embeddings = recognizer.extract_embeddings_batch(faces)
+
+    # Even rows act as the whitelist, odd rows as query faces
+    whitelist = eager_embeddings[::2]
+    reference = eager_embeddings[1::2] @ whitelist.T
+    similarities = embeddings[1::2] @ whitelist.T
+
+    assert np.abs(similarities - reference).max() <= max_drift
+    assert (similarities.argmax(axis=1) == reference.argmax(axis=1)).mean() >= 0.95
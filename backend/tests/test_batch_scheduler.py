@@ -0,0 +1,83 @@
+
+import asyncio
+import numpy as np
+
+from app.services.batch_scheduler import BatchScheduler
+from app.services.yolo_detector import PERSON_DTYPE
+
+
+class FakeDetector:
+    """Returns one detection per image tagged with the image value"""
+
+    def __init__(self):
+        self.calls = []
+        self.sizes = []
+
+    def detect_persons_batch(self, images, confidence_threshold=0.5, imgsz=None):
+        self.calls.append(len(images))
+        self.sizes.append(imgsz)
+        return [
+            np.array([([0, 0, 1, 1], img[0, 0, 0])], dtype=PERSON_DTYPE)
+            for img in images
+        ]
+
+
+def make_image(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def test_concurrent_frames_share_one_batch():
+    """Test concurrent submits are merged and each caller gets its own result"""
+    detector = FakeDetector()
+
+    async def run():
+        scheduler = BatchScheduler(detector, max_batch_size=8, max_wait_ms=50)
+        await scheduler.start()
+        results = await asyncio.gather(*[scheduler.submit(make_image(i)) for i in range(5)])
+        await scheduler.stop()
+        return scheduler, results
+
+    scheduler, results = asyncio.run(run())
+
+    assert detector.calls == [5]
+    assert [r[0]['confidence'] for r in results] == [0, 1, 2, 3, 4]
+    assert scheduler.stats.snapshot()['avg_batch_size'] == 5
+
+
+def test_batch_size_is_capped():
+    """Test batches never exceed max_batch_size"""
+    detector = FakeDetector()
+
+    async def run():
+        scheduler = BatchScheduler(detector, max_batch_size=2, max_wait_ms=20)
+        await scheduler.start()
+        await asyncio.gather(*[scheduler.submit(make_image(i)) for i in range(5)])
+        await scheduler.stop()
+
+    asyncio.run(run())
+
+    assert max(detector.calls) <= 2
+    assert sum(detector.calls) == 5
+
+
+def test_batch_is_split_by_input_size():
+    """Test frames asking for different imgsz go through separate model calls"""
+    detector = FakeDetector()
+
+    async def run():
+        scheduler = BatchScheduler(detector, max_batch_size=8, max_wait_ms=50)
+        await scheduler.start()
+        results = await asyncio.gather(
+            scheduler.submit(make_image(0)),
+            scheduler.submit(make_image(1), 320),
+            scheduler.submit(make_image(2)),
+            scheduler.submit(make_image(3), 320),
+        )
+        await scheduler.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    assert detector.calls == [2, 2]
+    assert detector.sizes == [None, 320]
+    assert [r[0]['confidence'] for r in results] == [0, 1, 2, 3]
@@ -0,0 +1,47 @@
+
+import cv2
+import torch
+
+from app.services.cpu_budget import CpuBudget
+
+
+def test_cores_split_into_worker_slices():
+    """Test each worker gets its own contiguous slice of the budgeted cores"""
+    budget = CpuBudget(workers=2, threads_per_worker=2)
+    budget.cores = [0, 1, 2, 3, 4, 5, 6, 7]
+
+    assert budget.worker_cores(0) == [0, 1]
+    assert budget.worker_cores(1) == [2, 3]
+    # More workers x threads than cores wraps around instead of failing
+    assert budget.worker_cores(4) == [0, 1]
+
+
+def test_auto_threads_divide_cores_between_workers():
+    """Test the default per-worker thread count never oversubscribes the cores"""
+    budget = CpuBudget(workers=64)
+
+    assert budget.threads_per_worker == max(1, len(budget.cores) // 64)
+    assert budget.opencv_threads == budget.threads_per_worker
+
+
+def test_thread_mode_budget_is_process_wide():
+    """Test in-process workers share one pool sized for all of them, capped at the cores"""
+    budget = CpuBudget(workers=2, threads_per_worker=1, in_process=True)
+
+    assert budget.process_threads == min(len(budget.cores), 2)
+    assert budget.opencv_threads == budget.process_threads
+    assert CpuBudget(workers=2, threads_per_worker=len(budget.cores), in_process=True).process_threads == len(budget.cores)
+    assert CpuBudget(workers=2, threads_per_worker=1).process_threads == 1
+
+
+def test_apply_sets_library_thread_counts():
+    """Test torch and OpenCV report the budgeted thread counts"""
+    torch_threads, opencv_threads = torch.get_num_threads(), cv2.getNumThreads()
+    try:
+        CpuBudget(workers=1, threads_per_worker=1, opencv_threads=1).apply()
+        effective = CpuBudget(workers=1, threads_per_worker=1, opencv_threads=1).describe()["effective"]
+        assert effective["torch_threads"] == 1
+        assert effective["opencv_threads"] == 1
+    finally:
+        torch.set_num_threads(torch_threads)
+        cv2.setNumThreads(opencv_threads)
@@ -0,0 +1,80 @@
+
+import os
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from app.services.enrollment_cache import enroll_from_folder
+from app.services.face_gallery import FaceGallery
+
+
+class FakeRecognizer:
+    """Whole image is the face; embedding encodes the image's pixel value"""
+
+    embedding_size = 128
+
+    def __init__(self):
+        self.model_path = "missing.pth"
+        self.face_detector = SimpleNamespace(backend="haar", max_dim=640, score_threshold=0.7)
+        self.gallery = FaceGallery()
+        self.embedded = 0
+
+    def detect_faces(self, image):
+        return [] if image.mean() == 0 else [(0, 0, image.shape[1], image.shape[0])]
+
+    def crop_face(self, image, face):
+        x, y, w, h = face
+        return image[y:y + h, x:x + w]
+
+    def extract_embeddings_batch(self, faces):
+        self.embedded += len(faces)
+        out = np.zeros((len(faces), self.embedding_size), dtype=np.float32)
+        for i, face in enumerate(faces):
+            out[i, int(face[0, 0, 0]) % self.embedding_size] = 1.0
+        return out
+
+
+def write_image(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, np.full((20, 20, 3), value, dtype=np.uint8))
+
+
+def test_restart_only_embeds_new_and_changed_images(tmp_path):
+    """Test cached embeddings are reused and only new / modified files are processed"""
+    dataset = tmp_path / "dataset"
+    cache_path = str(tmp_path / "cache.npz")
+    write_image(str(dataset / "alice" / "1.png"), 10)
+    write_image(str(dataset / "alice" / "2.png"), 20)
+    write_image(str(dataset / "bob" / "1.png"), 30)
+    write_image(str(dataset / "bob" / "noface.png"), 0)
+
+    first = FakeRecognizer()
+    assert enroll_from_folder(first, str(dataset), cache_path) == {"alice": 2, "bob": 1}
+    assert first.embedded == 3
+
+    second = FakeRecognizer()
+    enroll_from_folder(second, str(dataset), cache_path)
+    assert second.embedded == 0
+    assert np.array_equal(second.gallery.matrix, first.gallery.matrix)
+
+    write_image(str(dataset / "bob" / "1.png"), 40)
+    os.utime(dataset / "bob" / "1.png", ns=(1, 1))
+    write_image(str(dataset / "carol" / "1.png"), 50)
+    third = FakeRecognizer()
+    assert enroll_from_folder(third, str(dataset), cache_path) == {"alice": 2, "bob": 1, "carol": 1}
+    assert third.embedded == 2
+
+
+def test_model_change_invalidates_cache(tmp_path):
+    """Test embeddings built with other weights are not reused"""
+    dataset = tmp_path / "dataset"
+    cache_path = str(tmp_path / "cache.npz")
+    write_image(str(dataset / "alice" / "1.png"), 10)
+
+    enroll_from_folder(FakeRecognizer(), str(dataset), cache_path)
+    other = FakeRecognizer()
+    other.face_detector.backend = "yunet"
+    enroll_from_folder(other, str(dataset), cache_path)
+
+    assert other.embedded == 1
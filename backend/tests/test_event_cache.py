@@ -0,0 +1,93 @@
+import asyncio
+
+from app.services.event_cache import EventQueryCache
+
+
+class FakeEvents:
+    """Counts Firestore queries; each load returns the user's current events"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.queries = 0
+        self.events = {"alice": [{"id": "e1", "user_id": "alice"}]}
+
+    def loader(self, user_id):
+        async def load():
+            self.queries += 1
+            snapshot = list(self.events.get(user_id, []))
+            await asyncio.sleep(self.delay)
+            return snapshot
+        return load
+
+
+def key(user_id):
+    return (user_id, 50, False, "")
+
+
+def test_repeated_polls_hit_cache_within_ttl():
+    """Test dashboard polls within the TTL are served without a new query"""
+    store = FakeEvents()
+
+    async def run():
+        cache = EventQueryCache(ttl_seconds=60)
+        for _ in range(5):
+            await cache.get(key("alice"), store.loader("alice"))
+        return cache
+
+    cache = asyncio.run(run())
+
+    assert store.queries == 1
+    assert cache.stats()["hits"] == 4
+
+
+def test_committed_event_invalidates_only_its_user():
+    """Test a new event drops its user's cached pages and leaves other users cached"""
+    store = FakeEvents()
+
+    async def run():
+        cache = EventQueryCache(ttl_seconds=60)
+        await cache.get(key("alice"), store.loader("alice"))
+        await cache.get(key("bob"), store.loader("bob"))
+
+        store.events["alice"].insert(0, {"id": "e2", "user_id": "alice"})
+        cache.on_events_committed([("set", "e2", {"user_id": "alice"}), ("update", "e1", {"count": 2})])
+
+        alice = await cache.get(key("alice"), store.loader("alice"))
+        await cache.get(key("bob"), store.loader("bob"))
+        return alice
+
+    alice = asyncio.run(run())
+
+    assert [e["id"] for e in alice] == ["e2", "e1"]
+    assert store.queries == 3
+
+
+def test_concurrent_misses_share_one_query():
+    """Test simultaneous requests for the same page run a single Firestore query"""
+    store = FakeEvents(delay=0.05)
+
+    async def run():
+        cache = EventQueryCache(ttl_seconds=60)
+        return await asyncio.gather(*[cache.get(key("alice"), store.loader("alice")) for _ in range(4)])
+
+    results = asyncio.run(run())
+
+    assert store.queries == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_query_started_before_a_write_is_not_cached():
+    """Test a page loaded concurrently with an invalidation is not kept as fresh"""
+    store = FakeEvents(delay=0.05)
+
+    async def run():
+        cache = EventQueryCache(ttl_seconds=60)
+        pending = asyncio.create_task(cache.get(key("alice"), store.loader("alice")))
+        await asyncio.sleep(0.01)
+        cache.invalidate("alice")
+        await pending
+        await cache.get(key("alice"), store.loader("alice"))
+
+    asyncio.run(run())
+
+    assert store.queries == 2
@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.event_store import EventStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    yield store
+    store.close()
+
+
+def add_events(store, user_id, count, camera_id="cam-1"):
+    return [
+        store.add({
+            "user_id": user_id,
+            "camera_id": camera_id,
+            "timestamp": f"2024-01-01T00:00:{i:02d}",
+            "detections": [],
+            "image_url": None,
+            "alert": i % 2 == 0
+        })
+        for i in range(count)
+    ]
+
+
+def test_pages_follow_cursor_newest_first(store):
+    """Test start_after pages through all of a user's events without gaps or repeats"""
+    ids = add_events(store, "alice", 7)
+    add_events(store, "bob", 3)
+
+    pages, cursor = [], None
+    while True:
+        page = store.query("alice", limit=3, start_after=cursor)
+        if not page:
+            break
+        pages.append([e["id"] for e in page])
+        cursor = page[-1]["id"]
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert sum(pages, []) == ids[::-1]
+
+
+def test_filters_by_alert_and_camera(store):
+    """Test alert_only and camera_id narrow the results"""
+    add_events(store, "alice", 4, camera_id="door")
+    add_events(store, "alice", 2, camera_id="yard")
+
+    assert len(store.query("alice", alert_only=True)) == 3
+    assert {e["camera_id"] for e in store.query("alice", camera_id="yard")} == {"yard"}
+
+
+def test_update_merges_fields_and_get_checks_owner(store):
+    """Test updates merge into the stored event and other users cannot read it"""
+    event_id = add_events(store, "alice", 1)[0]
+
+    store.update(event_id, {"image_url": "https://cdn.example.com/a.jpg", "count": 4})
+
+    event = store.get(event_id, "alice")
+    assert event["image_url"] == "https://cdn.example.com/a.jpg"
+    assert event["count"] == 4
+    assert store.get(event_id, "mallory") is None
+
+
+def test_queries_use_indexes(store):
+    """Test the listing queries are index lookups, not table scans"""
+    plans = [
+        store._reader().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        for sql, params in (
+            ("SELECT id FROM events WHERE user_id = ? ORDER BY created_at DESC, id DESC", ("a",)),
+            ("SELECT id FROM events WHERE user_id = ? AND alert = 1 ORDER BY created_at DESC, id DESC", ("a",)),
+            ("SELECT id FROM events WHERE camera_id = ? ORDER BY created_at DESC, id DESC", ("c",)),
+        )
+    ]
+
+    for plan in plans:
+        details = " ".join(row[-1] for row in plan)
+        assert "INDEX events_" in details and "TEMP B-TREE" not in details
@@ -0,0 +1,121 @@
+import asyncio
+import itertools
+
+from app.services.event_writer import EventWriter
+
+
+class FakeFirestore:
+    """In-memory stand-in for the FirebaseService event methods"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.commits = []
+        self.events = {}
+        self._ids = itertools.count()
+
+    def new_event_id(self):
+        return f"event-{next(self._ids)}"
+
+    def commit_events(self, writes):
+        if self.delay:
+            import time
+            time.sleep(self.delay)
+        self.commits.append(len(writes))
+        for op, event_id, data in writes:
+            if op == "set":
+                self.events[event_id] = dict(data)
+            else:
+                # merge semantics, like set(..., merge=True)
+                self.events.setdefault(event_id, {}).update(data)
+
+
+def test_burst_is_committed_in_few_batches():
+    """Test a burst of events is grouped into WriteBatches capped at max_batch_size"""
+    firestore = FakeFirestore()
+
+    async def run():
+        writer = EventWriter(firestore, max_batch_size=10, flush_interval_ms=50)
+        await writer.start()
+        ids = [await writer.save({"n": i}) for i in range(25)]
+        await writer.stop()
+        return writer, ids
+
+    writer, ids = asyncio.run(run())
+
+    assert firestore.commits == [10, 10, 5]
+    assert [firestore.events[event_id]["n"] for event_id in ids] == list(range(25))
+    assert writer.stats()["writes"] == 25
+
+
+def test_update_after_save_lands_on_the_event():
+    """Test an update queued right after its save is applied after the set"""
+    firestore = FakeFirestore()
+
+    async def run():
+        writer = EventWriter(firestore, max_batch_size=100, flush_interval_ms=1000)
+        await writer.start()
+        event_id = await writer.save({"count": 1})
+        await writer.update(event_id, {"count": 3})
+        await writer.stop()
+        return event_id
+
+    event_id = asyncio.run(run())
+
+    assert firestore.events[event_id] == {"count": 3}
+
+
+def test_flush_interval_commits_without_a_full_batch():
+    """Test a lone event is committed once the flush interval passes"""
+    firestore = FakeFirestore()
+
+    async def run():
+        writer = EventWriter(firestore, max_batch_size=100, flush_interval_ms=20)
+        await writer.start()
+        await writer.save({"n": 0})
+        await asyncio.sleep(0.2)
+        committed = list(firestore.commits)
+        await writer.stop()
+        return committed
+
+    assert asyncio.run(run()) == [1]
+
+
+def test_stop_drains_queue():
+    """Test shutdown commits every queued event and then rejects new ones"""
+    firestore = FakeFirestore(delay=0.01)
+
+    async def run():
+        writer = EventWriter(firestore, max_batch_size=4, flush_interval_ms=10000)
+        await writer.start()
+        for i in range(9):
+            await writer.save({"n": i})
+        await writer.stop()
+        try:
+            await writer.save({"n": 9})
+        except RuntimeError:
+            return True
+        return False
+
+    assert asyncio.run(run())
+    assert len(firestore.events) == 9
+
+
+def test_failing_commit_hook_does_not_stop_writer():
+    """Test an exception in on_commit is logged and durable saves still resolve"""
+    firestore = FakeFirestore()
+
+    def broken_hook(writes):
+        raise ValueError("cache exploded")
+
+    async def run():
+        writer = EventWriter(firestore, flush_interval_ms=10, on_commit=broken_hook)
+        await writer.start()
+        await asyncio.wait_for(writer.save({"n": 0}, durable=True), 5)
+        await writer.update("not-saved-yet", {"count": 2})
+        await asyncio.wait_for(writer.save({"n": 1}, durable=True), 5)
+        await writer.stop()
+
+    asyncio.run(run())
+
+    assert len(firestore.events) == 3
+    assert firestore.events["not-saved-yet"] == {"count": 2}
@@ -0,0 +1,94 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.routes import events
+from app.services.event_cache import EventQueryCache
+from app.services.event_store import EventStore
+
+AUTH = {"Authorization": "Bearer test_token"}
+USER = "test_user_123"
+
+
+class FakeFirebase:
+    """Firestore holding the `uploaded` local events, then `count` older ones fs-0 .. fs-N (newest first)"""
+
+    def __init__(self, uploaded, count: int):
+        self.events = [{"id": event_id, "user_id": USER, "timestamp": "2024-01-01T00:00:00"} for event_id in uploaded]
+        self.events += [
+            {"id": f"fs-{i}", "user_id": USER, "timestamp": "2023-01-01T00:00:00", "alert": True}
+            for i in range(count)
+        ]
+        self.queries = []
+
+    def get_events(self, user_id, limit=50, alert_only=False, start_after=None):
+        self.queries.append((limit, start_after))
+        ids = [event["id"] for event in self.events]
+        if start_after is None:
+            start = 0
+        elif start_after in ids:
+            start = ids.index(start_after) + 1
+        else:
+            return []
+        return self.events[start:start + limit]
+
+
+@pytest.fixture
+def setup(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    for i in range(3):
+        store.add({"user_id": USER, "timestamp": f"2024-01-01T00:00:0{i}", "alert": True}, event_id=f"local-{i}")
+    firebase = FakeFirebase(["local-2", "local-1", "local-0"], 5)
+
+    app = FastAPI()
+    app.include_router(events.router, prefix="/api")
+    app.state.event_store = store
+    app.state.firebase_service = firebase
+    app.state.event_cache = EventQueryCache()
+    yield TestClient(app), firebase
+    store.close()
+
+
+def test_short_local_page_stays_local(setup):
+    """Test a page the local store cannot fill ends there instead of querying Firestore"""
+    client, firebase = setup
+
+    response = client.get("/api/events?limit=5", headers=AUTH)
+
+    assert [event["event_id"] for event in response.json()] == ["local-2", "local-1", "local-0"]
+    assert firebase.queries == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_history_pages_come_from_firestore(setup):
+    """Test history=true reads Firestore and its cursors keep paging there"""
+    client, firebase = setup
+
+    response = client.get("/api/events?limit=4&history=true", headers=AUTH)
+
+    assert [event["event_id"] for event in response.json()] == ["local-2", "local-1", "local-0", "fs-0"]
+    assert response.headers["X-Next-Cursor"] == "fs-0"
+
+    # The cursor is unknown locally, so the next page is read from Firestore (through the cache)
+    for _ in range(2):
+        response = client.get("/api/events?limit=4&start_after=fs-0", headers=AUTH)
+        assert [event["event_id"] for event in response.json()] == ["fs-1", "fs-2", "fs-3", "fs-4"]
+    assert firebase.queries == [(4, None), (4, "fs-0")]
+
+
+def test_full_local_page_skips_firestore(setup):
+    """Test a page the local store fills is served without a Firestore query"""
+    client, firebase = setup
+
+    response = client.get("/api/events?limit=3", headers=AUTH)
+
+    assert len(response.json()) == 3
+    assert firebase.queries == []
+
+
+def test_cors_exposes_pagination_cursor():
+    """Test cross-origin clients are allowed to read the X-Next-Cursor header"""
+    response = TestClient(main_app).get("/api/events", headers={"Origin": "http://dashboard.example.com"})
+
+    assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
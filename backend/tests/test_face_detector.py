@@ -0,0 +1,42 @@
+
+import numpy as np
+
+from app.services.face_detector import FaceDetector, assign_faces
+
+
+def test_faces_assigned_by_containment():
+    """Test each person gets the largest face centered inside its box"""
+    faces = np.array([
+        [10, 10, 20, 20, 0.9],    # person 0, small
+        [5, 5, 40, 40, 0.9],      # person 0, largest
+        [210, 10, 30, 30, 0.9],   # person 1
+        [500, 500, 30, 30, 0.9],  # nobody
+    ], dtype=np.float32)
+    persons = [[0, 0, 100, 200], [200, 0, 300, 200], [400, 0, 450, 100]]
+
+    assigned = assign_faces(faces, persons)
+
+    assert assigned[0][2] == 40
+    assert assigned[1][0] == 210
+    assert assigned[2] is None
+
+
+def test_overlapping_persons_face_goes_to_smallest_box():
+    """Test a face inside two person boxes belongs to the tighter one"""
+    faces = np.array([[60, 20, 20, 20, 0.9]], dtype=np.float32)
+    persons = [[0, 0, 300, 300], [50, 0, 110, 200]]
+
+    assigned = assign_faces(faces, persons)
+
+    assert assigned[0] is None
+    assert assigned[1] is not None
+
+
+def test_missing_yunet_model_falls_back_to_haar():
+    """Test the detector still works without the YuNet ONNX file"""
+    detector = FaceDetector("yunet", model_path="missing.onnx", max_dim=320)
+
+    faces = detector.detect(np.zeros((720, 1280, 3), dtype=np.uint8))
+
+    assert detector.backend == "haar"
+    assert faces.shape == (0, 5)
@@ -0,0 +1,72 @@
+
+import pickle
+import numpy as np
+
+from app.services.face_gallery import FaceGallery
+
+
+def random_embeddings(n, dim=128, seed=0):
+    rng = np.random.default_rng(seed)
+    emb = rng.normal(size=(n, dim)).astype(np.float32)
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+def test_top_k_returns_distinct_identities():
+    """Test top-k uses each identity's best row and never repeats an identity"""
+    emb = random_embeddings(4)
+    gallery = FaceGallery()
+    gallery.add("alice", emb[:2])
+    gallery.add("bob", emb[2])
+    gallery.add("carol", emb[3])
+
+    names, scores = gallery.search(np.stack([emb[1], emb[3]]), k=2)
+
+    assert names[0][0] == "alice" and names[1][0] == "carol"
+    assert len(set(names[0])) == 2
+    assert np.isclose(scores[0, 0], 1.0) and scores[0, 0] >= scores[0, 1]
+
+
+def test_incremental_add_and_remove():
+    """Test removing an identity compacts the matrix and keeps others searchable"""
+    emb = random_embeddings(6)
+    gallery = FaceGallery(dtype="float16")
+    gallery.add("alice", emb[:3])
+    gallery.add("bob", emb[3:5])
+    gallery.add("carol", emb[5])
+
+    assert gallery.remove("alice") == 3
+    assert gallery.size == 3 and len(gallery) == 2
+
+    names, scores = gallery.search(emb[3:6], k=1)
+    assert [n[0] for n in names] == ["bob", "bob", "carol"]
+    assert np.allclose(scores[:, 0], 1.0, atol=1e-2)
+
+
+def test_switches_to_ivf_above_threshold():
+    """Test the IVF index kicks in past ann_threshold and still finds exact matches"""
+    emb = random_embeddings(2000, seed=1)
+    gallery = FaceGallery(ann_threshold=1000, ann_probes=8)
+    gallery.add("first", emb[:500])
+    assert gallery._index is None
+
+    for i in range(500, 2000, 100):
+        gallery.add(f"person-{i}", emb[i:i + 100])
+    assert gallery._index is not None
+
+    names, scores = gallery.search(emb[[10, 1234, 1999]], k=1)
+    assert [n[0] for n in names] == ["first", "person-1200", "person-1900"]
+
+    gallery.remove("first")
+    names, _ = gallery.search(emb[1999], k=1)
+    assert names[0][0] == "person-1900"
+
+
+def test_pickle_ships_only_used_rows():
+    """Test worker processes receive a compact copy of the gallery"""
+    gallery = FaceGallery()
+    gallery.add("alice", random_embeddings(3))
+
+    clone = pickle.loads(pickle.dumps(gallery))
+
+    assert clone.matrix.shape == (3, 128)
+    assert clone.search(gallery.matrix[0], k=1)[0][0] == ["alice"]
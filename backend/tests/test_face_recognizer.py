@@ -0,0 +1,60 @@
+
+import numpy as np
+import torch
+
+from app.services.arcface_backends import artifact_path
+from app.services.face_recognizer import ArcFaceModel, FaceRecognizer
+
+
+def make_recognizer():
+    torch.manual_seed(0)
+    return FaceRecognizer("missing.pth")
+
+
+def test_batch_embeddings_match_single():
+    """Test one batched forward pass gives the same normalized embeddings as per-face calls"""
+    recognizer = make_recognizer()
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 255, (h, h, 3), dtype=np.uint8) for h in (60, 112, 150)]
+
+    batch = recognizer.extract_embeddings_batch(faces, max_batch_size=2)
+    single = np.stack([recognizer.extract_embedding(face) for face in faces])
+
+    assert batch.shape == (3, 128)
+    assert np.allclose(np.linalg.norm(batch, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(batch, single, atol=1e-4)
+
+
+def test_recognize_faces_batch_handles_empty_crops():
+    """Test empty crops come back as no_face without breaking the batch"""
+    recognizer = make_recognizer()
+    face = np.full((80, 80, 3), 128, dtype=np.uint8)
+    recognizer.add_to_whitelist("alice", recognizer.extract_embedding(face))
+
+    results = recognizer.recognize_faces_batch([np.zeros((0, 0, 3), np.uint8), face])
+
+    assert results[0]['identity'] == 'no_face'
+    assert results[1]['identity'] == 'alice'
+    assert results[1]['is_known']
+
+
+def test_torchscript_artifact_matches_eager(tmp_path):
+    """Test the frozen TorchScript artifact is cached and gives the eager embeddings"""
+    torch.manual_seed(0)
+    model_path = str(tmp_path / "arcface.pth")
+    model = ArcFaceModel()
+    model.backbone_bn.running_mean.normal_()
+    torch.save(model.state_dict(), model_path)
+
+    eager = FaceRecognizer(model_path, backend="eager")
+    scripted = FaceRecognizer(model_path, backend="torchscript")
+    reloaded = FaceRecognizer(model_path, backend="torchscript")
+
+    faces = [np.random.default_rng(i).integers(0, 255, (100, 100, 3), dtype=np.uint8) for i in range(3)]
+    expected = eager.extract_embeddings_batch(faces)
+
+    assert isinstance(reloaded.model.module, torch.jit.ScriptModule)
+    assert (tmp_path / "arcface.torchscript.pt").exists()
+    assert artifact_path(model_path, "torchscript") == str(tmp_path / "arcface.torchscript.pt")
+    assert np.allclose(scripted.extract_embeddings_batch(faces), expected, atol=1e-4)
+    assert np.allclose(reloaded.extract_embeddings_batch(faces), expected, atol=1e-4)
@@ -0,0 +1,33 @@
+
+import cv2
+import numpy as np
+
+from app.services.image_codec import decode_image, encode_jpeg, jpeg_dimensions, reduced_decode_factor
+
+
+def make_jpeg(width, height):
+    image = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+def test_jpeg_dimensions_from_header():
+    """Test the SOF parser reads the size without decoding"""
+    assert jpeg_dimensions(make_jpeg(640, 480)) == (480, 640)
+    assert jpeg_dimensions(b"not a jpeg") is None
+
+
+def test_reduced_decode_factor():
+    """Test the DCT scale never drops below the target size"""
+    assert reduced_decode_factor(2160, 3840, 1280) == 2
+    assert reduced_decode_factor(4320, 7680, 1280) == 4
+    assert reduced_decode_factor(720, 1280, 1280) == 1
+
+
+def test_decode_downscales_large_frames():
+    """Test 4K uploads come out at the pipeline size with the same aspect ratio"""
+    image = decode_image(make_jpeg(3840, 2160), max_dim=1280)
+    assert image.shape == (720, 1280, 3)
+
+    small = decode_image(encode_jpeg(np.zeros((480, 640, 3), np.uint8)), max_dim=1280)
+    assert small.shape == (480, 640, 3)
+    assert decode_image(b"garbage") is None
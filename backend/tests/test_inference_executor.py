@@ -0,0 +1,37 @@
+
+import asyncio
+import pytest
+
+from app.services.inference_executor import InferenceExecutor, ExecutorSaturatedError
+
+
+def test_full_queue_is_rejected():
+    """Test frames beyond workers + queue are rejected with a retry hint"""
+    executor = InferenceExecutor(mode="thread", max_workers=1, max_queue=1, retry_after=2)
+
+    async def run():
+        async with executor.slot():
+            async with executor.slot():
+                with pytest.raises(ExecutorSaturatedError) as exc_info:
+                    async with executor.slot():
+                        pass
+                return exc_info.value.retry_after
+
+    assert asyncio.run(run()) == 2
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
+    executor.shutdown()
+
+
+def test_run_reports_utilization():
+    """Test work runs on the pool and is counted"""
+    executor = InferenceExecutor(mode="thread", max_workers=2, max_queue=0)
+
+    async def run():
+        async with executor.slot():
+            return await executor.run(sum, [1, 2, 3])
+
+    assert asyncio.run(run()) == 6
+    assert executor.stats()["tasks"] == 1
+    executor.shutdown()
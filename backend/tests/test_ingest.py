@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.models.detection_result import DetectionResponse
+from app.routes import ingest
+
+AUTH = {"Authorization": "Bearer test_token"}
+
+
+class FakeProcessFrame:
+    """Stands in for process_frame: b"bad" is an invalid image, b"hold" waits for release"""
+
+    def __init__(self):
+        self.frames = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    async def __call__(self, app, contents, user_id, camera_id):
+        self.frames.append(contents)
+        if contents == b"bad":
+            raise HTTPException(status_code=400, detail="Invalid image format")
+        if contents == b"unserializable":
+            raise HTTPException(status_code=400, detail=object())
+        if contents == b"hold":
+            self.started.set()
+            while not self.release.is_set():
+                await asyncio.sleep(0.01)
+        return DetectionResponse(detections=[], timestamp="2024-01-01T00:00:00", camera_id=camera_id)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeProcessFrame()
+    monkeypatch.setattr(ingest, "process_frame", fake)
+    return fake
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ingest.router)
+    return TestClient(app)
+
+
+def test_frame_gets_detection(client, fake):
+    """Test a binary frame is processed and its result comes back on the socket"""
+    with client.websocket_connect("/ws/ingest/door", headers=AUTH) as ws:
+        assert ws.receive_json() == {"type": "ready", "camera_id": "door"}
+        ws.send_bytes(b"jpeg")
+        message = ws.receive_json()
+
+    assert message["type"] == "detection"
+    assert message["frame"] == 1
+    assert message["data"]["camera_id"] == "door"
+
+
+def test_malformed_frame_reports_error_and_keeps_socket(client, fake):
+    """Test an invalid frame gets an error message and the next frame still works"""
+    with client.websocket_connect("/ws/ingest/door", headers=AUTH) as ws:
+        ws.receive_json()
+        ws.send_bytes(b"bad")
+        error = ws.receive_json()
+        ws.send_bytes(b"jpeg")
+        detection = ws.receive_json()
+
+    assert error == {"type": "error", "frame": 1, "status_code": 400, "detail": "Invalid image format"}
+    assert detection["type"] == "detection"
+    assert detection["frame"] == 2
+
+
+def test_slow_pipeline_keeps_only_newest_frame(client, fake):
+    """Test frames arriving while one is processed are dropped except the newest"""
+    with client.websocket_connect("/ws/ingest/door", headers=AUTH) as ws:
+        ws.receive_json()
+        ws.send_bytes(b"hold")
+        assert fake.started.wait(5)
+        for i in range(3):
+            ws.send_bytes(f"frame-{i}".encode())
+        # Give the receive loop time to take all three before the first frame finishes
+        threading.Timer(0.3, fake.release.set).start()
+        first = ws.receive_json()
+        second = ws.receive_json()
+
+    assert (first["frame"], second["frame"]) == (1, 4)
+    assert second["dropped"] == 2
+    assert fake.frames == [b"hold", b"frame-2"]
+
+
+def test_failed_send_closes_socket(client, fake):
+    """Test a message that cannot be sent closes the socket instead of hanging it"""
+    with client.websocket_connect("/ws/ingest/door", headers=AUTH) as ws:
+        ws.receive_json()
+        ws.send_bytes(b"unserializable")
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+
+    assert exc_info.value.code == 1011
+
+
+def test_rejects_bad_token(client, fake):
+    """Test a connection without a valid token is closed with a policy violation"""
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/ws/ingest/door", headers={"Authorization": "Bearer nope"}) as ws:
+            ws.receive_json()
+
+    assert exc_info.value.code == 1008
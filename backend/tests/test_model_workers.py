@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.services.inference_executor import ExecutorSaturatedError
+from app.services.model_workers import ModelWorkerPool
+
+
+# Stub pipeline; module-level so the spawned worker processes can import it
+
+def stub_init(*args, worker_index=None):
+    pass
+
+
+def broken_init(*args, worker_index=None):
+    raise RuntimeError("model file missing")
+
+
+def stub_run(frame, camera_key, roi_set):
+    if camera_key[1] == "crash":
+        os._exit(1)
+    if camera_key[1] == "slow":
+        time.sleep(1.0)
+    return [{'mean': float(frame.mean()), 'shape': list(frame.shape[:2]), 'camera': camera_key}]
+
+
+def make_pool(**kwargs):
+    options = {'slot_max_dim': 64, 'initializer': stub_init, 'handler': stub_run}
+    return ModelWorkerPool(1, (), **{**options, **kwargs})
+
+
+def test_frame_round_trip():
+    """Test a frame goes through shared memory to a worker and its result comes back"""
+    pool = make_pool()
+
+    async def run():
+        pool.start()
+        try:
+            small = await pool.infer(np.full((32, 48, 3), 7, dtype=np.uint8), ("user", "cam"))
+            # Larger than a slot: downscaled on the way in
+            large = await pool.infer(np.full((128, 64, 3), 9, dtype=np.uint8), ("user", "cam"))
+            return small, large, pool.stats()
+        finally:
+            pool.stop()
+
+    small, large, stats = asyncio.run(run())
+
+    assert small == [{'mean': 7.0, 'shape': [32, 48], 'camera': ("user", "cam")}]
+    assert large[0]['shape'] == [64, 32]
+    assert stats['completed'] == 2
+    assert stats['free_slots'] == stats['slots']
+
+
+def test_full_slots_are_rejected():
+    """Test a frame is rejected with a retry hint while every slot is busy"""
+    pool = make_pool(slots_per_worker=1, retry_after=3)
+
+    async def run():
+        pool.start()
+        try:
+            busy = asyncio.create_task(pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "slow")))
+            await asyncio.sleep(0)
+            with pytest.raises(ExecutorSaturatedError) as exc_info:
+                await pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "cam"))
+            await busy
+            return exc_info.value.retry_after, pool.stats()
+        finally:
+            pool.stop()
+
+    retry_after, stats = asyncio.run(run())
+
+    assert retry_after == 3
+    assert stats['rejected'] == 1
+    assert stats['free_slots'] == 1
+
+
+def test_crashed_worker_is_restarted():
+    """Test a worker crash fails its frame, frees the slot and the restarted worker serves the next one"""
+    pool = make_pool(slots_per_worker=1)
+
+    async def run():
+        pool.start()
+        try:
+            await pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "cam"))
+            with pytest.raises(RuntimeError, match="died"):
+                await pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "crash"))
+            after = await pool.infer(np.full((8, 8, 3), 5, dtype=np.uint8), ("user", "cam"))
+            return after, pool.stats()
+        finally:
+            pool.stop()
+
+    after, stats = asyncio.run(run())
+
+    assert after[0]['mean'] == 5.0
+    assert stats['restarts'] == 1
+    assert stats['failed'] == 1
+    assert stats['free_slots'] == 1
+
+
+def test_worker_failing_startup_is_unhealthy():
+    """Test a worker that cannot initialize is not restarted and frames fail instead of hanging"""
+    pool = make_pool(initializer=broken_init, timeout_seconds=30)
+
+    async def run():
+        pool.start()
+        try:
+            with pytest.raises(RuntimeError, match="died"):
+                await pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "cam"))
+            with pytest.raises(RuntimeError, match="No healthy model workers"):
+                await pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "cam"))
+            return pool.stats()
+        finally:
+            pool.stop()
+
+    stats = asyncio.run(run())
+
+    assert stats['healthy_workers'] == 0
+    assert stats['restarts'] == 0
+    assert stats['free_slots'] == stats['slots']
+
+
+def test_slow_worker_times_out():
+    """Test a request stops waiting after timeout_seconds and its slot is freed once the worker answers"""
+    pool = make_pool(slots_per_worker=1, timeout_seconds=0.2)
+
+    async def run():
+        pool.start()
+        try:
+            # Worker startup (imports) would blow the short timeout
+            for _ in range(600):
+                if pool.stats()['ready_workers']:
+                    break
+                await asyncio.sleep(0.1)
+            with pytest.raises(ExecutorSaturatedError):
+                await pool.infer(np.zeros((8, 8, 3), dtype=np.uint8), ("user", "slow"))
+            busy = pool.stats()['free_slots']
+            await asyncio.sleep(1.5)
+            return busy, pool.stats()
+        finally:
+            pool.stop()
+
+    busy, stats = asyncio.run(run())
+
+    assert busy == 0
+    assert stats['timed_out'] == 1
+    assert stats['free_slots'] == 1
@@ -0,0 +1,64 @@
+
+import numpy as np
+
+from app.services.motion_gate import MotionGate
+
+
+def make_scene(value=60):
+    return np.full((480, 640, 3), value, dtype=np.uint8)
+
+
+def test_static_scene_is_skipped():
+    """Test unchanged frames skip inference and reuse the last result"""
+    gate = MotionGate(max_skip_seconds=60)
+    detections = [{'bbox': [0, 0, 10, 10], 'confidence': 0.9}]
+
+    assert gate.check("user", "cam", make_scene()) is True
+    gate.update_result("user", "cam", detections)
+
+    assert gate.check("user", "cam", make_scene()) is False
+    assert gate.last_result("user", "cam") == detections
+    assert gate.stats()["inferences_saved"] == 1
+
+
+def test_motion_triggers_inference():
+    """Test a changed region sends the frame to inference"""
+    gate = MotionGate(max_skip_seconds=60)
+    gate.check("user", "cam", make_scene())
+    gate.update_result("user", "cam", [])
+
+    frame = make_scene()
+    frame[100:300, 200:400] = 255
+    assert gate.check("user", "cam", frame) is True
+
+
+def test_per_camera_thresholds():
+    """Test thresholds can be overridden for a single camera"""
+    gate = MotionGate(max_skip_seconds=60, camera_overrides={"door": {"min_changed_ratio": 0.5}})
+    assert gate.thresholds("door")["min_changed_ratio"] == 0.5
+    assert gate.thresholds("lobby")["min_changed_ratio"] == 0.01
+
+    for camera_id in ("door", "lobby"):
+        gate.check("user", camera_id, make_scene())
+        gate.update_result("user", camera_id, [])
+
+    frame = make_scene()
+    frame[100:200, 200:300] = 255
+    assert gate.check("user", "door", frame) is False
+    assert gate.check("user", "lobby", frame) is True
+
+
+def test_users_sharing_a_camera_id_are_separate():
+    """Test two users on the same camera id get their own background and result"""
+    gate = MotionGate(max_skip_seconds=60)
+    gate.check("alice", "default", make_scene())
+    gate.update_result("alice", "default", [{'bbox': [0, 0, 10, 10], 'confidence': 0.9}])
+
+    # Bob's first frame is a fresh background, not compared against Alice's scene
+    assert gate.check("bob", "default", make_scene()) is True
+    assert gate.last_result("bob", "default") == []
+
+    gate.update_result("bob", "default", [])
+    assert gate.check("alice", "default", make_scene()) is False
+    assert len(gate.last_result("alice", "default")) == 1
+    assert set(gate.stats()["cameras"]) == {"alice/default", "bob/default"}
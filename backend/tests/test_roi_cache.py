@@ -0,0 +1,86 @@
+
+import asyncio
+from types import SimpleNamespace
+
+from app.services.roi_cache import RoiCache
+
+
+class FakeFirebase:
+    """get_all_rois over an in-memory list, counts round-trips"""
+
+    def __init__(self, rois):
+        self.rois = rois
+        self.calls = 0
+
+    def get_all_rois(self):
+        self.calls += 1
+        return [dict(roi) for roi in self.rois]
+
+
+def make_roi(roi_id, user_id="u1", camera_id=None, x=0):
+    return {'id': roi_id, 'user_id': user_id, 'camera_id': camera_id, 'active': True,
+            'x': x, 'y': 0, 'width': 100, 'height': 100}
+
+
+def test_lookups_reuse_compiled_roi_set():
+    """Test repeated lookups hit the compiled RoiSet without touching Firestore"""
+    firebase = FakeFirebase([make_roi("a"), make_roi("b", camera_id="door")])
+    cache = RoiCache(firebase, sync="poll")
+    cache.reload()
+
+    first = cache.roi_set("u1", "door")
+    second = cache.roi_set("u1", "door")
+
+    assert first is second
+    assert first.roi_ids == ["a", "b"]
+    assert cache.roi_set("u1", "yard").roi_ids == ["a"]
+    assert cache.roi_set("u2", "door") is None
+    assert firebase.calls == 1
+
+
+def test_write_through_recompiles_only_changed_user():
+    """Test put/remove bump the user's version and drop its compiled sets"""
+    cache = RoiCache(FakeFirebase([make_roi("a"), make_roi("c", user_id="u2")]), sync="poll")
+    cache.reload()
+    before = cache.roi_set("u1", "door")
+    other = cache.roi_set("u2", "door")
+
+    cache.put("u1", "b", make_roi("b", x=300))
+    assert cache.roi_set("u1", "door").roi_ids == ["a", "b"]
+    assert cache.roi_set("u1", "door") is not before
+    assert cache.roi_set("u2", "door") is other
+
+    cache.remove("u1", "a")
+    cache.remove("u1", "b")
+    assert cache.roi_set("u1", "door") is None
+
+
+def test_snapshot_changes_update_cache():
+    """Test listener changes (added / removed) are applied per document"""
+    cache = RoiCache(FakeFirebase([]), sync="listen")
+
+    def change(kind, roi_id, data):
+        document = SimpleNamespace(id=roi_id, to_dict=lambda: data)
+        return SimpleNamespace(type=SimpleNamespace(name=kind), document=document)
+
+    cache._on_snapshot([], [change("ADDED", "a", make_roi("a"))], None)
+    assert [r['id'] for r in cache.get_rois("u1")] == ["a"]
+
+    cache._on_snapshot([], [change("REMOVED", "a", make_roi("a"))], None)
+    assert cache.get_rois("u1") == []
+
+
+def test_poll_mode_reloads_in_background():
+    """Test poll mode picks up ROIs added outside this process"""
+    firebase = FakeFirebase([])
+    cache = RoiCache(firebase, sync="poll", refresh_interval_seconds=0.01)
+
+    async def run():
+        await cache.start()
+        firebase.rois.append(make_roi("a"))
+        await asyncio.sleep(0.05)
+        await cache.stop()
+
+    asyncio.run(run())
+
+    assert cache.roi_set("u1", "door").roi_ids == ["a"]
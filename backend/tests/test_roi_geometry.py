@@ -0,0 +1,101 @@
+
+import pickle
+import cv2
+import numpy as np
+
+from app.services.detection_pipeline import DetectionPipeline
+from app.services.image_codec import decode_image
+from app.services.roi_geometry import RoiSet
+from app.services.yolo_detector import PERSON_DTYPE
+
+
+class FakeDetector:
+    """Reports one person box at a fixed place inside every crop"""
+
+    imgsz = 640
+
+    def __init__(self):
+        self.calls = []
+
+    def detect_persons_batch(self, images, confidence_threshold=0.5, imgsz=None):
+        self.calls.append(([img.shape[:2] for img in images], imgsz))
+        return [np.array([([10, 10, 30, 50], 0.9)], dtype=PERSON_DTYPE) for _ in images]
+
+
+def test_polygon_mask_containment():
+    """Test box centers are tested against the polygon, not its bounding box"""
+    roi_set = RoiSet.from_rois([{'points': [[0, 0], [100, 0], [0, 100]], 'x': 0, 'y': 0, 'width': 100, 'height': 100}])
+    bboxes = np.array([[10, 10, 30, 30], [70, 70, 90, 90]], dtype=np.float32)
+
+    assert roi_set.contains(bboxes, (200, 200, 3)).tolist() == [True, False]
+
+
+def test_far_apart_rois_use_separate_crops():
+    """Test distant ROIs get one crop each, overlapping ROIs one union crop"""
+    far = RoiSet.from_rois([
+        {'x': 0, 'y': 0, 'width': 100, 'height': 100},
+        {'x': 500, 'y': 300, 'width': 100, 'height': 100},
+    ])
+    near = RoiSet.from_rois([
+        {'x': 0, 'y': 0, 'width': 100, 'height': 100},
+        {'x': 50, 'y': 50, 'width': 100, 'height': 100},
+    ])
+
+    assert far.crop_boxes((480, 640, 3)) == [(0, 0, 100, 100), (500, 300, 600, 400)]
+    assert near.crop_boxes((480, 640, 3)) == [(0, 0, 150, 150)]
+
+
+def test_detect_maps_crop_boxes_to_frame():
+    """Test crop detections are shifted back to frame pixels at the frame's scale"""
+    detector = FakeDetector()
+    pipeline = DetectionPipeline(detector)
+    roi_set = RoiSet.from_rois([{'x': 200, 'y': 100, 'width': 320, 'height': 240}])
+
+    detections = pipeline.detect(np.zeros((720, 1280, 3), dtype=np.uint8), roi_set)
+
+    assert detections['bbox'].tolist() == [[210, 110, 230, 150]]
+    # 320px crop of a 1280px frame at imgsz 640 -> 160
+    assert detector.calls == [([(240, 320)], 160)]
+
+
+def test_roi_set_pickles_without_masks():
+    """Test cached masks are not sent to worker processes"""
+    roi_set = RoiSet.from_rois([{'x': 0, 'y': 0, 'width': 10, 'height': 10}])
+    roi_set.mask((720, 1280, 3))
+
+    clone = pickle.loads(pickle.dumps(roi_set))
+
+    assert clone._masks == {}
+    assert clone.crop_boxes((720, 1280, 3)) == [(0, 0, 10, 10)]
+
+
+def test_native_resolution_rois_follow_the_decoded_frame():
+    """Test ROIs drawn on a 4K frame land on the same region of its downscaled decode"""
+    _, jpeg = cv2.imencode('.jpg', np.zeros((2160, 3840, 3), dtype=np.uint8))
+    frame = decode_image(jpeg.tobytes(), 1280)
+    assert frame.shape[:2] == (720, 1280)
+
+    sized = RoiSet.from_rois([
+        {'x': 1920, 'y': 1080, 'width': 640, 'height': 480, 'frame_width': 3840, 'frame_height': 2160}
+    ])
+    # Saved without a frame size: the request supplies the upload's native size
+    legacy = RoiSet.from_rois([{'x': 1920, 'y': 1080, 'width': 640, 'height': 480}]).with_frame_size(3840, 2160)
+
+    for roi_set in (sized, legacy):
+        detector = FakeDetector()
+        detections = DetectionPipeline(detector).detect(frame, roi_set)
+
+        assert detector.calls[0][0] == [(160, 213)]
+        assert detections['bbox'].tolist() == [[650, 370, 670, 410]]
+
+
+def test_rois_drawn_on_other_frame_sizes_are_rescaled():
+    """Test ROIs saved against different frame sizes share one coordinate space"""
+    roi_set = RoiSet.from_rois([
+        {'x': 100, 'y': 100, 'width': 100, 'height': 100, 'frame_width': 1920, 'frame_height': 1080},
+        {'x': 200, 'y': 200, 'width': 200, 'height': 200, 'frame_width': 3840, 'frame_height': 2160},
+    ])
+
+    assert roi_set.frame_size == (1920, 1080)
+    assert roi_set.for_frame((540, 960, 3)).crop_boxes((540, 960, 3)) == [(50, 50, 100, 100)]
+    assert roi_set.for_frame((540, 960, 3)) is roi_set.for_frame((540, 960, 3))
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+
+from app.services.snapshot_dedup import SnapshotDeduplicator, dhash, hamming
+
+
+def make_scene(seed, shape=(480, 640, 3)):
+    rng = np.random.default_rng(seed)
+    scene = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (shape[1], shape[0]))
+    return cv2.GaussianBlur(scene, (31, 31), 0)
+
+
+def test_dhash_ignores_compression_but_not_scene_changes():
+    """Test a re-encoded frame hashes close and a different scene hashes far"""
+    frame = make_scene(0)
+    _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    recompressed = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+    assert hamming(dhash(frame), dhash(recompressed)) <= 6
+    assert hamming(dhash(frame), dhash(make_scene(1))) > 6
+
+
+def test_similar_snapshot_reuses_url_and_counts_bytes():
+    """Test a near-identical frame from the same camera reuses the earlier upload"""
+    dedup = SnapshotDeduplicator(max_distance=6)
+    key, labels = ("alice", "door"), ("unknown",)
+    image_hash = dhash(make_scene(0))
+
+    assert dedup.lookup(key, image_hash, labels) is None
+    dedup.remember(key, image_hash, labels, "https://cdn.example.com/a.jpg", "https://cdn.example.com/t.jpg", 50000)
+
+    entry = dedup.lookup(key, image_hash ^ 0b101, labels)
+    assert (entry.image_url, entry.thumbnail_url) == ("https://cdn.example.com/a.jpg", "https://cdn.example.com/t.jpg")
+    assert dedup.stats()["bytes_saved"] == 50000
+    assert dedup.stats()["hit_rate"] == 0.5
+
+
+def test_other_camera_or_identities_do_not_match():
+    """Test the same picture from another camera or with other people is uploaded again"""
+    dedup = SnapshotDeduplicator()
+    image_hash = dhash(make_scene(0))
+    dedup.remember(("alice", "door"), image_hash, ("unknown",), "https://cdn.example.com/a.jpg", None, 1)
+
+    assert dedup.lookup(("alice", "yard"), image_hash, ("unknown",)) is None
+    assert dedup.lookup(("alice", "door"), image_hash, ("bob",)) is None
+
+
+def test_old_uploads_expire():
+    """Test uploads older than max_age_seconds are no longer reused"""
+    dedup = SnapshotDeduplicator(max_age_seconds=0)
+    image_hash = dhash(make_scene(0))
+    dedup.remember(("alice", "door"), image_hash, (), "https://cdn.example.com/a.jpg", None, 1)
+
+    assert dedup.lookup(("alice", "door"), image_hash, ()) is None
@@ -0,0 +1,74 @@
+import threading
+
+from app.services.tracker import SortTracker, TrackerRegistry, iou_matrix
+import numpy as np
+
+
+def test_iou_matrix():
+    """Test pairwise IoU of identical and disjoint boxes"""
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    ious = iou_matrix(a, b)
+    assert ious.shape == (1, 2)
+    assert abs(ious[0, 0] - 1.0) < 1e-6
+    assert ious[0, 1] == 0.0
+
+
+def test_track_id_is_stable_for_moving_person():
+    """Test a slowly moving box keeps its track id and a new box gets a new one"""
+    tracker = SortTracker(iou_threshold=0.3)
+    first = tracker.update([[100, 100, 200, 300]])[0].track_id
+
+    for step in range(1, 5):
+        track = tracker.update([[100 + 5 * step, 100, 200 + 5 * step, 300]])[0]
+        assert track.track_id == first
+
+    tracks = tracker.update([[125, 100, 225, 300], [500, 100, 600, 300]])
+    assert tracks[0].track_id == first
+    assert tracks[1].track_id != first
+
+
+def test_identity_cached_on_track():
+    """Test known identities are reused until the TTL expires, unknown ones are not"""
+    registry = TrackerRegistry(identity_ttl_seconds=60)
+    track = registry.update(("user", "cam"), [[0, 0, 50, 100]])[0]
+    assert track.needs_recognition(registry.identity_ttl_seconds)
+
+    track.set_identity("unknown", False)
+    assert track.needs_recognition(registry.identity_ttl_seconds)
+
+    track.set_identity("Dat", True)
+    track = registry.update(("user", "cam"), [[2, 0, 52, 100]])[0]
+    assert track.identity == "Dat"
+    assert not track.needs_recognition(registry.identity_ttl_seconds)
+    assert track.needs_recognition(0)
+
+
+def test_registry_separates_users_on_same_camera_id():
+    """Test two users' cameras with the same id never share tracks"""
+    registry = TrackerRegistry(identity_ttl_seconds=60)
+    alice = registry.update(("alice", "default"), [[0, 0, 50, 100]])[0]
+    alice.set_identity("Dat", True)
+
+    bob = registry.update(("bob", "default"), [[2, 0, 52, 100]])[0]
+    assert bob.track_id != alice.track_id
+    assert bob.identity is None
+    assert registry.stats()["active_tracks"] == {"alice/default": 1, "bob/default": 1}
+
+
+def test_recognition_counts_survive_concurrent_frames():
+    """Test counts added from many inference threads at once are not lost"""
+    registry = TrackerRegistry()
+
+    def frames():
+        for _ in range(2000):
+            registry.count_recognitions(1, 2)
+
+    threads = [threading.Thread(target=frames) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = registry.stats()
+    assert (stats["recognitions_run"], stats["recognitions_reused"]) == (16000, 32000)
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import json
+import sqlite3
+
+from app.services.event_store import EventStore
+from app.services.event_writer import EventWriter
+from app.services.upload_spool import UploadSpool
+
+
+class FakeFirebase:
+    """Cloudinary + Firestore stand-in whose uploads fail `failures` times first"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.uploads = []
+        self.events = {}
+        self._ids = itertools.count()
+
+    def new_event_id(self):
+        return f"event-{next(self._ids)}"
+
+    def upload_image(self, image_bytes, filename):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("cloudinary unavailable")
+        self.uploads.append(filename)
+        return f"https://cdn.example.com/{filename}"
+
+    def commit_events(self, writes):
+        for op, event_id, data in writes:
+            self.events[event_id] = dict(data)
+
+
+async def run_spool(firebase, path, until, timeout=5.0, **kwargs):
+    writer = EventWriter(firebase, flush_interval_ms=10)
+    spool = UploadSpool(firebase, writer, path=path, workers=2, **kwargs)
+    await writer.start()
+    await spool.start()
+    saved = []
+    if until is not None:
+        for i in range(until):
+            await spool.enqueue(b"jpeg", f"snap-{i}.jpg", {"n": i}, lambda event_id, url, thumbnail_url: saved.append(event_id))
+    deadline = asyncio.get_running_loop().time() + timeout
+    while spool.uploaded < (until or 1) and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+    stats = spool.stats()
+    await spool.stop()
+    await writer.stop()
+    return stats, saved
+
+
+def test_spooled_events_are_uploaded_and_saved(tmp_path):
+    """Test each spooled snapshot is uploaded, saved with its URL and removed from disk"""
+    firebase = FakeFirebase()
+
+    stats, saved = asyncio.run(run_spool(firebase, str(tmp_path / "spool.db"), until=5))
+
+    assert sorted(e["n"] for e in firebase.events.values()) == [0, 1, 2, 3, 4]
+    assert all(e["image_url"].startswith("https://cdn.example.com/") for e in firebase.events.values())
+    assert sorted(saved) == sorted(firebase.events)
+    assert stats["uploaded"] == 5 and stats["pending"] == 0 and stats["in_flight"] == 0
+
+
+def test_failed_uploads_are_retried_with_backoff(tmp_path):
+    """Test an upload that fails twice is retried and eventually saved"""
+    firebase = FakeFirebase(failures=2)
+
+    stats, _ = asyncio.run(run_spool(
+        firebase, str(tmp_path / "spool.db"), until=1, retry_base_seconds=0.01, retry_max_seconds=0.05
+    ))
+
+    assert len(firebase.events) == 1
+    assert stats["retries"] == 2
+
+
+def test_interrupted_jobs_resume_after_restart(tmp_path):
+    """Test jobs a crashed process left in flight are picked up on the next start"""
+    path = str(tmp_path / "spool.db")
+    firebase = FakeFirebase()
+    asyncio.run(run_spool(firebase, path, until=None, timeout=0))
+
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO jobs (event_id, filename, image, event, state, next_attempt, created) "
+        "VALUES ('crashed', 'snap.jpg', x'00', ?, 'claimed', 0, 0)",
+        (json.dumps({"n": 7}),)
+    )
+    conn.commit()
+    conn.close()
+
+    asyncio.run(run_spool(firebase, path, until=None))
+
+    assert firebase.events["crashed"]["n"] == 7
+
+
+def test_reused_url_skips_upload(tmp_path):
+    """Test a job spooled with an existing image URL is saved without uploading"""
+    firebase = FakeFirebase()
+
+    async def run():
+        writer = EventWriter(firebase, flush_interval_ms=10)
+        spool = UploadSpool(firebase, writer, path=str(tmp_path / "spool.db"))
+        await writer.start()
+        await spool.start()
+        await spool.enqueue(None, "snap.jpg", {"n": 0}, image_url="https://cdn.example.com/old.jpg")
+        while spool.uploaded < 1:
+            await asyncio.sleep(0.01)
+        await spool.stop()
+        await writer.stop()
+
+    asyncio.run(run())
+
+    assert firebase.uploads == []
+    assert [e["image_url"] for e in firebase.events.values()] == ["https://cdn.example.com/old.jpg"]
+
+
+def test_rendered_snapshot_uploads_full_image_and_thumbnail(tmp_path):
+    """Test a job with a render callback uploads both variants and saves both URLs"""
+    firebase = FakeFirebase()
+
+    async def run():
+        writer = EventWriter(firebase, flush_interval_ms=10)
+        spool = UploadSpool(firebase, writer, path=str(tmp_path / "spool.db"))
+        await writer.start()
+        await spool.start()
+        await spool.enqueue_render(lambda: (b"full", b"thumb"), b"original", "detections/a/snap.jpg", {"n": 0})
+        while spool.uploaded < 1:
+            await asyncio.sleep(0.01)
+        await spool.stop()
+        await writer.stop()
+
+    asyncio.run(run())
+
+    assert sorted(firebase.uploads) == ["detections/a/snap.jpg", "thumbnails/detections/a/snap.jpg"]
+    event = next(iter(firebase.events.values()))
+    assert event["image_url"] == "https://cdn.example.com/detections/a/snap.jpg"
+    assert event["thumbnail_url"] == "https://cdn.example.com/thumbnails/detections/a/snap.jpg"
+
+
+def test_save_carries_local_count_updates(tmp_path):
+    """Test count updates applied to the local store before the upload finished are saved too"""
+    firebase = FakeFirebase()
+    store = EventStore(str(tmp_path / "events.db"))
+    event = {"user_id": "u", "timestamp": "2024-01-01T00:00:00", "count": 1}
+    event_id = store.add(event)
+    store.update(event_id, {"count": 4})
+
+    async def run():
+        writer = EventWriter(firebase, flush_interval_ms=10)
+        spool = UploadSpool(firebase, writer, path=str(tmp_path / "spool.db"), event_store=store)
+        await writer.start()
+        await spool.start()
+        await spool.enqueue(b"jpeg", "snap.jpg", event, event_id=event_id)
+        while spool.uploaded < 1:
+            await asyncio.sleep(0.01)
+        await spool.stop()
+        await writer.stop()
+
+    asyncio.run(run())
+    store.close()
+
+    assert firebase.events[event_id]["count"] == 4
+    assert firebase.events[event_id]["image_url"] == "https://cdn.example.com/snap.jpg"
+
+
+def test_full_encode_backlog_encodes_in_request(tmp_path):
+    """Test snapshots beyond the encode backlog are encoded by the caller instead of queued"""
+    firebase = FakeFirebase()
+
+    async def run():
+        writer = EventWriter(firebase, flush_interval_ms=10)
+        spool = UploadSpool(firebase, writer, path=str(tmp_path / "spool.db"), max_encode_backlog=0)
+        await writer.start()
+        await spool.start()
+        await spool.enqueue_render(lambda: (b"full", b"thumb"), b"original", "snap.jpg", {"n": 0})
+        encoding = len(spool._encoding)
+        while spool.uploaded < 1:
+            await asyncio.sleep(0.01)
+        stats = spool.stats()
+        await spool.stop()
+        await writer.stop()
+        return encoding, stats
+
+    encoding, stats = asyncio.run(run())
+
+    assert encoding == 0
+    assert stats["inline_encodes"] == 1
+    assert sorted(firebase.uploads) == ["snap.jpg", "thumbnails/snap.jpg"]
+
+
+def test_unrendered_snapshots_upload_the_original_frame(tmp_path):
+    """Test a failed render and a render cut off by a crash both upload the original frame"""
+    path = str(tmp_path / "spool.db")
+    firebase = FakeFirebase()
+    asyncio.run(run_spool(firebase, path, until=None, timeout=0))
+
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO jobs (event_id, filename, image, event, state, next_attempt, created) "
+        "VALUES ('crashed', 'crashed.jpg', x'ff', ?, 'encoding', 0, 0)",
+        (json.dumps({"n": 7}),)
+    )
+    conn.commit()
+    conn.close()
+
+    def broken_render():
+        raise ValueError("bad frame")
+
+    async def run():
+        writer = EventWriter(firebase, flush_interval_ms=10)
+        spool = UploadSpool(firebase, writer, path=path)
+        await writer.start()
+        await spool.start()
+        await spool.enqueue_render(broken_render, b"original", "failed.jpg", {"n": 8})
+        while spool.uploaded < 2:
+            await asyncio.sleep(0.01)
+        stats = spool.stats()
+        await spool.stop()
+        await writer.stop()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["unrendered"] == 2
+    assert sorted(firebase.uploads) == ["crashed.jpg", "failed.jpg"]
+    assert all(e["image_url"] and e["thumbnail_url"] is None for e in firebase.events.values())
+
+
+def test_permanently_failed_job_drops_its_callback(tmp_path):
+    """Test a job that runs out of attempts is kept as failed and its callback is released"""
+    firebase = FakeFirebase(failures=100)
+
+    async def run():
+        writer = EventWriter(firebase, flush_interval_ms=10)
+        spool = UploadSpool(
+            firebase, writer, path=str(tmp_path / "spool.db"),
+            retry_base_seconds=0.01, retry_max_seconds=0.01, max_attempts=2
+        )
+        await writer.start()
+        await spool.start()
+        await spool.enqueue(b"jpeg", "snap.jpg", {"n": 0}, lambda *args: None)
+        while spool.stats()["failed"] < 1:
+            await asyncio.sleep(0.01)
+        callbacks = dict(spool._callbacks)
+        await spool.stop()
+        await writer.stop()
+        return callbacks
+
+    assert asyncio.run(asyncio.wait_for(run(), 10)) == {}
+    assert firebase.events == {}
@@ -0,0 +1,66 @@
+
+import glob
+import importlib.util
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.tracker import iou_matrix
+from app.utils.config import settings
+
+# (runtime module, min IoU, max confidence drift) per exported backend
+BACKENDS = {
+    "onnx": ("onnxruntime", 0.9, 0.05),
+    "openvino": ("openvino", 0.9, 0.05),
+    "int8": ("onnxruntime", 0.7, 0.15),
+}
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(settings.YOLO_MODEL_PATH),
+    reason=f"YOLO weights not found at {settings.YOLO_MODEL_PATH}"
+)
+
+
+def load_frames(limit=8):
+    paths = sorted(glob.glob(os.path.join("dataset", "*", "*.jpg")))[::10][:limit]
+    if not paths:
+        pytest.skip("No dataset images for parity check")
+    return [cv2.imread(p) for p in paths]
+
+
+@pytest.fixture(scope="module")
+def torch_results():
+    from app.services.yolo_detector import YoloDetector
+
+    detector = YoloDetector(settings.YOLO_MODEL_PATH, backend="torch")
+    return detector.detect_persons_batch(load_frames(), settings.CONFIDENCE_THRESHOLD)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_backend_matches_torch(backend, torch_results):
+    """Test exported backends detect the same persons as PyTorch within tolerance"""
+    runtime, min_iou, max_conf_drift = BACKENDS[backend]
+    if importlib.util.find_spec(runtime) is None:
+        pytest.skip(f"{runtime} not installed")
+
+    from app.services.yolo_detector import YoloDetector
+
+    detector = YoloDetector(
+        settings.YOLO_MODEL_PATH,
+        backend=backend,
+        calibration_dir=settings.YOLO_CALIBRATION_DIR
+    )
+    # Slightly lower threshold so boxes right at the cut-off still find their match
+    results = detector.detect_persons_batch(load_frames(), settings.CONFIDENCE_THRESHOLD - max_conf_drift)
+
+    for expected, actual in zip(torch_results, results):
+        if not len(expected):
+            continue
+        assert len(actual), f"{backend} missed {len(expected)} person(s)"
+
+        ious = iou_matrix(expected['bbox'], actual['bbox'])
+        best = np.argmax(ious, axis=1)
+        assert np.all(ious[np.arange(len(expected)), best] >= min_iou)
+        assert np.all(np.abs(expected['confidence'] - actual['confidence'][best]) <= max_conf_drift)
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import cv2
+import websockets
+from datetime import datetime
+LOCAL_IP= "192.168.1.54"
+CAMERA_ID = "laptop"
+TOKEN = "test_token"
+WS_URL = f'ws://{LOCAL_IP}:8000/ws/ingest/{CAMERA_ID}?token={TOKEN}'
+INTERVAL = 0.2
+
+
+async def send_frames(ws, cap):
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            print("Không thể đọc khung hình từ camera")
+            break
+
+        _, img_encoded = cv2.imencode(".jpg", frame)
+        await ws.send(img_encoded.tobytes())
+        await asyncio.sleep(INTERVAL)
+
+
+async def receive_results(ws):
+    async for message in ws:
+        print(f"[{datetime.now()}] Server trả về:", json.loads(message))
+
+
+async def main():
+    cap = cv2.VideoCapture(0)
+
+    if not cap.isOpened():
+        print("Không mở được camera laptop!")
+        return
+
+    print("Bắt đầu gửi ảnh lên server qua WebSocket ...")
+
+    # Xác thực một lần khi kết nối, sau đó chỉ gửi JPEG dạng binary
+    async with websockets.connect(WS_URL, max_size=None) as ws:
+        await asyncio.gather(send_frames(ws, cap), receive_results(ws))
+
+
+asyncio.run(main())